@@ -0,0 +1,560 @@
+"""
+Benchmark the overhead GPUStack adds in front of an inference backend.
+
+The server app (auth, usage middleware, server proxy) and the worker proxy
+are started in-process, backed by a temporary SQLite database, and routed to
+a fake OpenAI-compatible backend. The same requests are sent directly to the
+backend and through GPUStack. Reports the added p50/p99 latency, the max
+requests per second and the added CPU time per request for the streaming,
+non-streaming, multipart and embeddings paths.
+
+Everything runs in one process and event loop, so the numbers are meant for
+comparing revisions on the same machine, not as absolute capacity.
+
+Requires the gpustack package to be importable, e.g. run from the repository
+root: python benchmarks/benchmark_proxy_overhead.py
+"""
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+import secrets
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+from unittest.mock import patch
+
+import aiohttp
+from aiohttp import web
+import uvicorn
+
+from benchmark_worker_proxy import (
+    create_proxy_app,
+    free_port,
+    percentile_ms,
+    run_concurrently,
+)
+from gpustack.api.principal_cache import principal_cache
+from gpustack.config.config import Config
+from gpustack.http_proxy.model_list_cache import model_list_cache
+from gpustack.http_proxy.routing_table import routing_table
+from gpustack.logging import setup_logging
+from gpustack.routes import ui
+from gpustack.schemas.api_keys import ApiKey
+from gpustack.schemas.clusters import Cluster
+from gpustack.schemas.models import (
+    Model,
+    ModelCreate,
+    ModelInstance,
+    ModelInstanceCreate,
+    ModelInstanceStateEnum,
+    SourceEnum,
+)
+from gpustack.schemas.users import User
+from gpustack.schemas.workers import (
+    SystemReserved,
+    Worker,
+    WorkerStateEnum,
+    WorkerStatus,
+)
+from gpustack.security import API_KEY_PREFIX, JWTManager, get_secret_hash
+from gpustack.server.app import create_app
+from gpustack.server.db import get_engine, init_db
+from gpustack.server.server import Server
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Also registers the trace level used by the database event hooks.
+setup_logging()
+logging.getLogger().setLevel(logging.WARNING)
+
+MODEL_NAME = "benchmark"
+SCENARIOS = ("chat_streaming", "chat", "embeddings", "transcriptions")
+
+
+@dataclass
+class BackendOptions:
+    latency_ms: float
+    tokens: int
+    token_interval_ms: float
+    embedding_dimensions: int
+    audio_size: int
+
+
+@dataclass
+class ScenarioResults:
+    scenario: str
+    direct_p50_ms: float
+    direct_p99_ms: float
+    proxy_p50_ms: float
+    proxy_p99_ms: float
+    added_p50_ms: float
+    added_p99_ms: float
+    direct_max_rps: float
+    proxy_max_rps: float
+    added_cpu_ms_per_request: float
+
+
+@dataclass
+class BenchmarkResults:
+    backend: BackendOptions
+    requests: int
+    concurrency: int
+    scenarios: List[ScenarioResults]
+
+
+async def start_backend(port: int, options: BackendOptions) -> web.AppRunner:
+    usage = {"prompt_tokens": 8, "completion_tokens": options.tokens}
+    usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+    async def chat_completions(request: web.Request):
+        body = await request.json()
+        await asyncio.sleep(options.latency_ms / 1000)
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {
+                                "role": "assistant",
+                                "content": "token " * options.tokens,
+                            },
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        chunk = {
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": {"content": "token "}}],
+        }
+        for _ in range(options.tokens):
+            if options.token_interval_ms:
+                await asyncio.sleep(options.token_interval_ms / 1000)
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        chunk["choices"] = []
+        chunk["usage"] = usage
+        await resp.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+        await resp.write_eof()
+        return resp
+
+    async def embeddings(request: web.Request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(options.latency_ms / 1000)
+        embedding = [0.1] * options.embedding_dimensions
+        return web.json_response(
+            {
+                "object": "list",
+                "model": body["model"],
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": embedding}
+                    for i in range(len(inputs))
+                ],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            }
+        )
+
+    async def transcriptions(request: web.Request):
+        received = 0
+        async for chunk in request.content.iter_any():
+            received += len(chunk)
+        await asyncio.sleep(options.latency_ms / 1000)
+        return web.json_response({"text": f"received {received} bytes"})
+
+    app = web.Application(client_max_size=0)
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_post("/v1/audio/transcriptions", transcriptions)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def seed_database(backend_port: int, worker_port: int, worker_token: str) -> str:
+    """
+    Create the admin user, an API key, and a model with one running instance
+    served by the fake backend. Returns the API key.
+    """
+    async with AsyncSession(get_engine()) as session:
+        user = await User.create(
+            session,
+            {
+                "username": "admin",
+                "hashed_password": get_secret_hash(secrets.token_hex(8)),
+                "is_admin": True,
+            },
+        )
+        access_key, secret_key = secrets.token_hex(8), secrets.token_hex(16)
+        await ApiKey.create(
+            session,
+            {
+                "name": "benchmark",
+                "user_id": user.id,
+                "access_key": access_key,
+                "hashed_secret_key": get_secret_hash(secret_key),
+            },
+        )
+        cluster = await Cluster.create(session, {"name": "benchmark"})
+        # Objects expire on each commit, keep the IDs needed later.
+        cluster_id = cluster.id
+        worker = await Worker.create(
+            session,
+            {
+                "name": "benchmark",
+                "hostname": "benchmark",
+                "ip": "127.0.0.1",
+                "port": worker_port,
+                "worker_uuid": "benchmark",
+                "cluster_id": cluster_id,
+                "state": WorkerStateEnum.READY,
+                "token": worker_token,
+                "system_reserved": SystemReserved(ram=0, vram=0),
+                "status": WorkerStatus.get_default_status(),
+            },
+        )
+        worker_id = worker.id
+        model = await Model.create(
+            session,
+            ModelCreate(
+                name=MODEL_NAME,
+                source=SourceEnum.LOCAL_PATH,
+                local_path="/benchmark",
+                cluster_id=cluster_id,
+            ),
+            update={"ready_replicas": 1},
+        )
+        model_id = model.id
+        await ModelInstance.create(
+            session,
+            ModelInstanceCreate(
+                name=f"{MODEL_NAME}-0",
+                model_id=model_id,
+                model_name=MODEL_NAME,
+                source=SourceEnum.LOCAL_PATH,
+                local_path="/benchmark",
+                cluster_id=cluster_id,
+                worker_id=worker_id,
+                worker_ip="127.0.0.1",
+                port=backend_port,
+                state=ModelInstanceStateEnum.RUNNING,
+            ),
+        )
+    return f"{API_KEY_PREFIX}_{access_key}_{secret_key}"
+
+
+async def start_app(app, port: int):
+    config = uvicorn.Config(
+        app, host="127.0.0.1", port=port, access_log=False, log_level="error"
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+def scenario_requests(
+    session: aiohttp.ClientSession, options: BackendOptions
+) -> Dict[str, Callable[[str], Awaitable[None]]]:
+    """
+    Return a request function per scenario, taking the base URL of the
+    OpenAI-compatible API.
+    """
+    audio = b"\0" * options.audio_size
+
+    async def chat_streaming(base_url: str):
+        body = {
+            "model": MODEL_NAME,
+            "stream": True,
+            "messages": [{"role": "user", "content": "hi"}],
+        }
+        async with session.post(f"{base_url}/chat/completions", json=body) as resp:
+            async for _ in resp.content.iter_any():
+                pass
+            assert resp.status == 200, resp.status
+
+    async def chat(base_url: str):
+        body = {"model": MODEL_NAME, "messages": [{"role": "user", "content": "hi"}]}
+        async with session.post(f"{base_url}/chat/completions", json=body) as resp:
+            await resp.read()
+            assert resp.status == 200, resp.status
+
+    async def embeddings(base_url: str):
+        body = {"model": MODEL_NAME, "input": ["hello world"] * 4}
+        async with session.post(f"{base_url}/embeddings", json=body) as resp:
+            await resp.read()
+            assert resp.status == 200, resp.status
+
+    async def transcriptions(base_url: str):
+        form = aiohttp.FormData()
+        form.add_field("model", MODEL_NAME)
+        form.add_field("file", audio, filename="audio.wav", content_type="audio/wav")
+        async with session.post(f"{base_url}/audio/transcriptions", data=form) as resp:
+            await resp.read()
+            assert resp.status == 200, resp.status
+
+    return {
+        "chat_streaming": chat_streaming,
+        "chat": chat,
+        "embeddings": embeddings,
+        "transcriptions": transcriptions,
+    }
+
+
+async def measure(
+    fn: Callable[[str], Awaitable[None]],
+    base_url: str,
+    latency_requests: int,
+    requests: int,
+    concurrency: int,
+):
+    """
+    Return the sequential latencies, the max RPS at the given concurrency and
+    the process CPU seconds per request of the concurrent run.
+    """
+    # Sequential requests, so the latencies are free of queuing effects.
+    latencies = await run_concurrently(latency_requests, 1, lambda: fn(base_url))
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await run_concurrently(requests, concurrency, lambda: fn(base_url))
+    elapsed = time.perf_counter() - start
+    cpu_per_request = (time.process_time() - cpu_start) / requests
+    return latencies, requests / elapsed, cpu_per_request
+
+
+def prepare_config() -> Config:
+    data_dir = tempfile.mkdtemp(prefix="gpustack-benchmark-")
+    cfg = Config(
+        data_dir=data_dir,
+        database_url=f"sqlite:///{os.path.join(data_dir, 'database.db')}",
+        disable_update_check=True,
+        force_auth_localhost=True,
+    )
+    # Same schema as a real server, including views.
+    Server(cfg)._run_migrations()
+    return cfg
+
+
+async def main(
+    cfg: Config,
+    options: BackendOptions,
+    scenarios: List[str],
+    requests: int,
+    concurrency: int,
+    latency_requests: int,
+) -> BenchmarkResults:
+    backend_port, worker_port, server_port = free_port(), free_port(), free_port()
+    worker_token = secrets.token_hex(16)
+
+    await init_db(cfg.database_url)
+    api_key = await seed_database(backend_port, worker_port, worker_token)
+
+    # Background tasks of the server serving the proxy path from memory.
+    server_tasks = [
+        asyncio.create_task(routing_table.start(get_engine())),
+        asyncio.create_task(principal_cache.start()),
+        asyncio.create_task(model_list_cache.start()),
+    ]
+    backend = await start_backend(backend_port, options)
+
+    worker_app = create_proxy_app()
+    worker_app.state.token = worker_token
+    # The UI assets are not needed and may not be built.
+    with patch.object(ui, "register", lambda app: None):
+        server_app = create_app(cfg)
+    server_app.state.server_config = cfg
+    server_app.state.jwt_manager = JWTManager(cfg.jwt_secret_key)
+
+    worker, worker_task = await start_app(worker_app, worker_port)
+    server, server_task = await start_app(server_app, server_port)
+    while not routing_table.ready:
+        await asyncio.sleep(0.01)
+
+    direct_url = f"http://127.0.0.1:{backend_port}/v1"
+    proxy_url = f"http://127.0.0.1:{server_port}/v1"
+
+    results = []
+    try:
+        async with aiohttp.ClientSession(
+            headers={"Authorization": f"Bearer {api_key}"},
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=None),
+        ) as session:
+            requests_by_scenario = scenario_requests(session, options)
+            for scenario in scenarios:
+                fn = requests_by_scenario[scenario]
+                # Warm up both paths.
+                await run_concurrently(10, 1, lambda: fn(direct_url))
+                await run_concurrently(10, 1, lambda: fn(proxy_url))
+
+                direct, direct_rps, direct_cpu = await measure(
+                    fn, direct_url, latency_requests, requests, concurrency
+                )
+                proxied, proxy_rps, proxy_cpu = await measure(
+                    fn, proxy_url, latency_requests, requests, concurrency
+                )
+                results.append(
+                    ScenarioResults(
+                        scenario=scenario,
+                        direct_p50_ms=percentile_ms(direct, 50),
+                        direct_p99_ms=percentile_ms(direct, 99),
+                        proxy_p50_ms=percentile_ms(proxied, 50),
+                        proxy_p99_ms=percentile_ms(proxied, 99),
+                        added_p50_ms=percentile_ms(proxied, 50)
+                        - percentile_ms(direct, 50),
+                        added_p99_ms=percentile_ms(proxied, 99)
+                        - percentile_ms(direct, 99),
+                        direct_max_rps=direct_rps,
+                        proxy_max_rps=proxy_rps,
+                        added_cpu_ms_per_request=(proxy_cpu - direct_cpu) * 1000,
+                    )
+                )
+    finally:
+        server.should_exit = True
+        worker.should_exit = True
+        await server_task
+        await worker_task
+        for task in server_tasks:
+            task.cancel()
+        await asyncio.gather(*server_tasks, return_exceptions=True)
+        await backend.cleanup()
+        await get_engine().dispose()
+
+    return BenchmarkResults(
+        backend=options,
+        requests=requests,
+        concurrency=concurrency,
+        scenarios=results,
+    )
+
+
+def output_benchmark_results_pretty(results: BenchmarkResults):
+    print("============ Proxy Overhead Benchmark ============")
+    print(f"{'Requests per scenario:':<40}{results.requests}")
+    print(f"{'Concurrency:':<40}{results.concurrency}")
+    print(f"{'Backend latency (ms):':<40}{results.backend.latency_ms}")
+    for scenario in results.scenarios:
+        print(f"---------------- {scenario.scenario} ----------------")
+        print(
+            f"{'Direct p50/p99 (ms):':<40}"
+            f"{scenario.direct_p50_ms:.3f} / {scenario.direct_p99_ms:.3f}"
+        )
+        print(
+            f"{'Via GPUStack p50/p99 (ms):':<40}"
+            f"{scenario.proxy_p50_ms:.3f} / {scenario.proxy_p99_ms:.3f}"
+        )
+        print(
+            f"{'Added p50/p99 (ms):':<40}"
+            f"{scenario.added_p50_ms:.3f} / {scenario.added_p99_ms:.3f}"
+        )
+        print(
+            f"{'Max RPS direct/via GPUStack:':<40}"
+            f"{scenario.direct_max_rps:.1f} / {scenario.proxy_max_rps:.1f}"
+        )
+        print(
+            f"{'Added CPU per request (ms):':<40}"
+            f"{scenario.added_cpu_ms_per_request:.3f}"
+        )
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the overhead of the GPUStack server and worker proxy"
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+        help="Request paths to benchmark",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=500,
+        help="Number of requests of the max RPS run of each scenario",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="Number of concurrent requests"
+    )
+    parser.add_argument(
+        "--latency-requests",
+        type=int,
+        default=200,
+        help="Number of sequential requests used to measure latency",
+    )
+    parser.add_argument(
+        "--backend-latency-ms",
+        type=float,
+        default=0,
+        help="Latency of the fake backend before responding",
+    )
+    parser.add_argument(
+        "--tokens",
+        type=int,
+        default=64,
+        help="Completion tokens of the fake backend",
+    )
+    parser.add_argument(
+        "--token-interval-ms",
+        type=float,
+        default=0,
+        help="Delay between streamed tokens of the fake backend",
+    )
+    parser.add_argument(
+        "--embedding-dimensions",
+        type=int,
+        default=1024,
+        help="Dimensions of the embeddings returned by the fake backend",
+    )
+    parser.add_argument(
+        "--audio-size",
+        type=int,
+        default=256 * 1024,
+        help="Bytes of the audio file uploaded in the multipart scenario",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Output results in JSON format"
+    )
+    args = parser.parse_args()
+
+    backend_options = BackendOptions(
+        latency_ms=args.backend_latency_ms,
+        tokens=args.tokens,
+        token_interval_ms=args.token_interval_ms,
+        embedding_dimensions=args.embedding_dimensions,
+        audio_size=args.audio_size,
+    )
+    results = asyncio.run(
+        main(
+            prepare_config(),
+            backend_options,
+            args.scenarios,
+            args.requests,
+            args.concurrency,
+            args.latency_requests,
+        )
+    )
+    if args.json:
+        print(json.dumps(asdict(results), indent=2))
+    else:
+        output_benchmark_results_pretty(results)
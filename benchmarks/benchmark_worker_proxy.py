@@ -0,0 +1,327 @@
+"""
+Benchmark the worker proxy (/proxy/{path}) against a local fake upstream.
+
+The worker proxy router and a fake inference server are started in-process,
+then the same requests are sent directly to the upstream and through the
+proxy. Reports upload/download throughput in bytes/sec and the latency the
+proxy adds per request.
+
+Requires the gpustack package to be importable, e.g. run from the repository
+root: python benchmarks/benchmark_worker_proxy.py
+"""
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+import json
+import logging
+import socket
+import time
+from typing import List, Tuple
+
+import aiohttp
+from aiohttp import web
+import numpy
+import uvicorn
+from fastapi import FastAPI
+
+from gpustack.api import exceptions
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
+from gpustack.routes.worker import proxy
+
+logging.basicConfig(
+    level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+TOKEN = "benchmark"
+CHUNK_SIZE = 64 * 1024
+PAYLOAD = b"x" * CHUNK_SIZE
+
+
+@dataclass
+class ThroughputResults:
+    direct_bytes_per_second: float
+    proxy_bytes_per_second: float
+
+
+@dataclass
+class OverheadResults:
+    direct_p50_ms: float
+    direct_p99_ms: float
+    proxy_p50_ms: float
+    proxy_p99_ms: float
+    added_p50_ms: float
+    added_p99_ms: float
+
+
+@dataclass
+class BenchmarkResults:
+    payload_size: int
+    concurrency: int
+    download: ThroughputResults
+    upload: ThroughputResults
+    overhead: OverheadResults
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_upstream(port: int) -> web.AppRunner:
+    async def download(request: web.Request):
+        size = int(request.match_info["size"])
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        while size > 0:
+            await resp.write(PAYLOAD[: min(size, CHUNK_SIZE)])
+            size -= CHUNK_SIZE
+        await resp.write_eof()
+        return resp
+
+    async def upload(request: web.Request):
+        received = 0
+        async for chunk in request.content.iter_any():
+            received += len(chunk)
+        return web.json_response({"received": received})
+
+    async def ping(request: web.Request):
+        return web.json_response({"object": "list", "data": []})
+
+    app = web.Application()
+    app.router.add_get("/download/{size}", download)
+    app.router.add_post("/upload", upload)
+    app.router.add_get("/ping", ping)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def create_proxy_app() -> FastAPI:
+    # Mirrors the worker API server setup.
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.http_client = proxy_connection_pool.new_client_session()
+        yield
+        await app.state.http_client.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.token = TOKEN
+    app.include_router(proxy.router)
+    exceptions.register_handlers(app)
+    return app
+
+
+async def start_proxy(port: int) -> Tuple[uvicorn.Server, asyncio.Task]:
+    config = uvicorn.Config(
+        create_proxy_app(),
+        host="127.0.0.1",
+        port=port,
+        access_log=False,
+        log_level="error",
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def run_concurrently(total: int, concurrency: int, fn) -> List[float]:
+    """Run `fn` `total` times, returning per-request latencies in seconds."""
+    latencies = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            await fn()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def measure_download(session, base_url, size, requests, concurrency):
+    async def fn():
+        async with session.get(f"{base_url}/download/{size}") as resp:
+            received = 0
+            async for chunk in resp.content.iter_any():
+                received += len(chunk)
+            assert resp.status == 200 and received == size, resp.status
+
+    start = time.perf_counter()
+    await run_concurrently(requests, concurrency, fn)
+    return size * requests / (time.perf_counter() - start)
+
+
+async def measure_upload(session, base_url, size, requests, concurrency):
+    async def body():
+        remaining = size
+        while remaining > 0:
+            yield PAYLOAD[: min(remaining, CHUNK_SIZE)]
+            remaining -= CHUNK_SIZE
+
+    async def fn():
+        async with session.post(f"{base_url}/upload", data=body()) as resp:
+            result = await resp.json(content_type=None)
+            assert result.get("received") == size, result
+
+    start = time.perf_counter()
+    await run_concurrently(requests, concurrency, fn)
+    return size * requests / (time.perf_counter() - start)
+
+
+async def measure_latency(session, base_url, requests) -> List[float]:
+    async def fn():
+        async with session.get(f"{base_url}/ping") as resp:
+            await resp.read()
+            assert resp.status == 200, resp.status
+
+    # Sequential requests, so the numbers are free of queuing effects.
+    return await run_concurrently(requests, 1, fn)
+
+
+def percentile_ms(latencies: List[float], q: float) -> float:
+    return float(numpy.percentile(latencies, q)) * 1000
+
+
+async def main(
+    payload_size: int,
+    requests: int,
+    concurrency: int,
+    latency_requests: int,
+) -> BenchmarkResults:
+    upstream_port, proxy_port = free_port(), free_port()
+    upstream = await start_upstream(upstream_port)
+    server, server_task = await start_proxy(proxy_port)
+
+    direct_url = f"http://127.0.0.1:{upstream_port}"
+    proxy_url = f"http://127.0.0.1:{proxy_port}/proxy"
+    headers = {"Authorization": f"Bearer {TOKEN}", "X-Target-Port": str(upstream_port)}
+
+    try:
+        async with aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=None),
+        ) as session:
+            # Warm up both paths.
+            await measure_latency(session, direct_url, 10)
+            await measure_latency(session, proxy_url, 10)
+
+            download = ThroughputResults(
+                direct_bytes_per_second=await measure_download(
+                    session, direct_url, payload_size, requests, concurrency
+                ),
+                proxy_bytes_per_second=await measure_download(
+                    session, proxy_url, payload_size, requests, concurrency
+                ),
+            )
+            upload = ThroughputResults(
+                direct_bytes_per_second=await measure_upload(
+                    session, direct_url, payload_size, requests, concurrency
+                ),
+                proxy_bytes_per_second=await measure_upload(
+                    session, proxy_url, payload_size, requests, concurrency
+                ),
+            )
+
+            direct = await measure_latency(session, direct_url, latency_requests)
+            proxied = await measure_latency(session, proxy_url, latency_requests)
+            overhead = OverheadResults(
+                direct_p50_ms=percentile_ms(direct, 50),
+                direct_p99_ms=percentile_ms(direct, 99),
+                proxy_p50_ms=percentile_ms(proxied, 50),
+                proxy_p99_ms=percentile_ms(proxied, 99),
+                added_p50_ms=percentile_ms(proxied, 50) - percentile_ms(direct, 50),
+                added_p99_ms=percentile_ms(proxied, 99) - percentile_ms(direct, 99),
+            )
+    finally:
+        server.should_exit = True
+        await server_task
+        await upstream.cleanup()
+
+    return BenchmarkResults(
+        payload_size=payload_size,
+        concurrency=concurrency,
+        download=download,
+        upload=upload,
+        overhead=overhead,
+    )
+
+
+def fmt_rate(bytes_per_second: float) -> str:
+    return f"{bytes_per_second / 1024 / 1024:.2f} MiB/s"
+
+
+def output_benchmark_results_pretty(results: BenchmarkResults):
+    print("============ Worker Proxy Benchmark ============")
+    print(f"{'Payload size (bytes):':<40}{results.payload_size}")
+    print(f"{'Concurrency:':<40}{results.concurrency}")
+    for name, throughput in (
+        ("Download", results.download),
+        ("Upload", results.upload),
+    ):
+        print(f"---------------- {name} ----------------")
+        print(f"{'Direct:':<40}{fmt_rate(throughput.direct_bytes_per_second)}")
+        print(f"{'Via proxy:':<40}{fmt_rate(throughput.proxy_bytes_per_second)}")
+    overhead = results.overhead
+    print("------------- Per-request latency -------------")
+    print(
+        f"{'Direct p50/p99 (ms):':<40}"
+        f"{overhead.direct_p50_ms:.3f} / {overhead.direct_p99_ms:.3f}"
+    )
+    print(
+        f"{'Via proxy p50/p99 (ms):':<40}"
+        f"{overhead.proxy_p50_ms:.3f} / {overhead.proxy_p99_ms:.3f}"
+    )
+    print(
+        f"{'Added p50/p99 (ms):':<40}"
+        f"{overhead.added_p50_ms:.3f} / {overhead.added_p99_ms:.3f}"
+    )
+    print("=" * 48)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the worker proxy")
+    parser.add_argument(
+        "--payload-size",
+        type=int,
+        default=64 * 1024 * 1024,
+        help="Bytes per upload/download request",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=16,
+        help="Number of upload/download requests",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Number of concurrent requests"
+    )
+    parser.add_argument(
+        "--latency-requests",
+        type=int,
+        default=1000,
+        help="Number of small requests used to measure per-request overhead",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Output results in JSON format"
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        main(args.payload_size, args.requests, args.concurrency, args.latency_requests)
+    )
+    if args.json:
+        print(json.dumps(asdict(results), indent=2))
+    else:
+        output_benchmark_results_pretty(results)
@@ -1,10 +1,9 @@
-import uuid
-from datetime import datetime, timezone
+import asyncio
 import logging
 from fastapi import Depends, Request
 from gpustack.config.config import Config
 from gpustack.server.db import get_session
-from typing import Annotated, Optional, Tuple
+from typing import Annotated, Optional, Set
 from fastapi.security import (
     APIKeyCookie,
     HTTPAuthorizationCredentials,
@@ -18,14 +17,10 @@ from gpustack.api.exceptions import (
     InternalServerErrorException,
     UnauthorizedException,
 )
-from gpustack.schemas.api_keys import ApiKey
+from gpustack.api.principal_cache import Principal, principal_cache
 from gpustack.schemas.users import User, UserRole
-from gpustack.security import (
-    API_KEY_PREFIX,
-    JWTManager,
-    verify_hashed_secret,
-)
-from gpustack.server.services import APIKeyService, UserService
+from gpustack.security import JWTManager, verify_hashed_secret
+from gpustack.server.services import UserService
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +50,7 @@ async def get_current_user(
     if hasattr(request.state, "user"):
         user: User = getattr(request.state, "user")
         return user
-    api_key: Optional[ApiKey] = None
+    principal: Optional[Principal] = None
     user = None
     if basic_credentials and is_system_user(basic_credentials.username):
         server_config: Config = request.app.state.server_config
@@ -66,7 +61,8 @@ async def get_current_user(
         jwt_manager: JWTManager = request.app.state.jwt_manager
         user = await get_user_from_jwt_token(session, jwt_manager, cookie_token)
     elif bearer_token:
-        user, api_key = await get_user_from_bearer_token(session, bearer_token)
+        principal = await get_principal_from_bearer_token(bearer_token)
+        user = principal.user if principal else None
 
     if user is None and request.client.host == "127.0.0.1":
         server_config: Config = request.app.state.server_config
@@ -79,10 +75,10 @@ async def get_current_user(
         if not user.is_active:
             raise UnauthorizedException(message="User account is deactivated")
         request.state.user = user
-        access_key = None if api_key is None else api_key.access_key
-        request.state.user_allow_model_names = await UserService(
-            session
-        ).get_user_accessible_model_names(user.id, access_key)
+        request.state.api_key = principal.api_key if principal else None
+        request.state.user_allow_model_names = await get_allowed_model_names(
+            session, user, principal
+        )
         return user
 
     raise credentials_exception
@@ -183,45 +179,21 @@ async def get_user_from_jwt_token(
     return user
 
 
-def parse_uuid(value: str) -> Optional[str]:
-    try:
-        uuid.UUID(value)
-        return value
-    except ValueError:
-        return None
-
-
-async def get_user_from_bearer_token(
-    session: AsyncSession, bearer_token: HTTPAuthorizationCredentials
-) -> Tuple[Optional[User], Optional[ApiKey]]:
+async def get_principal_from_bearer_token(
+    bearer_token: HTTPAuthorizationCredentials,
+) -> Optional[Principal]:
     try:
-        parts = bearer_token.credentials.split("_")
-        if len(parts) == 3 and parts[0] == API_KEY_PREFIX:
-            access_key = parts[1]
-            secret_key = parts[2]
-            worker_uuid = parse_uuid(access_key)
-            if worker_uuid is not None:
-                access_key = ""
-
-            api_key = await APIKeyService(session).get_by_access_key(access_key)
-            if (
-                api_key is not None
-                and verify_hashed_secret(api_key.hashed_secret_key, secret_key)
-                and (
-                    api_key.expires_at is None
-                    or api_key.expires_at > datetime.now(timezone.utc)
-                )
-            ):
-                user: Optional[User] = await UserService(session).get_by_id(
-                    user_id=api_key.user_id,
-                    worker_uuid=worker_uuid,
-                )
-                if user is not None:
-                    return user, api_key
+        return await principal_cache.authenticate(bearer_token.credentials)
     except Exception as e:
         raise InternalServerErrorException(message=f"Failed to get user: {e}")
 
-    return None, None
+
+async def get_allowed_model_names(
+    session: AsyncSession, user: User, principal: Optional[Principal]
+) -> Set[str]:
+    if principal is not None:
+        return principal.allowed_model_names
+    return await UserService(session).get_user_accessible_model_names(user.id, None)
 
 
 async def authenticate_user(
@@ -231,7 +203,9 @@ async def authenticate_user(
     if not user:
         raise UnauthorizedException(message="Incorrect username or password")
 
-    if not verify_hashed_secret(user.hashed_password, password):
+    if not await asyncio.to_thread(
+        verify_hashed_secret, user.hashed_password, password
+    ):
         raise UnauthorizedException(message="Incorrect username or password")
 
     if not user.is_active:
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -7,10 +7,17 @@ from pydantic import BaseModel
 
 
 class HTTPException(Exception):
-    def __init__(self, status_code: int, reason: str, message: str):
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        message: str,
+        headers: Optional[Dict[str, str]] = None,
+    ):
         self.status_code = status_code
         self.reason = reason
         self.message = message
+        self.headers = headers
 
 
 class OpenAIAPIException(HTTPException):
@@ -24,10 +31,10 @@ def http_exception_factory(
 ):
     class_name = reason + "Exception"
 
-    def init(self, message=default_message, is_openai_exception=False):
+    def init(self, message=default_message, is_openai_exception=False, headers=None):
         if is_openai_exception:
             self.__class__.__bases__ = (OpenAIAPIException,)
-        super(self.__class__, self).__init__(status_code, reason, message)
+        super(self.__class__, self).__init__(status_code, reason, message, headers)
 
     return type(
         class_name,
@@ -62,6 +69,9 @@ InternalServerErrorException = http_exception_factory(
     "InternalServerError",
     "Internal server error",
 )
+TooManyRequestsException = http_exception_factory(
+    status.HTTP_429_TOO_MANY_REQUESTS, "TooManyRequests", "Too many requests"
+)
 ServiceUnavailableException = http_exception_factory(
     status.HTTP_503_SERVICE_UNAVAILABLE, "ServiceUnavailable", "Service unavailable"
 )
@@ -169,6 +179,7 @@ def register_handlers(app: FastAPI):
                 reason=exc.reason,
                 message=exc.message,
             ).model_dump(),
+            headers=exc.headers,
         )
 
     @app.exception_handler(OpenAIAPIException)
@@ -185,6 +196,7 @@ def register_handlers(app: FastAPI):
                     "type": exc.reason,
                 }
             },
+            headers=exc.headers,
         )
 
     @app.exception_handler(RequestValidationError)
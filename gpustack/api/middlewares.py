@@ -1,12 +1,16 @@
-from datetime import date, datetime, timezone
+from datetime import datetime, timezone
 import json
 import logging
 import time
-from typing import Type, Union
-from fastapi import Request, Response, status
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Type, Union
+from fastapi import Request, status
+from fastapi.responses import FileResponse, JSONResponse
 from jwt import DecodeError, ExpiredSignatureError
+from pydantic import TypeAdapter
+from starlette.datastructures import Headers
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from openai.types.chat import ChatCompletion, ChatCompletionChunk
 from openai.types import CompletionUsage
 from openai.types.audio.transcription_create_response import (
@@ -16,17 +20,18 @@ from openai.types.create_embedding_response import (
     Usage as EmbeddingUsage,
 )
 from gpustack.api.exceptions import ErrorResponse
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.http_proxy.rate_limit import rate_limiter, request_rate_limits
+from gpustack.http_proxy.sse import SSEUsageScanner
+from gpustack.http_proxy.usage import JSONUsageScanner
 from gpustack.routes.rerank import RerankResponse, RerankUsage
 from gpustack.schemas.images import ImageGenerationChunk, ImagesResponse
-from gpustack.schemas.model_usage import ModelUsage, OperationEnum
+from gpustack.schemas.model_usage import OperationEnum
 from gpustack.schemas.models import Model
 from gpustack.schemas.users import User
 from gpustack.security import JWT_TOKEN_EXPIRE_MINUTES, JWTManager
 from gpustack.api.auth import SESSION_COOKIE_NAME
-from gpustack.server.db import get_engine
-from sqlmodel.ext.asyncio.session import AsyncSession
-
-from gpustack.server.services import ModelUsageService
+from gpustack.server.usage_buffer import usage_aggregator
 from gpustack.api.types.openai_ext import CreateEmbeddingResponseExt, CompletionExt
 
 
@@ -50,80 +55,68 @@ class RequestTimeMiddleware(BaseHTTPMiddleware):
         return response
 
 
-class ModelUsageMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        if response.status_code == 200:
-            path = request.url.path
-            if path == "/v1-openai/chat/completions" or path == "/v1/chat/completions":
-                return await process_request(
-                    request, response, ChatCompletion, OperationEnum.CHAT_COMPLETION
-                )
-            elif path == "/v1-openai/completions" or path == "/v1/completions":
-                return await process_request(
-                    request, response, CompletionExt, OperationEnum.COMPLETION
-                )
-            elif path == "/v1-openai/embeddings" or path == "/v1/embeddings":
-                return await process_request(
-                    request,
-                    response,
-                    CreateEmbeddingResponseExt,
-                    OperationEnum.EMBEDDING,
-                )
-            elif (
-                path == "/v1-openai/images/generations"
-                or path == "/v1/images/generations"
-                or path == "/v1-openai/images/edits"
-                or path == "/v1/images/edits"
-            ):
-                return await process_request(
-                    request,
-                    response,
-                    ImagesResponse,
-                    OperationEnum.IMAGE_GENERATION,
-                )
-            elif path == "/v1-openai/audio/speech" or path == "/v1/audio/speech":
-                return await process_request(
-                    request,
-                    response,
-                    FileResponse,
-                    OperationEnum.AUDIO_SPEECH,
-                )
-            elif (
-                path == "/v1-openai/audio/transcriptions"
-                or path == "/v1/audio/transcriptions"
-            ):
-                return await process_request(
-                    request,
-                    response,
-                    Transcription,
-                    OperationEnum.AUDIO_TRANSCRIPTION,
-                )
-            elif request.url.path == "/v1/rerank":
-                return await process_request(
-                    request,
-                    response,
-                    RerankResponse,
-                    OperationEnum.RERANK,
-                )
-
-        return response
-
-
-async def process_request(
+_USAGE_ENDPOINTS = {
+    "chat/completions": (ChatCompletion, OperationEnum.CHAT_COMPLETION),
+    "completions": (CompletionExt, OperationEnum.COMPLETION),
+    "embeddings": (CreateEmbeddingResponseExt, OperationEnum.EMBEDDING),
+    "images/generations": (ImagesResponse, OperationEnum.IMAGE_GENERATION),
+    "images/edits": (ImagesResponse, OperationEnum.IMAGE_GENERATION),
+    "audio/speech": (FileResponse, OperationEnum.AUDIO_SPEECH),
+    "audio/transcriptions": (Transcription, OperationEnum.AUDIO_TRANSCRIPTION),
+}
+
+# Request path to the response class and operation recorded for it.
+USAGE_ROUTES: Dict[str, Tuple[type, OperationEnum]] = {
+    f"{prefix}/{endpoint}": value
+    for prefix in ("/v1", "/v1-openai")
+    for endpoint, value in _USAGE_ENDPOINTS.items()
+}
+USAGE_ROUTES["/v1/rerank"] = (RerankResponse, OperationEnum.RERANK)
+
+
+class ModelUsageMiddleware:
+    """
+    Records model usage of successful inference responses.
+
+    This is a pure ASGI middleware: response body messages are passed on as
+    they are sent by the endpoint. Streaming responses are scanned for SSE
+    frames carrying usage, other responses keep a bounded window of the body
+    to find the usage object once the body is complete.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        route = USAGE_ROUTES.get(scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        response_class, operation = route
+        recorder = None
+
+        async def send_with_usage(message: Message):
+            nonlocal recorder
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    recorder = new_usage_recorder(
+                        request, message, response_class, operation
+                    )
+            elif message["type"] == "http.response.body" and recorder is not None:
+                await recorder.send_body(message, send)
+                return
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_usage)
+
+
+def new_usage_recorder(
     request: Request,
-    response: StreamingResponse,
-    response_class: Type[
-        Union[
-            ChatCompletion,
-            CompletionExt,
-            CreateEmbeddingResponseExt,
-            RerankResponse,
-            ImagesResponse,
-            FileResponse,
-            Transcription,
-        ]
-    ],
+    start_message: Message,
+    response_class: type,
     operation: OperationEnum,
 ):
     stream: bool = getattr(request.state, "stream", False)
@@ -132,29 +125,123 @@ async def process_request(
             response_class = ChatCompletionChunk
         if response_class == ImagesResponse:
             response_class = ImageGenerationChunk
-        return await handle_streaming_response(
-            request, response, response_class, operation
-        )
-    else:
-        response_body = b"".join([chunk async for chunk in response.body_iterator])
+        # Usage frames may be rewritten, the length is not known up front.
+        start_message["headers"] = [
+            (key, value)
+            for key, value in start_message.get("headers", [])
+            if key.lower() != b"content-length"
+        ]
+        return StreamingUsageRecorder(request, response_class, operation)
+
+    content_type = Headers(raw=start_message.get("headers", [])).get("content-type", "")
+    return ResponseUsageRecorder(
+        request,
+        response_class,
+        operation,
+        content_type.lower().startswith("application/json"),
+    )
+
+
+class ResponseUsageRecorder:
+    """
+    Records usage of a non-streaming response once its body is sent.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response_class: type,
+        operation: OperationEnum,
+        is_json: bool,
+    ):
+        self._request = request
+        self._response_class = response_class
+        self._operation = operation
+        self._scanner = JSONUsageScanner() if is_json else None
+
+    async def send_body(self, message: Message, send: Send):
+        if self._scanner is not None:
+            self._scanner.feed(message.get("body", b""))
+
+        await send(message)
+
+        if not message.get("more_body", False):
+            await self._record()
+
+    async def _record(self):
         try:
             usage = None
-            if (
-                response.headers.get("content-type")
-                .lower()
-                .startswith("application/json")
-            ):
-                response_dict = json.loads(response_body)
-                response_instance = response_class(**response_dict)
-                if hasattr(response_instance, "usage"):
-                    usage = response_instance.usage
-
-            await record_model_usage(request, usage, operation)
+            if self._scanner is not None:
+                usage = parse_usage(self._response_class, self._scanner.usage())
+            await record_model_usage(self._request, usage, self._operation)
         except Exception as e:
             logger.error(f"Error processing model usage: {e}")
-        response = Response(content=response_body, headers=dict(response.headers))
 
-    return response
+
+class StreamingUsageRecorder:
+    """
+    Forwards a streaming response, only the SSE frames carrying usage are
+    parsed and recorded.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response_class: Type[
+            Union[ChatCompletionChunk, CompletionExt, ImageGenerationChunk]
+        ],
+        operation: OperationEnum,
+    ):
+        self._request = request
+        self._response_class = response_class
+        self._operation = operation
+        self._scanner = SSEUsageScanner()
+
+    async def send_body(self, message: Message, send: Send):
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if body and not hasattr(self._request.state, 'first_token_time'):
+            self._request.state.first_token_time = datetime.now(timezone.utc)
+
+        segments = []
+        for segment, is_usage_frame in self._scanner.feed(body):
+            if not is_usage_frame:
+                segments.append(segment)
+                continue
+            async for processed_chunk in process_usage_frame(
+                segment, self._request, self._response_class, self._operation
+            ):
+                segments.append(processed_chunk)
+
+        if not more_body:
+            segments.extend(segment for segment, _ in self._scanner.flush())
+
+        if not segments and more_body:
+            # Waiting for the rest of a frame.
+            return
+
+        await send(
+            {
+                "type": "http.response.body",
+                "body": segments[0] if len(segments) == 1 else b"".join(segments),
+                "more_body": more_body,
+            }
+        )
+
+
+def parse_usage(response_class: type, usage: Optional[dict]):
+    """
+    Validate a usage object with the usage type of the response class.
+    """
+    model_fields = getattr(response_class, "model_fields", None) or {}
+    if usage is None or "usage" not in model_fields:
+        return None
+    return _usage_adapter(model_fields["usage"].annotation).validate_python(usage)
+
+
+@lru_cache(maxsize=None)
+def _usage_adapter(annotation) -> TypeAdapter:
+    return TypeAdapter(annotation)
 
 
 async def record_model_usage(
@@ -171,49 +258,34 @@ async def record_model_usage(
 
     user: User = request.state.user
     model: Model = request.state.model
-    fields = {
-        "user_id": user.id,
-        "model_id": model.id,
-        "date": date.today(),
-        "operation": operation,
-    }
-    model_usage = ModelUsage(
-        **fields,
-        completion_token_count=completion_tokens,
-        prompt_token_count=prompt_tokens,
-        request_count=1,
+    usage_aggregator.add(
+        user.id,
+        model.id,
+        operation,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
     )
-    async with AsyncSession(get_engine()) as session:
-        model_usage_service = ModelUsageService(session)
-        current_model_usage = await model_usage_service.get_by_fields(fields)
-        if current_model_usage:
-            await model_usage_service.update(
-                current_model_usage, completion_tokens, prompt_tokens
-            )
-        else:
-            await model_usage_service.create(model_usage)
+    rate_limiter.debit_tokens(request_rate_limits(request), completion_tokens)
 
 
-async def handle_streaming_response(
-    request: Request,
-    response: StreamingResponse,
-    response_class: Type[
-        Union[ChatCompletionChunk, CompletionExt, ImageGenerationChunk]
-    ],
+async def process_usage_frame(
+    frame: memoryview,
+    request,
+    response_class,
     operation: OperationEnum,
 ):
-    async def streaming_generator():
-        async for chunk in response.body_iterator:
-            try:
-                async for processed_chunk in process_chunk(
-                    chunk, request, response_class, operation
-                ):
-                    yield processed_chunk
-            except Exception as e:
-                logger.error(f"Error processing streaming response: {e}")
-                yield chunk
-
-    return StreamingResponse(streaming_generator(), headers=response.headers)
+    chunk = frame.tobytes()
+    if b"\r" in chunk:
+        # Frames are parsed and re-emitted with LF line endings.
+        chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    try:
+        async for processed_chunk in process_chunk(
+            chunk, request, response_class, operation
+        ):
+            yield processed_chunk
+    except Exception as e:
+        logger.error(f"Error processing streaming response: {e}")
+        yield chunk
 
 
 async def process_chunk(
@@ -248,6 +320,7 @@ async def process_chunk(
 
             if is_usage_chunk(response_chunk):
                 await record_model_usage(request, response_chunk.usage, operation)
+                observe_instance_latency(request, response_chunk)
 
                 # Fill rate metrics. These are extended info not included in OAI APIs.
                 # llama-box provides them out-of-the-box. Align with other backends here.
@@ -270,7 +343,11 @@ def should_add_metrics(response_dict):
     return 'prompt_tokens' in usage and 'tokens_per_second' not in usage
 
 
-def add_metrics(response_dict, request, response_chunk):
+def compute_latency_metrics(request, completion_tokens: int) -> Tuple[float, float]:
+    """
+    Return the time to first token and time per output token of a streaming
+    request, both in milliseconds.
+    """
     now = datetime.now(timezone.utc)
     time_to_first_token_ms = (
         request.state.first_token_time - request.state.start_time
@@ -278,7 +355,35 @@ def add_metrics(response_dict, request, response_chunk):
     time_per_output_token_ms = (
         (now - request.state.first_token_time).total_seconds()
         * 1000
-        / max(response_chunk.usage.completion_tokens, 1)
+        / max(completion_tokens, 1)
+    )
+    return time_to_first_token_ms, time_per_output_token_ms
+
+
+def observe_instance_latency(request, response_chunk):
+    """
+    Feed the observed latency of a streaming request to the load balancer.
+    """
+    instance = getattr(request.state, "instance", None)
+    if instance is None or not hasattr(request.state, "start_time"):
+        return
+
+    completion_tokens = getattr(response_chunk.usage, "completion_tokens", 0) or 0
+    time_to_first_token_ms, time_per_output_token_ms = compute_latency_metrics(
+        request, completion_tokens
+    )
+    load_balancer.latency.observe(
+        instance.id,
+        time_to_first_token_ms=time_to_first_token_ms,
+        time_per_output_token_ms=(
+            time_per_output_token_ms if completion_tokens > 0 else None
+        ),
+    )
+
+
+def add_metrics(response_dict, request, response_chunk):
+    time_to_first_token_ms, time_per_output_token_ms = compute_latency_metrics(
+        request, response_chunk.usage.completion_tokens
     )
     tokens_per_second = (
         1000 / time_per_output_token_ms if time_per_output_token_ms > 0 else 0
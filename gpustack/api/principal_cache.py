@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from gpustack.schemas.api_keys import ApiKey
+from gpustack.schemas.users import User
+from gpustack.security import API_KEY_PREFIX, verify_hashed_secret
+from gpustack.server.bus import Event, EventType, Subscriber, event_bus
+from gpustack.server.db import get_engine
+from gpustack.server.services import UserService
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 16384
+
+# Model changes that may change which models a user can access.
+_MODEL_ACCESS_FIELDS = {"name", "deleted_at", "access_policy", "users"}
+
+
+@dataclass
+class Principal:
+    user: User
+    api_key: ApiKey
+    allowed_model_names: Set[str]
+
+    def is_expired(self) -> bool:
+        expires_at = self.api_key.expires_at
+        return expires_at is not None and expires_at <= datetime.now(timezone.utc)
+
+
+@dataclass
+class _Entry:
+    principal: Principal
+    # The secret hash the token was verified against. A stale entry is
+    # reloaded without verifying the token again unless the hash changed.
+    verified_hash: str
+    stale: bool = False
+
+
+class PrincipalCache:
+    """
+    Authenticated API key principals by the digest of the bearer token.
+
+    A principal holds the user, the API key and the models allowed to it.
+    Entries are marked stale on API key, user and model access events and
+    reloaded from the database on their next use, so changes apply right
+    away. Argon2 verification of the secret runs in a thread, once per token
+    unless its key is rotated. The cache is only used while the bus is
+    watched.
+    """
+
+    topics = ("apikey", "user", "model", "mymodel")
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Bumped on every invalidation, principals loaded while it changed
+        # are stored stale.
+        self._generation = 0
+        self._watching = False
+
+    async def start(self):
+        """
+        Invalidate entries from bus events until cancelled.
+        """
+        subscribers = {topic: event_bus.subscribe(topic) for topic in self.topics}
+        self._watching = True
+        try:
+            await asyncio.gather(
+                *(
+                    self._watch(topic, subscriber)
+                    for topic, subscriber in subscribers.items()
+                )
+            )
+        finally:
+            self._watching = False
+            self._entries.clear()
+            for topic, subscriber in subscribers.items():
+                event_bus.unsubscribe(topic, subscriber)
+
+    async def _watch(self, topic: str, subscriber: Subscriber):
+        while True:
+            event = await subscriber.receive()
+            try:
+                self.invalidate(topic, event)
+            except Exception as e:
+                logger.error(f"Failed to apply {topic} event to principal cache: {e}")
+
+    async def authenticate(self, token: str) -> Optional[Principal]:
+        """
+        Get the principal of a bearer token, None if the token is not a valid
+        API key.
+        """
+        digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        entry = self._entries.get(digest) if self._watching else None
+        if entry is not None and not entry.stale:
+            self._entries.move_to_end(digest)
+            principal = entry.principal
+        else:
+            task = self._loading.get(digest)
+            if task is None:
+                verified_hash = None if entry is None else entry.verified_hash
+                # Concurrent requests with the same token share the load.
+                task = asyncio.create_task(self._load(digest, token, verified_hash))
+                self._loading[digest] = task
+                task.add_done_callback(lambda _: self._loading.pop(digest, None))
+            principal = await asyncio.shield(task)
+
+        if principal is None or principal.is_expired():
+            return None
+        return principal
+
+    async def _load(
+        self, digest: str, token: str, verified_hash: Optional[str]
+    ) -> Optional[Principal]:
+        generation = self._generation
+        principal, hashed_secret_key = await load_principal(token, verified_hash)
+        if principal is None:
+            self._entries.pop(digest, None)
+            return None
+
+        if self._watching:
+            self._entries[digest] = _Entry(
+                principal=principal,
+                verified_hash=hashed_secret_key,
+                stale=generation != self._generation,
+            )
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, topic: str, event: Event):
+        if event.type == EventType.HEARTBEAT:
+            return
+        if topic == "model" and not _changes_model_access(event):
+            return
+
+        self._generation += 1
+        data_id = getattr(event.data, "id", None)
+        for entry in self._entries.values():
+            principal = entry.principal
+            if (
+                topic == "model"
+                or (topic == "apikey" and principal.api_key.id == data_id)
+                or (topic == "user" and principal.user.id == data_id)
+                or (
+                    topic == "mymodel"
+                    and principal.user.id == getattr(event.data, "user_id", None)
+                )
+            ):
+                entry.stale = True
+
+
+async def load_principal(
+    token: str, verified_hash: Optional[str] = None
+) -> Tuple[Optional[Principal], Optional[str]]:
+    """
+    Load the principal of an API key token from the database. The secret is
+    verified unless the key still has the already verified hash. Returns the
+    principal and the hash of the key secret.
+    """
+    parts = token.split("_")
+    if len(parts) != 3 or parts[0] != API_KEY_PREFIX:
+        return None, None
+    access_key, secret_key = parts[1], parts[2]
+    worker_uuid = parse_uuid(access_key)
+    if worker_uuid is not None:
+        access_key = ""
+
+    async with AsyncSession(get_engine()) as session:
+        api_key = await ApiKey.one_by_field(session, "access_key", access_key)
+        if api_key is None:
+            return None, None
+        hashed_secret_key = api_key.hashed_secret_key
+        if hashed_secret_key != verified_hash and not await asyncio.to_thread(
+            verify_hashed_secret, hashed_secret_key, secret_key
+        ):
+            return None, None
+
+        user_service = UserService(session)
+        user = await user_service.load_by_id(api_key.user_id, worker_uuid)
+        if user is None:
+            return None, None
+        allowed_model_names = await user_service.load_accessible_model_names(
+            user, api_key
+        )
+        session.expunge(api_key)
+
+    principal = Principal(
+        user=user, api_key=api_key, allowed_model_names=allowed_model_names
+    )
+    return principal, hashed_secret_key
+
+
+def _changes_model_access(event: Event) -> bool:
+    if event.type != EventType.UPDATED or not event.changed_fields:
+        return True
+    return not _MODEL_ACCESS_FIELDS.isdisjoint(event.changed_fields)
+
+
+def parse_uuid(value: str) -> Optional[str]:
+    try:
+        uuid.UUID(value)
+        return value
+    except ValueError:
+        return None
+
+
+principal_cache = PrincipalCache()
@@ -22,7 +22,7 @@ class StreamingResponseWithStatusCode(StreamingResponse):
                 await self.body_iterator.__anext__()
             )
 
-            if not isinstance(first_chunk_content, bytes):
+            if isinstance(first_chunk_content, str):
                 first_chunk_content = first_chunk_content.encode(self.charset)
 
             asgi_headers: List[Tuple[bytes, bytes]] = [
@@ -45,7 +45,7 @@ class StreamingResponseWithStatusCode(StreamingResponse):
             )
 
             async for chunk_content, _, _ in self.body_iterator:
-                if not isinstance(chunk_content, bytes):
+                if isinstance(chunk_content, str):
                     chunk_content = chunk_content.encode(self.charset)
                 await send(
                     {
@@ -4,7 +4,7 @@ from typing import Any, Callable, Dict, Optional
 
 import httpx
 from gpustack.api.exceptions import raise_if_response_error
-from gpustack.server.bus import Event
+from gpustack.server.bus import Event, EventType, decode_watch_event
 from gpustack.schemas import *
 
 from .generated_http_client import HTTPClient
@@ -26,10 +26,19 @@ class ModelFileClient:
         callback: Optional[Callable[[Event], None]] = None,
         stop_condition: Optional[Callable[[Event], bool]] = None,
         params: Optional[Dict[str, Any]] = None,
+        delta: bool = False,
     ):
         if params is None:
             params = {}
         params["watch"] = "true"
+        # Updated with the revision of each event, watching again with the
+        # same params resumes after it.
+        params.setdefault("resourceVersion", 0)
+        objects = None
+        if delta:
+            # Updates are sent as merge patches of the objects sent before.
+            params["delta"] = "true"
+            objects = {}
 
         if stop_condition is None:
             stop_condition = lambda event: False
@@ -40,8 +49,11 @@ class ModelFileClient:
             raise_if_response_error(response)
             for line in response.iter_lines():
                 if line:
-                    event_data = json.loads(line)
-                    event = Event(**event_data)
+                    event = decode_watch_event(json.loads(line), objects)
+                    if event.revision:
+                        params["resourceVersion"] = event.revision
+                    if event.type == EventType.HEARTBEAT:
+                        continue
                     if callback:
                         callback(event)
                     if stop_condition(event):
@@ -52,10 +64,19 @@ class ModelFileClient:
         callback: Optional[Callable[[Event], None]] = None,
         stop_condition: Optional[Callable[[Event], bool]] = None,
         params: Optional[Dict[str, Any]] = None,
+        delta: bool = False,
     ):
         if params is None:
             params = {}
         params["watch"] = "true"
+        # Updated with the revision of each event, watching again with the
+        # same params resumes after it.
+        params.setdefault("resourceVersion", 0)
+        objects = None
+        if delta:
+            # Updates are sent as merge patches of the objects sent before.
+            params["delta"] = "true"
+            objects = {}
 
         if stop_condition is None:
             stop_condition = lambda event: False
@@ -72,8 +93,11 @@ class ModelFileClient:
                 try:
                     line = await asyncio.wait_for(lines.__anext__(), timeout=45)
                     if line:
-                        event_data = json.loads(line)
-                        event = Event(**event_data)
+                        event = decode_watch_event(json.loads(line), objects)
+                        if event.revision:
+                            params["resourceVersion"] = event.revision
+                        if event.type == EventType.HEARTBEAT:
+                            continue
                         if callback:
                             callback(event)
                         if stop_condition(event):
@@ -10,9 +10,99 @@ DB_POOL_TIMEOUT = int(os.getenv("GPUSTACK_DB_POOL_TIMEOUT", 30))
 
 # Proxy configuration
 PROXY_TIMEOUT = int(os.getenv("GPUSTACK_PROXY_TIMEOUT_SECONDS", 1800))
+# Forward streaming responses byte-for-byte instead of re-framing each line.
+# Requires backends to delimit SSE events with a blank line.
+PROXY_SSE_PASSTHROUGH = (
+    os.getenv("GPUSTACK_PROXY_SSE_PASSTHROUGH", "true").lower() == "true"
+)
+# Attempts of a request failing with a connection error before any response
+# is sent, including the first one. Retries go to other running instances.
+PROXY_RETRY_MAX_ATTEMPTS = int(os.getenv("GPUSTACK_PROXY_RETRY_MAX_ATTEMPTS", 3))
+# No retry is started once a request has been proxied for this many seconds.
+PROXY_RETRY_BUDGET_SECONDS = float(os.getenv("GPUSTACK_PROXY_RETRY_BUDGET_SECONDS", 10))
+# Seconds a model instance is avoided by load balancing after a failed request.
+PROXY_SUSPECT_SECONDS = float(os.getenv("GPUSTACK_PROXY_SUSPECT_SECONDS", 10))
+# Admission control of proxied requests. Each setting can be overridden per
+# model with the same variable in the model env.
+# Max requests proxied to a model at once, 0 for no limit.
+ADMISSION_MAX_CONCURRENT_REQUESTS = int(
+    os.getenv("GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS", 0)
+)
+# Max requests proxied to each running instance of a model at once, 0 for no
+# limit. The lower of the model and the per-instance limits applies.
+ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE = int(
+    os.getenv("GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE", 0)
+)
+# Max requests waiting for admission per model, others are rejected with 429.
+ADMISSION_MAX_QUEUE_SIZE = int(os.getenv("GPUSTACK_ADMISSION_MAX_QUEUE_SIZE", 100))
+# Max seconds a request waits for admission. Requests expected to wait longer
+# are rejected with 429 and a Retry-After header right away.
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("GPUSTACK_ADMISSION_MAX_WAIT_SECONDS", 30))
+# Weights of tenants sharing a model queue, e.g. "user:1=2,api_key:5=0.5".
+# Tenants default to weight 1.
+ADMISSION_TENANT_WEIGHTS = os.getenv("GPUSTACK_ADMISSION_TENANT_WEIGHTS", "")
+# Cache the results of embeddings and rerank requests per input item, can be
+# enabled per model with the same variable in the model env.
+RESPONSE_CACHE = os.getenv("GPUSTACK_RESPONSE_CACHE", "false").lower() == "true"
+# Max bytes of cached results kept in memory.
+RESPONSE_CACHE_MAX_SIZE = int(
+    os.getenv("GPUSTACK_RESPONSE_CACHE_MAX_SIZE", 256 * 1024 * 1024)
+)
+# Max bytes of cached results spilled to disk under the cache directory once
+# evicted from memory, 0 to disable spilling.
+RESPONSE_CACHE_DISK_MAX_SIZE = int(
+    os.getenv("GPUSTACK_RESPONSE_CACHE_DISK_MAX_SIZE", 0)
+)
+# Merge concurrent embeddings requests of a model into one upstream request,
+# can be enabled per model with the same variable in the model env.
+EMBEDDINGS_COALESCING = (
+    os.getenv("GPUSTACK_EMBEDDINGS_COALESCING", "false").lower() == "true"
+)
+# Milliseconds a batch of embeddings requests waits for more requests.
+EMBEDDINGS_COALESCING_WINDOW_MS = float(
+    os.getenv("GPUSTACK_EMBEDDINGS_COALESCING_WINDOW_MS", 3)
+)
+# Max inputs of a batch of embeddings requests, the batch is sent when full.
+EMBEDDINGS_COALESCING_MAX_BATCH_SIZE = int(
+    os.getenv("GPUSTACK_EMBEDDINGS_COALESCING_MAX_BATCH_SIZE", 64)
+)
+# How the server reaches model instances, can be overridden per model with the
+# same variable in the model env.
+# Options: worker_proxy, direct, auto
+# direct connects to the instance port on the worker, skipping the worker proxy.
+# auto probes the instance port and falls back to the worker proxy.
+PROXY_ROUTING_MODE = os.getenv("GPUSTACK_PROXY_ROUTING_MODE", "worker_proxy")
+# Routing modes by cluster ID, e.g. "1=direct,2=auto".
+PROXY_ROUTING_MODE_CLUSTERS = os.getenv("GPUSTACK_PROXY_ROUTING_MODE_CLUSTERS", "")
+# Seconds between connectivity probes of an instance address in auto mode.
+PROXY_DIRECT_PROBE_INTERVAL = float(
+    os.getenv("GPUSTACK_PROXY_DIRECT_PROBE_INTERVAL", 60)
+)
+# Seconds to wait for a connection when probing an instance address.
+PROXY_DIRECT_PROBE_TIMEOUT = float(os.getenv("GPUSTACK_PROXY_DIRECT_PROBE_TIMEOUT", 2))
+# Default load balancing strategy across model instances, can be overridden per
+# model with the same variable in the model env.
+# Options: round_robin, least_outstanding_requests, prefix_affinity,
+# power_of_two_choices
+LOAD_BALANCING_STRATEGY = os.getenv("GPUSTACK_LOAD_BALANCING_STRATEGY", "round_robin")
+# Number of prompt characters hashed by the prefix_affinity strategy
+PREFIX_AFFINITY_MAX_CHARS = int(os.getenv("GPUSTACK_PREFIX_AFFINITY_MAX_CHARS", 2048))
 
 # HTTP client TCP connector configuration
 TCP_CONNECTOR_LIMIT = int(os.getenv("GPUSTACK_TCP_CONNECTOR_LIMIT", 1000))
+# Keep proxy connections to workers and backends alive between requests.
+# When disabled, every proxied request opens a new connection.
+PROXY_CONNECTION_POOLING = (
+    os.getenv("GPUSTACK_PROXY_CONNECTION_POOLING", "true").lower() == "true"
+)
+# Max connections per host in the proxy connection pool, 0 for no limit.
+PROXY_CONNECTION_LIMIT_PER_HOST = int(
+    os.getenv("GPUSTACK_PROXY_CONNECTION_LIMIT_PER_HOST", 0)
+)
+# Seconds an idle pooled connection is kept. Stay below the 5 seconds
+# keep-alive timeout of uvicorn based workers and backends, so connections
+# are not reused as the peer closes them.
+PROXY_KEEPALIVE_TIMEOUT = float(os.getenv("GPUSTACK_PROXY_KEEPALIVE_TIMEOUT", 4))
 
 # JWT Expiration
 JWT_TOKEN_EXPIRE_MINUTES = int(os.getenv("GPUSTACK_JWT_TOKEN_EXPIRE_MINUTES", 120))
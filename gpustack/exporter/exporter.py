@@ -8,9 +8,12 @@ from prometheus_client.core import (
 )
 import uvicorn
 from gpustack.config.config import Config
+from gpustack.http_proxy.admission import admission_controller
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
 from gpustack.logging import setup_logging
 from gpustack.schemas.clusters import Cluster
 from gpustack.schemas.workers import Worker, WorkerStateEnum
+from gpustack.server.bus import event_bus
 from gpustack.server.db import get_engine
 from gpustack.server.deps import SessionDep
 from gpustack.utils.name import metric_name
@@ -214,6 +217,9 @@ class MetricExporter(Collector):
     def start(self):
         try:
             REGISTRY.register(self)
+            REGISTRY.register(proxy_connection_pool)
+            REGISTRY.register(admission_controller)
+            REGISTRY.register(event_bus)
 
             # Start FastAPI server
             app = FastAPI(
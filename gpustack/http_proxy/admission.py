@@ -0,0 +1,376 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from prometheus_client.core import (
+    CounterMetricFamily,
+    GaugeMetricFamily,
+    SummaryMetricFamily,
+)
+from prometheus_client.registry import Collector
+
+from gpustack.api.exceptions import TooManyRequestsException
+from gpustack.config.envs import (
+    ADMISSION_MAX_CONCURRENT_REQUESTS,
+    ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE,
+    ADMISSION_MAX_QUEUE_SIZE,
+    ADMISSION_MAX_WAIT_SECONDS,
+    ADMISSION_TENANT_WEIGHTS,
+)
+from gpustack.schemas.models import Model
+from gpustack.utils.name import metric_name
+
+logger = logging.getLogger(__name__)
+
+# Finish tags of tenants are pruned once there are more than this many,
+# dropping those behind the virtual time which behave the same as new ones.
+MAX_TRACKED_TENANTS = 10000
+
+
+@dataclass
+class AdmissionLimits:
+    # Max requests proxied to the model at once, 0 for no limit.
+    max_concurrency: int = 0
+    max_queue_size: int = ADMISSION_MAX_QUEUE_SIZE
+    max_wait_seconds: float = ADMISSION_MAX_WAIT_SECONDS
+
+    @classmethod
+    def for_model(cls, model: Model, running_instances: int) -> "AdmissionLimits":
+        """
+        Resolve the limits of a model. Each setting can be overridden in the
+        model env with the same variable as the global default.
+        """
+        max_concurrency = _model_setting(
+            model,
+            "GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS",
+            ADMISSION_MAX_CONCURRENT_REQUESTS,
+            int,
+        )
+        per_instance = _model_setting(
+            model,
+            "GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE",
+            ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE,
+            int,
+        )
+        if per_instance > 0:
+            instance_limit = per_instance * max(running_instances, 1)
+            if max_concurrency <= 0 or instance_limit < max_concurrency:
+                max_concurrency = instance_limit
+
+        return cls(
+            max_concurrency=max_concurrency,
+            max_queue_size=_model_setting(
+                model,
+                "GPUSTACK_ADMISSION_MAX_QUEUE_SIZE",
+                ADMISSION_MAX_QUEUE_SIZE,
+                int,
+            ),
+            max_wait_seconds=_model_setting(
+                model,
+                "GPUSTACK_ADMISSION_MAX_WAIT_SECONDS",
+                ADMISSION_MAX_WAIT_SECONDS,
+                float,
+            ),
+        )
+
+
+def _model_setting(model: Model, name: str, default, parse: Callable[[Any], Any]):
+    """
+    The value of a setting in the model env, or the default if it is not set
+    or invalid.
+    """
+    value = (model.env or {}).get(name)
+    if value is None:
+        return default
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid {name} of model {model.name}: {value}")
+        return default
+
+
+@dataclass(order=True)
+class _Waiter:
+    finish_tag: float
+    seq: int
+    start_tag: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    tenant: str = field(compare=False)
+    # The finish tag of the tenant before the request was queued.
+    previous_finish_tag: Optional[float] = field(compare=False)
+
+
+class AdmissionQueue:
+    """
+    Admission control for the requests of one model.
+
+    Up to `max_concurrency` requests are admitted at once. Others wait in a
+    bounded queue served by start-time fair queuing across tenants (users or
+    API keys), so a tenant sending many requests only gets its weighted share
+    of the freed slots. Requests that would wait longer than the max wait are
+    rejected early.
+    """
+
+    # Smoothing factor of the observed time a request holds a slot.
+    HOLD_TIME_ALPHA = 0.2
+
+    def __init__(self):
+        self.limits = AdmissionLimits()
+        self.in_flight = 0
+        self.waiting = 0
+        self._heap: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._hold_time: Optional[float] = None
+
+        # Metrics
+        self.wait_count = 0
+        self.wait_seconds_sum = 0.0
+        self.rejected = 0
+
+    async def acquire(
+        self, tenant: str, weight: float, limits: AdmissionLimits
+    ) -> Callable[[], None]:
+        """
+        Wait for a slot. Returns an idempotent callback that frees it, or
+        raises TooManyRequestsException.
+        """
+        self.limits = limits
+        # Admitted requests advance the tenant's virtual time too, so a tenant
+        # that bursts while the model is idle is served after the others.
+        start_tag = max(self._virtual_time, self._last_finish.get(tenant, 0.0))
+        finish_tag = start_tag + 1 / weight
+
+        if limits.max_concurrency <= 0 or (
+            self.in_flight < limits.max_concurrency and not self.waiting
+        ):
+            self._last_finish[tenant] = finish_tag
+            self.in_flight += 1
+            return self._release_callback()
+
+        position = self.waiting + 1
+        estimated_wait = self.estimate_wait(position)
+        if position > limits.max_queue_size:
+            self._reject(estimated_wait, "the queue is full")
+        if estimated_wait is not None and estimated_wait > limits.max_wait_seconds:
+            self._reject(estimated_wait, "the estimated wait is too long")
+
+        waiter = _Waiter(
+            finish_tag=finish_tag,
+            seq=next(self._seq),
+            start_tag=start_tag,
+            future=asyncio.get_running_loop().create_future(),
+            tenant=tenant,
+            previous_finish_tag=self._last_finish.get(tenant),
+        )
+        # Later requests of the tenant are queued behind this one.
+        self._last_finish[tenant] = finish_tag
+        heapq.heappush(self._heap, waiter)
+        self.waiting += 1
+
+        enqueued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter.future), limits.max_wait_seconds
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted right as the wait ended.
+                release = self._release_callback()
+                if isinstance(e, asyncio.CancelledError):
+                    release()
+                    raise
+                self._observe_wait(time.monotonic() - enqueued_at)
+                return release
+
+            waiter.future.cancel()
+            self.waiting -= 1
+            self._forfeit(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(self.estimate_wait(self.waiting + 1), "timed out in queue")
+
+        self._observe_wait(time.monotonic() - enqueued_at)
+        return self._release_callback()
+
+    def estimate_wait(self, position: int) -> Optional[float]:
+        """
+        Estimate the seconds a request at the given queue position waits.
+        """
+        if self._hold_time is None or self.limits.max_concurrency <= 0:
+            return None
+        rounds = math.ceil(position / self.limits.max_concurrency)
+        return rounds * self._hold_time
+
+    def _release_callback(self) -> Callable[[], None]:
+        acquired_at = time.monotonic()
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._observe_hold(time.monotonic() - acquired_at)
+            self.in_flight -= 1
+            self._dispatch()
+            self._prune()
+
+        return release
+
+    def _forfeit(self, waiter: _Waiter):
+        """
+        Give the tenant back the virtual time of a request that timed out or
+        was cancelled before it was admitted.
+        """
+        last_finish = self._last_finish.get(waiter.tenant)
+        if last_finish is None:
+            return
+        if last_finish == waiter.finish_tag:
+            if waiter.previous_finish_tag is None:
+                del self._last_finish[waiter.tenant]
+            else:
+                self._last_finish[waiter.tenant] = waiter.previous_finish_tag
+        else:
+            # Later requests of the tenant keep their queued tags.
+            self._last_finish[waiter.tenant] = last_finish - (
+                waiter.finish_tag - waiter.start_tag
+            )
+
+    def _prune(self):
+        if not self.in_flight and not self.waiting:
+            # Nothing to be fair about while the model is idle.
+            self._last_finish.clear()
+            self._virtual_time = 0.0
+        elif len(self._last_finish) > MAX_TRACKED_TENANTS:
+            self._last_finish = {
+                tenant: tag
+                for tenant, tag in self._last_finish.items()
+                if tag > self._virtual_time
+            }
+
+    def _dispatch(self):
+        limit = self.limits.max_concurrency
+        while self._heap and (limit <= 0 or self.in_flight < limit):
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                # Timed out or cancelled.
+                continue
+            self.waiting -= 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self.in_flight += 1
+            waiter.future.set_result(None)
+
+    def _observe_hold(self, seconds: float):
+        if self._hold_time is None:
+            self._hold_time = seconds
+        else:
+            self._hold_time += self.HOLD_TIME_ALPHA * (seconds - self._hold_time)
+
+    def _observe_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_seconds_sum += seconds
+
+    def _reject(self, retry_after: Optional[float], reason: str):
+        self.rejected += 1
+        if retry_after is None:
+            retry_after = self.limits.max_wait_seconds
+        raise TooManyRequestsException(
+            message=f"The model is overloaded, {reason}. Please retry later.",
+            is_openai_exception=True,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class AdmissionController(Collector):
+    """
+    Per-model admission control of the proxy. Queue depth, wait time and
+    rejections are exported as Prometheus metrics.
+    """
+
+    def __init__(self, tenant_weights: Optional[Dict[str, float]] = None):
+        self._queues: Dict[int, AdmissionQueue] = {}
+        self._model_names: Dict[int, str] = {}
+        if tenant_weights is None:
+            tenant_weights = parse_tenant_weights(ADMISSION_TENANT_WEIGHTS)
+        self._tenant_weights = tenant_weights
+
+    async def admit(
+        self, model: Model, tenant: str, running_instances: int
+    ) -> Callable[[], None]:
+        queue = self._queues.get(model.id)
+        if queue is None:
+            queue = self._queues[model.id] = AdmissionQueue()
+        self._model_names[model.id] = model.name
+
+        limits = AdmissionLimits.for_model(model, running_instances)
+        weight = self._tenant_weights.get(tenant, 1.0)
+        return await queue.acquire(tenant, weight, limits)
+
+    def collect(self):
+        labels = ["model_id", "model_name"]
+        in_flight = GaugeMetricFamily(
+            metric_name("admission_in_flight_requests"),
+            "Requests admitted to the model and not yet finished",
+            labels=labels,
+        )
+        queue_depth = GaugeMetricFamily(
+            metric_name("admission_queue_depth"),
+            "Requests waiting for admission to the model",
+            labels=labels,
+        )
+        wait_seconds = SummaryMetricFamily(
+            metric_name("admission_queue_wait_seconds"),
+            "Time admitted requests waited in the queue",
+            labels=labels,
+        )
+        rejected = CounterMetricFamily(
+            metric_name("admission_rejected_requests"),
+            "Requests rejected by admission control",
+            labels=labels,
+        )
+
+        # Snapshot, the exporter runs in another thread.
+        for model_id, queue in list(self._queues.items()):
+            label_values = [str(model_id), self._model_names.get(model_id, "")]
+            in_flight.add_metric(label_values, queue.in_flight)
+            queue_depth.add_metric(label_values, queue.waiting)
+            wait_seconds.add_metric(
+                label_values, queue.wait_count, queue.wait_seconds_sum
+            )
+            rejected.add_metric(label_values, queue.rejected)
+
+        yield in_flight
+        yield queue_depth
+        yield wait_seconds
+        yield rejected
+
+
+def parse_tenant_weights(value: str) -> Dict[str, float]:
+    """
+    Parse weights like "user:1=2,api_key:5=0.5".
+    """
+    weights = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            tenant, weight = item.rsplit("=", 1)
+            weights[tenant.strip()] = float(weight)
+        except ValueError:
+            logger.warning(f"Ignoring invalid admission tenant weight: {item}")
+            continue
+        if weights[tenant.strip()] <= 0:
+            logger.warning(f"Ignoring non-positive admission tenant weight: {item}")
+            del weights[tenant.strip()]
+    return weights
+
+
+admission_controller = AdmissionController()
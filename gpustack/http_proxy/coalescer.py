@@ -0,0 +1,197 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from starlette.responses import Response
+
+from gpustack.config.envs import (
+    EMBEDDINGS_COALESCING,
+    EMBEDDINGS_COALESCING_MAX_BATCH_SIZE,
+    EMBEDDINGS_COALESCING_WINDOW_MS,
+)
+from gpustack.http_proxy.json_body import JSONBody
+from gpustack.http_proxy.response_cache import embedding_input_items
+from gpustack.schemas.models import Model
+
+# Forwards a batched request body, returning the upstream response and the
+# instance that served it.
+SendBatch = Callable[[JSONBody], Awaitable[Tuple[Response, Any]]]
+
+
+@dataclass
+class _Caller:
+    start: int
+    count: int
+    # Relative input size, used to attribute the batch usage.
+    weight: int
+    future: asyncio.Future
+
+
+@dataclass
+class _Batch:
+    body: Dict[str, Any]
+    send: SendBatch
+    items: List[Any] = field(default_factory=list)
+    callers: List[_Caller] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbeddingsCoalescer:
+    """
+    Merges concurrent embeddings requests of a model into a single upstream
+    request.
+
+    Requests of the same principal (user or API key) with the same
+    parameters arriving within a short window are batched, up to a max
+    number of inputs. Only requests of one principal are merged since the
+    first request of a batch is the one sent upstream, through its own
+    admission and instance selection. The response is split back per
+    caller, re-indexed from zero, and the batch usage is attributed to each
+    caller by the size of its inputs.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = EMBEDDINGS_COALESCING_WINDOW_MS,
+        max_batch_size: int = EMBEDDINGS_COALESCING_MAX_BATCH_SIZE,
+    ):
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[Tuple[int, str, str], _Batch] = {}
+        # References to the batches being sent, so they aren't collected.
+        self._sending: Set[asyncio.Task] = set()
+
+    def enabled_for(self, model: Model) -> bool:
+        enabled = (model.env or {}).get("GPUSTACK_EMBEDDINGS_COALESCING")
+        if enabled is None:
+            return EMBEDDINGS_COALESCING
+        return str(enabled).lower() == "true"
+
+    async def submit(
+        self, model: Model, principal: str, json_body: JSONBody, send: SendBatch
+    ) -> Optional[Tuple[Response, Any]]:
+        """
+        Add the request to a batch of the principal and wait for its share of
+        the response, along with the instance that served the batch. Returns
+        None if the request can't be batched.
+        """
+        body = json_body.json()
+        items = embedding_input_items(body.get("input"))
+        if items is None or len(items) >= self.max_batch_size:
+            return None
+
+        params = {k: v for k, v in body.items() if k not in ("input", "user")}
+        # Texts and token lists can't be mixed in a request.
+        params_key = json.dumps([isinstance(items[0], str), params], sort_keys=True)
+        key = (model.id, principal, params_key)
+        batch = self._pending.get(key)
+        if batch is not None and len(batch.items) + len(items) > self.max_batch_size:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._pending[key] = _Batch(body=params, send=send)
+            batch.timer = asyncio.get_running_loop().call_later(
+                self.window_ms / 1000, self._flush, key
+            )
+
+        caller = _Caller(
+            start=len(batch.items),
+            count=len(items),
+            weight=sum(_input_size(item) for item in items),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        batch.items.extend(items)
+        batch.callers.append(caller)
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(key)
+
+        return await caller.future
+
+    def _flush(self, key: Tuple[int, str, str]):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: _Batch):
+        body = dict(batch.body)
+        body["input"] = batch.items
+        try:
+            response, served_by = await batch.send(
+                JSONBody(json.dumps(body).encode("utf-8"))
+            )
+            responses = split_response(response, batch.callers)
+        except Exception as e:
+            for caller in batch.callers:
+                if not caller.future.done():
+                    caller.future.set_exception(e)
+            return
+
+        for caller, caller_response in zip(batch.callers, responses):
+            if not caller.future.done():
+                caller.future.set_result((caller_response, served_by))
+
+
+def split_response(response: Response, callers: List[_Caller]) -> List[Response]:
+    """
+    Split a batched embeddings response per caller. Error responses are
+    returned to every caller.
+    """
+    if response.status_code != 200 or len(callers) == 1:
+        return [response] * len(callers)
+
+    content = json.loads(response.body)
+    data = sorted(content["data"], key=lambda d: d["index"])
+    usages = _split_usage(content.get("usage") or {}, [c.weight for c in callers])
+
+    responses = []
+    for caller, usage in zip(callers, usages):
+        caller_data = data[caller.start : caller.start + caller.count]
+        for index, item in enumerate(caller_data):
+            item["index"] = index
+        caller_content = dict(content, data=caller_data, usage=usage)
+        responses.append(
+            Response(
+                content=json.dumps(caller_content).encode("utf-8"),
+                status_code=response.status_code,
+                media_type="application/json",
+            )
+        )
+    return responses
+
+
+def _split_usage(usage: Dict[str, Any], weights: List[int]) -> List[Dict[str, Any]]:
+    """
+    Attribute each token count of the usage to callers in proportion to their
+    weights, keeping the sum of each count equal to the batch count.
+    """
+    if not any(weights):
+        weights = [1] * len(weights)
+    total_weight = sum(weights)
+
+    usages: List[Dict[str, Any]] = [{} for _ in weights]
+    for name, value in usage.items():
+        if not isinstance(value, int):
+            for caller_usage in usages:
+                caller_usage[name] = value
+            continue
+        shares = [value * w // total_weight for w in weights]
+        # Hand out the rounding remainder to the largest callers first.
+        remainder = value - sum(shares)
+        for i in sorted(range(len(weights)), key=lambda i: -weights[i])[:remainder]:
+            shares[i] += 1
+        for caller_usage, share in zip(usages, shares):
+            caller_usage[name] = share
+    return usages
+
+
+def _input_size(item: Any) -> int:
+    return len(item) if isinstance(item, (str, list)) else 1
+
+
+embeddings_coalescer = EmbeddingsCoalescer()
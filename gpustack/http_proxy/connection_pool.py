@@ -0,0 +1,125 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from gpustack.config.envs import (
+    PROXY_CONNECTION_LIMIT_PER_HOST,
+    PROXY_CONNECTION_POOLING,
+    PROXY_KEEPALIVE_TIMEOUT,
+    TCP_CONNECTOR_LIMIT,
+)
+from gpustack.utils.name import metric_name
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    idle: int = 0
+    acquired: int = 0
+
+    @property
+    def open(self) -> int:
+        return self.idle + self.acquired
+
+
+class ConnectionPool(Collector):
+    """
+    The connection pool behind the HTTP client used to proxy requests.
+
+    In pooled mode connections to each worker or backend are kept alive
+    between requests, otherwise every request opens a new connection.
+    Per-host statistics are exported as Prometheus metrics.
+    """
+
+    def __init__(self):
+        self._connector: Optional[aiohttp.TCPConnector] = None
+
+    def new_client_session(self) -> aiohttp.ClientSession:
+        if PROXY_CONNECTION_POOLING:
+            connector = aiohttp.TCPConnector(
+                limit=TCP_CONNECTOR_LIMIT,
+                limit_per_host=PROXY_CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=PROXY_KEEPALIVE_TIMEOUT,
+            )
+        else:
+            connector = aiohttp.TCPConnector(
+                limit=TCP_CONNECTOR_LIMIT,
+                force_close=True,
+            )
+        self._connector = connector
+        return aiohttp.ClientSession(connector=connector, trust_env=True)
+
+    def evict(self, host: str):
+        """
+        Close the idle connections to a host, e.g. once its worker becomes
+        unreachable. Connections in use are closed by their requests.
+        """
+        connector = self._connector
+        if connector is None or connector.closed:
+            return
+
+        # aiohttp has no public API to drop the connections of a single host.
+        conns = getattr(connector, "_conns", {})
+        evicted = 0
+        for key in [key for key in list(conns) if key.host == host]:
+            for proto, _ in conns.pop(key, []):
+                proto.close()
+                evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} idle proxy connections to {host}")
+
+    def stats(self) -> Dict[str, PoolStats]:
+        """
+        Return the pool statistics keyed by host:port.
+        """
+        stats: Dict[str, PoolStats] = defaultdict(PoolStats)
+        connector = self._connector
+        if connector is None or connector.closed:
+            return stats
+
+        # Snapshot the private state as the exporter runs in another thread.
+        for key, conns in list(getattr(connector, "_conns", {}).items()):
+            stats[f"{key.host}:{key.port}"].idle += len(conns)
+        for proto in list(getattr(connector, "_acquired", ())):
+            # Per-host sets are only kept with a per-host limit, use the peer.
+            transport = getattr(proto, "transport", None)
+            peername = transport.get_extra_info("peername") if transport else None
+            if peername:
+                stats[f"{peername[0]}:{peername[1]}"].acquired += 1
+        return stats
+
+    def collect(self):
+        labels = ["host"]
+        open_connections = GaugeMetricFamily(
+            metric_name("proxy_connections_open"),
+            "Open connections of the proxy connection pool",
+            labels=labels,
+        )
+        idle_connections = GaugeMetricFamily(
+            metric_name("proxy_connections_idle"),
+            "Idle keep-alive connections of the proxy connection pool",
+            labels=labels,
+        )
+        acquired_connections = GaugeMetricFamily(
+            metric_name("proxy_connections_acquired"),
+            "Connections of the proxy connection pool in use by requests",
+            labels=labels,
+        )
+
+        for host, stats in self.stats().items():
+            open_connections.add_metric([host], stats.open)
+            idle_connections.add_metric([host], stats.idle)
+            acquired_connections.add_metric([host], stats.acquired)
+
+        yield open_connections
+        yield idle_connections
+        yield acquired_connections
+
+
+proxy_connection_pool = ConnectionPool()
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+from gpustack.config.envs import (
+    PROXY_DIRECT_PROBE_INTERVAL,
+    PROXY_DIRECT_PROBE_TIMEOUT,
+    PROXY_ROUTING_MODE,
+    PROXY_ROUTING_MODE_CLUSTERS,
+)
+from gpustack.schemas.models import BackendEnum, Model, ModelInstance
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingModeEnum(str, Enum):
+    # Through the proxy of the worker running the instance.
+    WORKER_PROXY = "worker_proxy"
+    # Straight to the instance port on the worker.
+    DIRECT = "direct"
+    # Direct when the instance port is reachable from the server, otherwise
+    # through the worker proxy.
+    AUTO = "auto"
+
+
+class DirectRouting:
+    """
+    Decides whether requests to a model instance skip the worker proxy hop.
+
+    The routing mode is resolved from the model env, then the cluster of the
+    model, then the global default. In auto mode the instance address is
+    probed in the background; requests go through the worker proxy until a
+    probe succeeds, and again once a direct connection fails.
+    """
+
+    def __init__(
+        self,
+        default_mode: str = PROXY_ROUTING_MODE,
+        cluster_modes: Optional[Dict[int, str]] = None,
+        probe_interval: float = PROXY_DIRECT_PROBE_INTERVAL,
+        probe_timeout: float = PROXY_DIRECT_PROBE_TIMEOUT,
+    ):
+        self.default_mode = _parse_mode(default_mode, RoutingModeEnum.WORKER_PROXY)
+        if cluster_modes is None:
+            cluster_modes = parse_cluster_modes(PROXY_ROUTING_MODE_CLUSTERS)
+        self.cluster_modes = {
+            cluster_id: _parse_mode(mode, self.default_mode)
+            for cluster_id, mode in cluster_modes.items()
+        }
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        # (host, port) -> (reachable, monotonic time of the probe)
+        self._probes: Dict[Tuple[str, int], Tuple[bool, float]] = {}
+        self._probing: Dict[Tuple[str, int], asyncio.Task] = {}
+
+    def mode(self, model: Model) -> RoutingModeEnum:
+        if model.backend == BackendEnum.ASCEND_MINDIE:
+            # Connectivity to the loopback address via worker proxy does not
+            # work for Ascend MindIE.
+            return RoutingModeEnum.DIRECT
+
+        mode = (model.env or {}).get("GPUSTACK_PROXY_ROUTING_MODE")
+        if mode is not None:
+            return _parse_mode(mode, self.default_mode)
+        return self.cluster_modes.get(model.cluster_id, self.default_mode)
+
+    def use_direct(self, model: Model, instance: ModelInstance) -> bool:
+        mode = self.mode(model)
+        if mode != RoutingModeEnum.AUTO:
+            return mode == RoutingModeEnum.DIRECT
+        if not instance.worker_ip or not instance.port:
+            return False
+
+        address = (instance.worker_ip, instance.port)
+        probe = self._probes.get(address)
+        if probe is None or time.monotonic() - probe[1] > self.probe_interval:
+            self._start_probe(address)
+        return probe is not None and probe[0]
+
+    def mark_unreachable(self, instance: ModelInstance):
+        """
+        Route the instance through the worker proxy until the next probe.
+        """
+        self._probes[(instance.worker_ip, instance.port)] = (False, time.monotonic())
+
+    def _start_probe(self, address: Tuple[str, int]):
+        if address in self._probing:
+            return
+        self._probing[address] = asyncio.create_task(self._probe(address))
+
+    async def _probe(self, address: Tuple[str, int]):
+        host, port = address
+        reachable = False
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), self.probe_timeout
+            )
+            writer.close()
+            reachable = True
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.debug(f"Instance address {host}:{port} is not reachable: {e}")
+        finally:
+            self._probing.pop(address, None)
+
+        previous = self._probes.get(address)
+        if previous is None or previous[0] != reachable:
+            logger.info(
+                f"Routing requests to {host}:{port} "
+                f"{'directly' if reachable else 'through the worker proxy'}"
+            )
+        self._probes[address] = (reachable, time.monotonic())
+
+
+def parse_cluster_modes(value: str) -> Dict[int, str]:
+    """
+    Parse routing modes by cluster ID like "1=direct,2=auto".
+    """
+    modes = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            cluster_id, mode = item.split("=", 1)
+            modes[int(cluster_id)] = mode.strip()
+        except ValueError:
+            logger.warning(f"Ignoring invalid cluster routing mode: {item}")
+    return modes
+
+
+def _parse_mode(value: str, default: RoutingModeEnum) -> RoutingModeEnum:
+    try:
+        return RoutingModeEnum(value.strip().lower())
+    except ValueError:
+        logger.warning(f"Ignoring invalid routing mode: {value}")
+        return default
+
+
+direct_routing = DirectRouting()
@@ -0,0 +1,200 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Dict, Iterable, Optional, Set
+
+# Top-level keys the proxy needs to route a request.
+SNIFFED_KEYS = ("model", "stream", "stream_options")
+
+_WHITESPACE = b" \t\r\n"
+# The characters the scanner stops at. Inside nested values only brackets
+# and strings matter, so numbers, literals, commas and colons are skipped by
+# the regex engine.
+_TOP_LEVEL_TOKEN = re.compile(r'[{}\[\]:,"]')
+_NESTED_TOKEN = re.compile(r'[{}\[\]"]')
+_MISSING = object()
+
+
+class JSONBody:
+    """
+    A JSON request body that is forwarded as the original bytes.
+
+    Only the top-level keys in `SNIFFED_KEYS` are extracted up front by
+    scanning the raw body. The full document is parsed lazily, and only
+    re-serialized if a caller mutates it through `mutable_json`.
+    """
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._parsed: Optional[dict] = None
+        self._modified = False
+        self._injected: Dict[str, Any] = {}
+
+        fields = sniff_json_fields(raw, SNIFFED_KEYS)
+        if fields is None:
+            fields = {
+                key: value for key, value in self.json().items() if key in SNIFFED_KEYS
+            }
+        self._fields = fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._injected:
+            return self._injected[key]
+        if self._parsed is not None:
+            return self._parsed.get(key, default)
+        if key in SNIFFED_KEYS:
+            return self._fields.get(key, default)
+        return self.json().get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def json(self) -> dict:
+        """
+        Return the parsed body. Callers must not mutate it, use
+        `mutable_json` instead.
+        """
+        if self._parsed is None:
+            parsed = json.loads(self.raw)
+            if not isinstance(parsed, dict):
+                raise ValueError("JSON body must be an object")
+            parsed.update(self._injected)
+            self._parsed = parsed
+        return self._parsed
+
+    def mutable_json(self) -> dict:
+        """
+        Return the parsed body for in-place mutation. The body is
+        re-serialized when forwarded.
+        """
+        parsed = self.json()
+        self._modified = True
+        return parsed
+
+    def setdefault(self, key: str, value: Any):
+        """
+        Set a top-level key if it is not present, without parsing the body.
+        """
+        if key in self:
+            return
+        if self._parsed is not None:
+            self._parsed[key] = value
+        self._injected[key] = value
+
+    def to_bytes(self) -> bytes:
+        if self._modified:
+            return json.dumps(self._parsed).encode("utf-8")
+        if not self._injected:
+            return self.raw
+
+        # Splice injected keys right after the opening brace.
+        start = self.raw.index(b"{") + 1
+        injected = b",".join(
+            json.dumps(key).encode("utf-8") + b":" + json.dumps(value).encode("utf-8")
+            for key, value in self._injected.items()
+        )
+        if self.raw[start:].lstrip(_WHITESPACE)[:1] != b"}":
+            injected += b","
+        return self.raw[:start] + injected + self.raw[start:]
+
+
+def sniff_json_fields(
+    raw: bytes, keys: Iterable[str], budget: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Extract top-level keys of a JSON object without parsing nested values.
+
+    Long strings such as message contents and nested arrays of numbers are
+    skipped with `str.find` and regex searches, so the cost is driven by the
+    number of top-level tokens, brackets and strings rather than the body
+    size. Gives up and returns None after `budget` of them, in which case the
+    caller should parse the full document. Malformed JSON is not fully
+    validated here.
+    """
+    text = raw.decode("utf-8")
+    if not text.lstrip().startswith("{"):
+        raise ValueError("JSON body must be an object")
+
+    if budget is None:
+        budget = max(256, len(raw) // 512)
+
+    scanner = _TopLevelScanner(text, set(keys))
+    pos = 0
+    while True:
+        pos = scanner.scan_token(pos)
+        if pos == -1:
+            break
+        budget -= 1
+        if budget < 0:
+            return None
+
+    if scanner.depth != 0:
+        raise ValueError("Unbalanced JSON body")
+
+    return {key: json.loads(value) for key, value in scanner.values.items()}
+
+
+class _TopLevelScanner:
+    def __init__(self, text: str, keys: Set[str]):
+        self.text = text
+        self.keys = keys
+        self.depth = 0
+        self.values: Dict[str, str] = {}
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._current: Optional[str] = None
+        self._value_start = 0
+
+    def scan_token(self, pos: int) -> int:
+        """
+        Handle the next token from `pos`, returning the position after it,
+        or -1 at the end of the text.
+        """
+        pattern = _TOP_LEVEL_TOKEN if self.depth <= 1 else _NESTED_TOKEN
+        match = pattern.search(self.text, pos)
+        if match is None:
+            return -1
+
+        i = match.start()
+        c = self.text[i]
+        if c == '"':
+            return self.scan_string(i)
+        if c == "{" or c == "[":
+            self.depth += 1
+            if self.depth == 1:
+                self._expect_key = True
+        elif c == "}" or c == "]":
+            if self.depth == 1:
+                self._end_value(i)
+            self.depth -= 1
+        elif c == ":":
+            if self._key in self.keys:
+                self._current = self._key
+                self._value_start = i + 1
+            self._key = None
+        elif self.depth == 1:
+            # A comma between top-level members.
+            self._end_value(i)
+            self._expect_key = True
+        return i + 1
+
+    def scan_string(self, quote: int) -> int:
+        """Skip the string opening at `quote`, returning the position after it."""
+        text = self.text
+        end = text.find('"', quote + 1)
+        if end == -1:
+            raise ValueError("Unterminated string in JSON body")
+        string = None
+        if text.find("\\", quote + 1, end) != -1:
+            # Let the C scanner deal with escaped quotes.
+            string, end = scanstring(text, quote + 1)
+            end -= 1
+        if self.depth == 1 and self._expect_key:
+            self._key = string if string is not None else text[quote + 1 : end]
+            self._expect_key = False
+        return end + 1
+
+    def _end_value(self, end: int):
+        if self._current is not None:
+            self.values[self._current] = self.text[self._value_start : end]
+            self._current = None
@@ -1,17 +1,122 @@
-from typing import List
+import logging
+import time
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional
 
-from gpustack.http_proxy.strategies import LoadBalancingStrategy, RoundRobinStrategy
+from gpustack.config.envs import LOAD_BALANCING_STRATEGY, PROXY_SUSPECT_SECONDS
+from gpustack.http_proxy.strategies import (
+    InFlightRequests,
+    LatencyTracker,
+    LeastOutstandingRequestsStrategy,
+    LoadBalancingStrategy,
+    PowerOfTwoChoicesStrategy,
+    PrefixAffinityStrategy,
+    RoundRobinStrategy,
+)
 from gpustack.schemas.models import ModelInstance
 
+logger = logging.getLogger(__name__)
+
+
+class LoadBalancingStrategyEnum(str, Enum):
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING_REQUESTS = "least_outstanding_requests"
+    PREFIX_AFFINITY = "prefix_affinity"
+    POWER_OF_TWO_CHOICES = "power_of_two_choices"
+
 
 class LoadBalancer:
     def __init__(self, strategy: LoadBalancingStrategy = None):
+        self._in_flight = InFlightRequests()
+        self._latency = LatencyTracker()
+        self._strategies: Dict[str, LoadBalancingStrategy] = {
+            LoadBalancingStrategyEnum.ROUND_ROBIN: RoundRobinStrategy(),
+            LoadBalancingStrategyEnum.LEAST_OUTSTANDING_REQUESTS: LeastOutstandingRequestsStrategy(
+                self._in_flight
+            ),
+            LoadBalancingStrategyEnum.PREFIX_AFFINITY: PrefixAffinityStrategy(
+                self._in_flight
+            ),
+            LoadBalancingStrategyEnum.POWER_OF_TWO_CHOICES: PowerOfTwoChoicesStrategy(
+                self._in_flight, self._latency
+            ),
+        }
         if strategy is None:
-            strategy = RoundRobinStrategy()
+            strategy = self._strategies.get(
+                LOAD_BALANCING_STRATEGY.lower(),
+                self._strategies[LoadBalancingStrategyEnum.ROUND_ROBIN],
+            )
         self._strategy = strategy
+        # instance_id -> monotonic time until which the instance is suspect
+        self._suspects: Dict[int, float] = {}
+
+    @property
+    def in_flight(self) -> InFlightRequests:
+        return self._in_flight
+
+    @property
+    def latency(self) -> LatencyTracker:
+        return self._latency
 
     def set_strategy(self, strategy: LoadBalancingStrategy):
         self._strategy = strategy
 
-    async def get_instance(self, instances: List[ModelInstance]) -> ModelInstance:
-        return await self._strategy.select_instance(instances)
+    def get_strategy(self, name: Optional[str] = None) -> LoadBalancingStrategy:
+        if not name:
+            return self._strategy
+
+        strategy = self._strategies.get(name.lower())
+        if strategy is None:
+            logger.warning(
+                f"Unknown load balancing strategy {name}, using the default one"
+            )
+            return self._strategy
+        return strategy
+
+    async def get_instance(
+        self,
+        instances: List[ModelInstance],
+        strategy: Optional[str] = None,
+        affinity_key: Optional[str] = None,
+        exclude: Optional[Iterable[int]] = None,
+    ) -> Optional[ModelInstance]:
+        """
+        Select an instance, skipping the excluded instance IDs. Suspect
+        instances are only selected if no other instance is left. Returns None
+        if every instance is excluded.
+        """
+        if exclude:
+            excluded = set(exclude)
+            instances = [i for i in instances if i.id not in excluded]
+            if not instances:
+                return None
+
+        healthy = [i for i in instances if not self.is_suspect(i.id)]
+        return await self.get_strategy(strategy).select_instance(
+            healthy or instances, affinity_key
+        )
+
+    def mark_suspect(self, instance_id: int, seconds: float = PROXY_SUSPECT_SECONDS):
+        """
+        Avoid the instance for a while, e.g. after a failed connection.
+        """
+        self._suspects[instance_id] = time.monotonic() + seconds
+
+    def is_suspect(self, instance_id: int) -> bool:
+        until = self._suspects.get(instance_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._suspects[instance_id]
+            return False
+        return True
+
+    def track_request(self, instance: ModelInstance) -> Callable[[], None]:
+        """
+        Count a request as in flight on the instance until the returned
+        callback is called. The callback is safe to call more than once.
+        """
+        return self._in_flight.acquire(instance.id)
+
+
+load_balancer = LoadBalancer()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from gpustack.schemas.users import User
+from gpustack.server.bus import Event, EventType, Subscriber, event_bus
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 4096
+
+# (user_id, categories, with_meta), the user is None for admins who all see
+# the same models.
+ModelListKey = Tuple[Optional[int], Tuple[str, ...], bool]
+
+
+class ModelListCache:
+    """
+    Serialized `/v1/models` responses by user and query.
+
+    Entries are dropped on model events, and per user on events of the models
+    a user can access, so polling clients are served from memory. The cache is
+    only used while the bus is watched.
+    """
+
+    topics = ("model", "mymodel")
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ModelListKey, bytes]" = OrderedDict()
+        # Bumped on every invalidation, responses built from a query that
+        # raced with an event are not stored.
+        self._generation = 0
+        self._watching = False
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    async def start(self):
+        """
+        Invalidate entries from bus events until cancelled.
+        """
+        subscribers = {topic: event_bus.subscribe(topic) for topic in self.topics}
+        self._watching = True
+        try:
+            await asyncio.gather(
+                *(
+                    self._watch(topic, subscriber)
+                    for topic, subscriber in subscribers.items()
+                )
+            )
+        finally:
+            self._watching = False
+            self.clear()
+            for topic, subscriber in subscribers.items():
+                event_bus.unsubscribe(topic, subscriber)
+
+    async def _watch(self, topic: str, subscriber: Subscriber):
+        while True:
+            event = await subscriber.receive()
+            self.invalidate(topic, event)
+
+    @staticmethod
+    def key(
+        user: User, categories: Iterable[str], with_meta: Optional[bool]
+    ) -> ModelListKey:
+        user_id = None if user.is_admin else user.id
+        return (user_id, tuple(sorted(categories)), bool(with_meta))
+
+    def get(self, key: ModelListKey) -> Optional[bytes]:
+        if not self._watching:
+            return None
+        content = self._entries.get(key)
+        if content is not None:
+            self._entries.move_to_end(key)
+        return content
+
+    def put(self, key: ModelListKey, content: bytes, generation: int):
+        if not self._watching or generation != self._generation:
+            return
+        self._entries[key] = content
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, topic: str, event: Event):
+        if event.type == EventType.HEARTBEAT:
+            return
+        self._generation += 1
+        user_id = getattr(event.data, "user_id", None)
+        if topic == "mymodel" and user_id is not None:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+            return
+        self.clear()
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+
+model_list_cache = ModelListCache()
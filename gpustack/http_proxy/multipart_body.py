@@ -0,0 +1,206 @@
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+# Form fields the proxy needs to route a request.
+SNIFFED_FORM_KEYS = ("model", "stream")
+
+# Bytes read ahead of routing are kept in memory up to this size, then spooled
+# to disk. This only happens when the form fields come after the file parts.
+MAX_SPOOL_MEMORY_SIZE = 1024 * 1024
+MAX_FIELD_SIZE = 4096
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class MultipartBody:
+    """
+    A multipart/form-data request body that is streamed to the upstream.
+
+    Only as much of the body as needed to extract the fields in
+    `SNIFFED_FORM_KEYS` is read up front. Those bytes are spooled and replayed
+    ahead of the rest of the client stream, which is forwarded unchanged
+    with its original boundary.
+    """
+
+    def __init__(self, stream: AsyncIterator[bytes], content_type: str):
+        content_type_value, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if content_type_value != b"multipart/form-data" or not boundary:
+            raise ValueError("Missing boundary in multipart/form-data content type")
+
+        self.content_type = content_type
+        self._stream = stream
+        self._spool = SpooledTemporaryFile(max_size=MAX_SPOOL_MEMORY_SIZE)
+        self._sniffer = _FieldSniffer(boundary)
+        self._consumed = False
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        return self._sniffer.fields
+
+    @property
+    def consumed(self) -> bool:
+        """Whether forwarding has started, after which the body can't be replayed."""
+        return self._consumed
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self._sniffer.fields.get(key, default)
+
+    async def read_fields(self) -> Dict[str, str]:
+        """
+        Read the client stream until the routing fields are known, or until
+        the body ends.
+        """
+        async for chunk in self._stream:
+            if not chunk:
+                continue
+            await self._write_spool(chunk)
+            self._sniffer.feed(chunk)
+            if self._sniffer.done:
+                break
+
+        return self._sniffer.fields
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        """
+        Yield the full original body, starting with the bytes that were read
+        ahead. Can only be consumed once.
+        """
+        if self._consumed:
+            raise RuntimeError("Multipart body has already been forwarded")
+        self._consumed = True
+
+        try:
+            await self._seek_spool(0)
+            while True:
+                chunk = await self._read_spool()
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+        async for chunk in self._stream:
+            if chunk:
+                yield chunk
+
+    def close(self):
+        """
+        Discard the bytes read ahead, e.g. when the request is rejected
+        before it is forwarded. Safe to call more than once.
+        """
+        self._spool.close()
+
+    def _spool_rolled(self) -> bool:
+        return getattr(self._spool, "_rolled", False)
+
+    async def _write_spool(self, chunk: bytes):
+        if self._spool_rolled():
+            await run_in_threadpool(self._spool.write, chunk)
+        else:
+            self._spool.write(chunk)
+
+    async def _seek_spool(self, offset: int):
+        if self._spool_rolled():
+            await run_in_threadpool(self._spool.seek, offset)
+        else:
+            self._spool.seek(offset)
+
+    async def _read_spool(self) -> bytes:
+        if self._spool_rolled():
+            return await run_in_threadpool(self._spool.read, READ_CHUNK_SIZE)
+        return self._spool.read(READ_CHUNK_SIZE)
+
+
+class _FieldSniffer:
+    """
+    Incremental multipart parser collecting the values of the sniffed fields.
+
+    Parsing stops once every sniffed field is found, or once a file part
+    begins after the `model` field. Fields that come after that first file
+    part are not seen.
+    """
+
+    def __init__(self, boundary: bytes):
+        self.fields: Dict[str, str] = {}
+        self.done = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._current: Optional[str] = None
+        self._value = bytearray()
+        self._parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_end": self._on_end,
+            },
+        )
+
+    def feed(self, chunk: bytes):
+        self._parser.write(chunk)
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._current = None
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        name, filename = _parse_content_disposition(
+            self._headers.get(b"content-disposition")
+        )
+        if filename is not None:
+            if "model" in self.fields:
+                self.done = True
+            return
+        if name in SNIFFED_FORM_KEYS and name not in self.fields:
+            self._current = name
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._current is None:
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_SIZE:
+            raise ValueError(f"Form field '{self._current}' is too large")
+
+    def _on_part_end(self):
+        if self._current is None:
+            return
+        self.fields[self._current] = self._value.decode("utf-8")
+        self._current = None
+        if len(self.fields) == len(SNIFFED_FORM_KEYS):
+            self.done = True
+
+    def _on_end(self):
+        self.done = True
+
+
+def _parse_content_disposition(
+    header: Optional[bytes],
+) -> Tuple[Optional[str], Optional[str]]:
+    _, options = parse_options_header(header)
+    name = options.get(b"name")
+    filename = options.get(b"filename")
+    return (
+        name.decode("utf-8") if name is not None else None,
+        filename.decode("utf-8") if filename is not None else None,
+    )
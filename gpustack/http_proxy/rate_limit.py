@@ -0,0 +1,156 @@
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from gpustack.api.exceptions import TooManyRequestsException
+from gpustack.schemas.common import RateLimit
+
+# Buckets are pruned once there are more than this many, dropping the full
+# ones which behave the same as new buckets.
+MAX_BUCKETS = 10000
+
+# (kind, id), e.g. ("api_key", 1).
+RateLimitScope = Tuple[str, int]
+ScopedRateLimits = List[Tuple[RateLimitScope, Optional[RateLimit]]]
+
+
+class TokenBucket:
+    """
+    A bucket refilled at a rate per minute up to its burst. The level may go
+    below zero when more is debited than available, delaying later takes.
+    """
+
+    def __init__(self, per_minute: int, burst: Optional[int] = None):
+        self.per_minute = per_minute
+        self.burst = burst or per_minute
+        self.level = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def matches(self, per_minute: int, burst: Optional[int]) -> bool:
+        return self.per_minute == per_minute and self.burst == (burst or per_minute)
+
+    def refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.level = min(self.burst, self.level + elapsed * self.per_minute / 60)
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until the bucket holds the amount, 0 if it already does.
+        """
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.per_minute
+
+    @property
+    def full(self) -> bool:
+        return self.level >= self.burst
+
+
+class RateLimiter:
+    """
+    In-memory token bucket rate limits of API keys, users and models.
+
+    Each scope has a request bucket, taken from when a request is admitted,
+    and a token bucket debited by the completion tokens of finished
+    requests. A request is admitted only if every request bucket holds a
+    request and no token bucket is empty, otherwise it is rejected with 429
+    and the time until it would be admitted.
+    """
+
+    def __init__(self):
+        # (kind, id, "requests" or "tokens") -> bucket
+        self._buckets: Dict[Tuple[str, int, str], TokenBucket] = {}
+
+    def admit(self, limits: ScopedRateLimits):
+        now = time.monotonic()
+        request_buckets = []
+        retry_after = 0.0
+        for scope, limit in limits:
+            if limit is None:
+                continue
+            bucket = self._bucket(
+                scope, "requests", limit.requests_per_minute, limit.request_burst, now
+            )
+            if bucket is not None:
+                request_buckets.append(bucket)
+                retry_after = max(retry_after, bucket.wait_time(1))
+            bucket = self._bucket(
+                scope, "tokens", limit.tokens_per_minute, limit.token_burst, now
+            )
+            if bucket is not None:
+                # The tokens of the request are unknown until it's done.
+                retry_after = max(retry_after, bucket.wait_time(1))
+
+        if retry_after > 0:
+            raise TooManyRequestsException(
+                message="Rate limit exceeded. Please retry later.",
+                is_openai_exception=True,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+        for bucket in request_buckets:
+            bucket.level -= 1
+
+    def debit_tokens(self, limits: ScopedRateLimits, tokens: int):
+        if tokens <= 0:
+            return
+        now = time.monotonic()
+        for scope, limit in limits:
+            if limit is None:
+                continue
+            bucket = self._bucket(
+                scope, "tokens", limit.tokens_per_minute, limit.token_burst, now
+            )
+            if bucket is not None:
+                bucket.level -= tokens
+
+    def _bucket(
+        self,
+        scope: RateLimitScope,
+        kind: str,
+        per_minute: Optional[int],
+        burst: Optional[int],
+        now: float,
+    ) -> Optional[TokenBucket]:
+        key = (*scope, kind)
+        if not per_minute:
+            self._buckets.pop(key, None)
+            return None
+
+        bucket = self._buckets.get(key)
+        if bucket is None or not bucket.matches(per_minute, burst):
+            if len(self._buckets) >= MAX_BUCKETS:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(per_minute, burst)
+        bucket.refill(now)
+        return bucket
+
+    def _prune(self, now: float):
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.full:
+                del self._buckets[key]
+
+
+def request_rate_limits(request: Request) -> ScopedRateLimits:
+    """
+    The rate limits of the API key, the user and the model of a request.
+    """
+    limits = []
+    for kind, obj in (
+        ("api_key", getattr(request.state, "api_key", None)),
+        ("user", getattr(request.state, "user", None)),
+        ("model", getattr(request.state, "model", None)),
+    ):
+        limit = getattr(obj, "rate_limit", None)
+        if limit is None or obj.id is None:
+            continue
+        if isinstance(limit, dict):
+            limit = RateLimit.model_validate(limit)
+        limits.append(((kind, obj.id), limit))
+    return limits
+
+
+rate_limiter = RateLimiter()
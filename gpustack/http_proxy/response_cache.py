@@ -0,0 +1,359 @@
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from gpustack.config.envs import (
+    RESPONSE_CACHE,
+    RESPONSE_CACHE_DISK_MAX_SIZE,
+    RESPONSE_CACHE_MAX_SIZE,
+)
+from gpustack.http_proxy.json_body import JSONBody
+from gpustack.schemas.models import Model
+
+logger = logging.getLogger(__name__)
+
+# Approximate bookkeeping bytes of an entry, on top of its key and value.
+ENTRY_OVERHEAD = 128
+
+# Model fields that change the output of a model for the same input.
+MODEL_CONFIG_FIELDS = {
+    "source",
+    "huggingface_repo_id",
+    "huggingface_filename",
+    "ollama_library_model_name",
+    "model_scope_model_id",
+    "model_scope_file_path",
+    "local_path",
+    "backend",
+    "backend_version",
+    "backend_parameters",
+    "image_name",
+    "run_command",
+    "env",
+}
+
+
+class ResponseCache:
+    """
+    A byte-bounded LRU cache of per-item results of deterministic requests.
+
+    Entries evicted from memory are spilled to disk when a spill directory is
+    set, up to a separate size bound, and promoted back on access.
+    """
+
+    def __init__(
+        self,
+        max_size: int = RESPONSE_CACHE_MAX_SIZE,
+        disk_max_size: int = RESPONSE_CACHE_DISK_MAX_SIZE,
+    ):
+        self.max_size = max_size
+        self.disk_max_size = disk_max_size
+        self.size = 0
+        self.disk_size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._spill_dir: Optional[str] = None
+
+    def set_spill_dir(self, path: str):
+        """
+        Spill evicted entries under the path. Previous content is removed, as
+        the index of spilled entries is only kept in memory.
+        """
+        if self.disk_max_size <= 0:
+            return
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        self._spill_dir = path
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            return value
+
+        if key not in self._disk_entries:
+            return None
+        self.disk_size -= self._disk_entries.pop(key)
+        try:
+            value = await asyncio.to_thread(self._read_spilled, key)
+        except OSError as e:
+            logger.debug(f"Failed to read spilled response cache entry: {e}")
+            return None
+        await self.put(key, value)
+        return value
+
+    async def put(self, key: str, value: bytes):
+        if key in self._entries:
+            self.size -= _entry_size(key, self._entries.pop(key))
+        self._entries[key] = value
+        self.size += _entry_size(key, value)
+
+        evicted = []
+        while self.size > self.max_size and self._entries:
+            evicted_key, evicted_value = self._entries.popitem(last=False)
+            self.size -= _entry_size(evicted_key, evicted_value)
+            evicted.append((evicted_key, evicted_value))
+
+        if evicted and self._spill_dir is not None:
+            await self._spill(evicted)
+
+    async def _spill(self, entries: List[tuple]):
+        for key, value in entries:
+            if key in self._disk_entries:
+                self.disk_size -= self._disk_entries.pop(key)
+            self._disk_entries[key] = len(value)
+            self.disk_size += len(value)
+
+        removed = []
+        while self.disk_size > self.disk_max_size and self._disk_entries:
+            key, size = self._disk_entries.popitem(last=False)
+            self.disk_size -= size
+            removed.append(key)
+
+        written = [(k, v) for k, v in entries if k in self._disk_entries]
+        try:
+            await asyncio.to_thread(self._write_spilled, written, removed)
+        except OSError as e:
+            logger.debug(f"Failed to spill response cache entries: {e}")
+            for key, _ in written:
+                self.disk_size -= self._disk_entries.pop(key, 0)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self._spill_dir, key[:2], key)
+
+    def _read_spilled(self, key: str) -> bytes:
+        path = self._spill_path(key)
+        with open(path, "rb") as f:
+            value = f.read()
+        os.remove(path)
+        return value
+
+    def _write_spilled(self, entries: List[tuple], removed: List[str]):
+        for key in removed:
+            try:
+                os.remove(self._spill_path(key))
+            except FileNotFoundError:
+                pass
+        for key, value in entries:
+            path = self._spill_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(value)
+
+
+def _entry_size(key: str, value: bytes) -> int:
+    return len(key) + len(value) + ENTRY_OVERHEAD
+
+
+class CachedRequest(ABC):
+    """
+    A request split into the items with cached results and the items that
+    still need to be computed by the model.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        model: Model,
+        body: Dict[str, Any],
+        items: List[Any],
+        keys: List[str],
+    ):
+        self._cache = cache
+        self._model = model
+        self._body = body
+        self._keys = keys
+        self._items = items
+        self._results: List[Optional[Any]] = [None] * len(items)
+        self._misses: List[int] = []
+
+    @property
+    def complete(self) -> bool:
+        return not self._misses
+
+    async def lookup(self):
+        for i, key in enumerate(self._keys):
+            value = await self._cache.get(key)
+            if value is None:
+                self._misses.append(i)
+            else:
+                self._results[i] = json.loads(value)
+
+    @abstractmethod
+    def forwarded_body(self) -> JSONBody:
+        """
+        The request body asking for the cache misses only.
+        """
+        pass
+
+    async def merge(self, content: Optional[bytes]) -> bytes:
+        """
+        Cache the results of the forwarded request, and return the response
+        to the original request with all results in order. Usage only counts
+        the tokens of the forwarded request.
+        """
+        response = json.loads(content) if content is not None else {}
+        if content is not None:
+            for i, result in zip(self._misses, self._miss_results(response)):
+                self._results[i] = result
+                await self._cache.put(self._keys[i], json.dumps(result).encode("utf-8"))
+        return json.dumps(self._build_response(response)).encode("utf-8")
+
+    @abstractmethod
+    def _miss_results(self, response: Dict[str, Any]) -> List[Any]:
+        pass
+
+    @abstractmethod
+    def _build_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        pass
+
+
+class CachedEmbeddingsRequest(CachedRequest):
+    def forwarded_body(self) -> JSONBody:
+        body = dict(self._body)
+        body["input"] = [self._items[i] for i in self._misses]
+        return JSONBody(json.dumps(body).encode("utf-8"))
+
+    def _miss_results(self, response: Dict[str, Any]) -> List[Any]:
+        data = sorted(response["data"], key=lambda d: d["index"])
+        if len(data) != len(self._misses):
+            raise ValueError("Unexpected number of embeddings in the response")
+        return [d["embedding"] for d in data]
+
+    def _build_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        response.setdefault("object", "list")
+        response.setdefault("model", self._model.name)
+        response.setdefault("usage", {"prompt_tokens": 0, "total_tokens": 0})
+        response["data"] = [
+            {"object": "embedding", "index": i, "embedding": embedding}
+            for i, embedding in enumerate(self._results)
+        ]
+        return response
+
+
+class CachedRerankRequest(CachedRequest):
+    def forwarded_body(self) -> JSONBody:
+        body = dict(self._body)
+        body["documents"] = [self._items[i] for i in self._misses]
+        # All scores are needed to rank the cached documents too.
+        body.pop("top_n", None)
+        body["return_documents"] = False
+        return JSONBody(json.dumps(body).encode("utf-8"))
+
+    def _miss_results(self, response: Dict[str, Any]) -> List[Any]:
+        scores = {r["index"]: r["relevance_score"] for r in response["results"]}
+        return [scores[i] for i in range(len(self._misses))]
+
+    def _build_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        return_documents = self._body.get("return_documents", True)
+        results = []
+        for i, score in enumerate(self._results):
+            result = {"index": i, "relevance_score": score}
+            if return_documents:
+                result["document"] = {"text": self._items[i]}
+            results.append(result)
+        results.sort(key=lambda r: r["relevance_score"], reverse=True)
+
+        top_n = self._body.get("top_n")
+        if top_n is not None:
+            results = results[:top_n]
+
+        response.setdefault("model", self._model.name)
+        response.setdefault("usage", {"prompt_tokens": 0, "total_tokens": 0})
+        response["results"] = results
+        return response
+
+
+async def lookup_cached_request(
+    cache: ResponseCache, model: Model, endpoint: str, json_body: JSONBody
+) -> Optional[CachedRequest]:
+    """
+    Look up the results of an embeddings or rerank request if the response
+    cache is enabled for the model. Returns None for requests that can't be
+    cached.
+    """
+    enabled = (model.env or {}).get("GPUSTACK_RESPONSE_CACHE")
+    if enabled is None:
+        enabled = RESPONSE_CACHE
+    elif isinstance(enabled, str):
+        enabled = enabled.lower() == "true"
+    if not enabled or cache.max_size <= 0:
+        return None
+
+    body = json_body.json()
+    if endpoint == "embeddings":
+        items = embedding_input_items(body.get("input"))
+        params = _without(body, "model", "input", "user")
+        request_class = CachedEmbeddingsRequest
+    elif endpoint == "rerank":
+        items = _rerank_items(body)
+        params = _without(body, "model", "documents", "top_n", "return_documents")
+        request_class = CachedRerankRequest
+    else:
+        return None
+    if not items:
+        return None
+
+    prefix = "\0".join(
+        [
+            endpoint,
+            str(model.id),
+            model_config_digest(model),
+            json.dumps(params, sort_keys=True),
+        ]
+    )
+    keys = [
+        hashlib.sha256(
+            f"{prefix}\0{json.dumps(item)}".encode("utf-8"),
+        ).hexdigest()
+        for item in items
+    ]
+    cached = request_class(cache, model, body, items, keys)
+    await cached.lookup()
+    return cached
+
+
+def model_config_digest(model: Model) -> str:
+    config = model.model_dump_json(include=MODEL_CONFIG_FIELDS)
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+def embedding_input_items(value: Any) -> Optional[List[Any]]:
+    """
+    Return the inputs of an embeddings request as a list of texts or of
+    token lists, or None if the input is not one of those forms.
+    """
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not value:
+        return None
+    if all(isinstance(v, int) for v in value):
+        # A single tokenized input.
+        return [value]
+    if all(isinstance(v, str) for v in value) or all(
+        isinstance(v, list) and all(isinstance(t, int) for t in v) for v in value
+    ):
+        return value
+    return None
+
+
+def _rerank_items(body: Dict[str, Any]) -> Optional[List[str]]:
+    documents = body.get("documents")
+    if not isinstance(body.get("query"), str) or not isinstance(documents, list):
+        return None
+    if not all(isinstance(d, str) for d in documents):
+        return None
+    return documents
+
+
+def _without(body: Dict[str, Any], *keys: str) -> Dict[str, Any]:
+    return {k: v for k, v in body.items() if k not in keys}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.schemas.models import Model, ModelInstance, ModelInstanceStateEnum
+from gpustack.schemas.workers import Worker, WorkerStateEnum
+from gpustack.server.bus import Event, EventType, Subscriber, event_bus
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingTable:
+    """
+    In-memory routing table of model name -> running instances -> worker.
+
+    The table is loaded once from the database and then kept current from the
+    event bus, so the proxy path can resolve a request without touching the
+    database.
+    """
+
+    topics = ("model", "modelinstance", "worker")
+
+    def __init__(self):
+        self._models_by_name: Dict[str, Model] = {}
+        self._models_by_id: Dict[int, Model] = {}
+        # model_id -> instance_id -> running instance
+        self._running_instances: Dict[int, Dict[int, ModelInstance]] = {}
+        self._workers: Dict[int, Worker] = {}
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def start(self, engine: AsyncEngine):
+        """
+        Load the initial state and apply bus events until cancelled.
+        """
+
+        # Subscribe before listing so no event is lost between the two.
+        subscribers = {topic: event_bus.subscribe(topic) for topic in self.topics}
+        try:
+            async with AsyncSession(engine) as session:
+                for model in await Model.all(session):
+                    self._apply_model(Event(type=EventType.CREATED, data=model))
+                for instance in await ModelInstance.all(session):
+                    self._apply_model_instance(
+                        Event(type=EventType.CREATED, data=instance)
+                    )
+                for worker in await Worker.all(session):
+                    self._apply_worker(Event(type=EventType.CREATED, data=worker))
+                session.expunge_all()
+
+            self._ready.set()
+            logger.debug(
+                f"Routing table loaded with {len(self._models_by_id)} models, "
+                f"{len(self._workers)} workers."
+            )
+
+            await asyncio.gather(
+                *(
+                    self._watch(topic, subscriber)
+                    for topic, subscriber in subscribers.items()
+                )
+            )
+        finally:
+            self._ready.clear()
+            for topic, subscriber in subscribers.items():
+                event_bus.unsubscribe(topic, subscriber)
+
+    async def _watch(self, topic: str, subscriber: Subscriber):
+        handlers = {
+            "model": self._apply_model,
+            "modelinstance": self._apply_model_instance,
+            "worker": self._apply_worker,
+        }
+        handler = handlers[topic]
+        while True:
+            event = await subscriber.receive()
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Failed to apply {topic} event to routing table: {e}")
+
+    def get_model(self, name: str) -> Optional[Model]:
+        return self._models_by_name.get(name)
+
+    def get_running_instances(self, model_id: int) -> List[ModelInstance]:
+        instances = self._running_instances.get(model_id)
+        if not instances:
+            return []
+        return sorted(instances.values(), key=lambda i: i.id)
+
+    def get_worker(self, worker_id: int) -> Optional[Worker]:
+        return self._workers.get(worker_id)
+
+    def _apply_model(self, event: Event):
+        model: Model = event.data
+        current = self._models_by_id.get(model.id)
+        if event.type != EventType.DELETED and _is_stale(current, model):
+            return
+
+        if current is not None and current.name in self._models_by_name:
+            del self._models_by_name[current.name]
+
+        if event.type == EventType.DELETED or model.deleted_at is not None:
+            self._models_by_id.pop(model.id, None)
+            for instance_id in self._running_instances.pop(model.id, {}):
+                load_balancer.latency.forget(instance_id)
+            return
+
+        self._models_by_id[model.id] = model
+        self._models_by_name[model.name] = model
+
+    def _apply_model_instance(self, event: Event):
+        instance: ModelInstance = event.data
+        instances = self._running_instances.get(instance.model_id, {})
+        current = instances.get(instance.id)
+        if event.type != EventType.DELETED and _is_stale(current, instance):
+            return
+
+        if (
+            event.type == EventType.DELETED
+            or instance.state != ModelInstanceStateEnum.RUNNING
+        ):
+            instances.pop(instance.id, None)
+            if not instances:
+                self._running_instances.pop(instance.model_id, None)
+            # The latency of a deleted or rescheduled instance is no longer
+            # relevant, and would skew the default of unobserved instances.
+            load_balancer.latency.forget(instance.id)
+            return
+
+        instances[instance.id] = instance
+        self._running_instances[instance.model_id] = instances
+
+    def _apply_worker(self, event: Event):
+        worker: Worker = event.data
+        if event.type == EventType.DELETED or worker.deleted_at is not None:
+            self._workers.pop(worker.id, None)
+            proxy_connection_pool.evict(worker.ip)
+            return
+
+        if _is_stale(self._workers.get(worker.id), worker):
+            return
+        self._workers[worker.id] = worker
+        if worker.state == WorkerStateEnum.UNREACHABLE:
+            # Pooled connections to the worker and its instances are likely dead.
+            proxy_connection_pool.evict(worker.ip)
+
+
+def _is_stale(current, incoming) -> bool:
+    """
+    Events queued while the initial state was loading may be older than what
+    was read from the database. Skip anything older than what we already have.
+    """
+    if current is None:
+        return False
+    current_updated_at = getattr(current, "updated_at", None)
+    incoming_updated_at = getattr(incoming, "updated_at", None)
+    if current_updated_at is None or incoming_updated_at is None:
+        return False
+    return incoming_updated_at < current_updated_at
+
+
+routing_table = RoutingTable()
@@ -0,0 +1,102 @@
+import re
+from typing import Iterator, Tuple, Union
+
+# Blank lines ending a frame, with LF, CRLF or CR line endings.
+FRAME_DELIMITERS = (b"\n\n", b"\r\n\r\n", b"\r\r")
+# Frames carrying a non-null usage object, e.g. the final chunk of a stream
+# requested with `stream_options.include_usage`.
+USAGE_PATTERN = re.compile(rb'"usage":(?!null)')
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+class SSEUsageScanner:
+    """
+    Tracks SSE frame boundaries over a byte stream without decoding it.
+
+    Bytes are handed back as memoryview slices of the input chunks, unchanged.
+    Only frames carrying usage are flagged so the caller can parse them; the
+    partial frame at the end of a chunk is the only data that is copied.
+    """
+
+    def __init__(self, max_pending: int = 1024 * 1024):
+        self._pending = b""
+        self._max_pending = max_pending
+
+    def feed(self, chunk: BytesLike) -> Iterator[Tuple[memoryview, bool]]:
+        """
+        Yield (segment, is_usage_frame) for every complete frame region in
+        the chunk. Usage frames are always yielded as a segment of their own.
+        """
+        data = self._pending + chunk if self._pending else chunk
+        if isinstance(data, memoryview):
+            data = data.obj if _is_whole_view(data) else data.tobytes()
+
+        end = _last_frame_end(data, 0, len(data))
+        if end == -1:
+            if len(data) <= self._max_pending:
+                self._pending = bytes(data)
+                return
+            # No frame boundary in sight, stop buffering and pass it through.
+            end = len(data)
+
+        self._pending = bytes(data[end:])
+        yield from _split_usage_frames(data, end)
+
+    def flush(self) -> Iterator[Tuple[memoryview, bool]]:
+        """
+        Yield whatever is left once the upstream stream has ended.
+        """
+        data = self._pending
+        self._pending = b""
+        if data:
+            yield from _split_usage_frames(data, len(data))
+
+
+def _is_whole_view(view: memoryview) -> bool:
+    return isinstance(view.obj, bytes) and view.nbytes == len(view.obj)
+
+
+def _last_frame_end(data: BytesLike, start: int, end: int) -> int:
+    """
+    The end of the last frame delimiter in data[start:end], or -1 if none.
+    """
+    result = -1
+    for delimiter in FRAME_DELIMITERS:
+        index = data.rfind(delimiter, start, end)
+        if index != -1:
+            result = max(result, index + len(delimiter))
+    return result
+
+
+def _first_frame_end(data: BytesLike, start: int, end: int) -> int:
+    """
+    The end of the first frame delimiter in data[start:end], or -1 if none.
+    """
+    result = -1
+    for delimiter in FRAME_DELIMITERS:
+        index = data.find(delimiter, start, end)
+        if index != -1 and (result == -1 or index + len(delimiter) < result):
+            result = index + len(delimiter)
+    return result
+
+
+def _split_usage_frames(data: BytesLike, end: int) -> Iterator[Tuple[memoryview, bool]]:
+    view = memoryview(data)
+    start = 0
+    for match in USAGE_PATTERN.finditer(data, 0, end):
+        if match.start() < start:
+            # Another usage key inside a frame that was already yielded.
+            continue
+        frame_start = max(start, _last_frame_end(data, start, match.start()))
+        frame_end = _first_frame_end(data, match.end(), end)
+        if frame_end == -1:
+            frame_end = end
+
+        if frame_start > start:
+            yield view[start:frame_start], False
+        yield view[frame_start:frame_end], True
+        start = frame_end
+
+    if end > start:
+        yield view[start:end], False
@@ -1,35 +1,302 @@
 from abc import ABC, abstractmethod
+import bisect
+import hashlib
 import logging
-from typing import Dict, List
-import itertools
+import math
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from gpustack.schemas.models import ModelInstance
 
 logger = logging.getLogger(__name__)
 
 
+class InFlightRequests:
+    """
+    Tracks the number of in-flight requests per model instance ID.
+    """
+
+    def __init__(self):
+        self._counts: Dict[int, int] = {}
+
+    def get(self, instance_id: int) -> int:
+        return self._counts.get(instance_id, 0)
+
+    def acquire(self, instance_id: int) -> Callable[[], None]:
+        """
+        Count a new request against the instance.
+        Returns an idempotent callback that releases it.
+        """
+        self._counts[instance_id] = self._counts.get(instance_id, 0) + 1
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            count = self._counts.get(instance_id, 0) - 1
+            if count > 0:
+                self._counts[instance_id] = count
+            else:
+                self._counts.pop(instance_id, None)
+
+        return release
+
+
+class LatencyTracker:
+    """
+    Exponentially weighted moving averages of the time to first token and
+    time per output token observed on each model instance.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self._alpha = alpha
+        self._ttft_ms: Dict[int, float] = {}
+        self._tpot_ms: Dict[int, float] = {}
+
+    def observe(
+        self,
+        instance_id: int,
+        time_to_first_token_ms: Optional[float] = None,
+        time_per_output_token_ms: Optional[float] = None,
+    ):
+        if time_to_first_token_ms is not None:
+            self._update(self._ttft_ms, instance_id, time_to_first_token_ms)
+        if time_per_output_token_ms is not None:
+            self._update(self._tpot_ms, instance_id, time_per_output_token_ms)
+
+    def _update(self, averages: Dict[int, float], instance_id: int, value: float):
+        current = averages.get(instance_id)
+        if current is None:
+            averages[instance_id] = value
+        else:
+            averages[instance_id] = self._alpha * value + (1 - self._alpha) * current
+
+    def expected_latency_ms(self, instance_id: int) -> Optional[float]:
+        """
+        Expected latency of the instance, or None if it has not been observed.
+        """
+        ttft = self._ttft_ms.get(instance_id)
+        tpot = self._tpot_ms.get(instance_id)
+        if ttft is None and tpot is None:
+            return None
+        return (ttft or 0.0) + (tpot or 0.0)
+
+    def forget(self, instance_id: int):
+        self._ttft_ms.pop(instance_id, None)
+        self._tpot_ms.pop(instance_id, None)
+
+
 class LoadBalancingStrategy(ABC):
+    # Whether the strategy routes on the request prompt prefix.
+    uses_affinity_key: bool = False
 
     @abstractmethod
-    async def select_instance(self, instances: List[ModelInstance]) -> ModelInstance:
+    async def select_instance(
+        self, instances: List[ModelInstance], affinity_key: Optional[str] = None
+    ) -> ModelInstance:
         pass
 
 
 class RoundRobinStrategy(LoadBalancingStrategy):
     def __init__(self):
-        self._iterators: Dict[int, itertools.cycle] = {}
-        self._instance_lists: Dict[int, List[ModelInstance]] = {}
+        self._counters: Dict[int, int] = {}
+
+    async def select_instance(
+        self, instances: List[ModelInstance], affinity_key: Optional[str] = None
+    ) -> ModelInstance:
+        if len(instances) == 0:
+            raise Exception("No instances available")
+        model_id = instances[0].model_id
+        # Index into the current list rather than cycling over a cached copy,
+        # so instance changes never require a rebuild or serve stale objects.
+        counter = self._counters.get(model_id, 0)
+        self._counters[model_id] = counter + 1
+        return instances[counter % len(instances)]
+
+
+class LeastOutstandingRequestsStrategy(LoadBalancingStrategy):
+    def __init__(self, in_flight: InFlightRequests):
+        self._in_flight = in_flight
+        self._counters: Dict[int, int] = {}
 
-    async def select_instance(self, instances: List[ModelInstance]) -> ModelInstance:
+    async def select_instance(
+        self, instances: List[ModelInstance], affinity_key: Optional[str] = None
+    ) -> ModelInstance:
         if len(instances) == 0:
             raise Exception("No instances available")
         model_id = instances[0].model_id
-        if (
-            model_id not in self._iterators
-            or self._instance_lists[model_id] != instances
-        ):
-            logger.debug(f"Creating new iterator for model {model_id}")
-            self._iterators[model_id] = itertools.cycle(instances)
-            self._instance_lists[model_id] = instances
-
-        return next(self._iterators[model_id])
+        # Rotate the starting point so ties are spread across instances.
+        offset = self._counters.get(model_id, 0)
+        self._counters[model_id] = offset + 1
+        rotated = [
+            instances[(offset + i) % len(instances)] for i in range(len(instances))
+        ]
+        return min(rotated, key=lambda instance: self._in_flight.get(instance.id))
+
+
+class PowerOfTwoChoicesStrategy(LoadBalancingStrategy):
+    """
+    Samples two instances at random and picks the one with the lower
+    expected latency multiplied by its in-flight load, so slow or degraded
+    replicas receive less traffic.
+    """
+
+    def __init__(self, in_flight: InFlightRequests, latency: LatencyTracker):
+        self._in_flight = in_flight
+        self._latency = latency
+
+    async def select_instance(
+        self, instances: List[ModelInstance], affinity_key: Optional[str] = None
+    ) -> ModelInstance:
+        if len(instances) == 0:
+            raise Exception("No instances available")
+        if len(instances) == 1:
+            return instances[0]
+
+        first, second = random.sample(instances, 2)
+        # Instances without observations yet are assumed to be average.
+        observed = [
+            latency
+            for latency in (
+                self._latency.expected_latency_ms(instance.id) for instance in instances
+            )
+            if latency is not None
+        ]
+        default_latency = sum(observed) / len(observed) if observed else 1.0
+
+        def cost(instance: ModelInstance) -> float:
+            latency = self._latency.expected_latency_ms(instance.id)
+            if latency is None:
+                latency = default_latency
+            return latency * (self._in_flight.get(instance.id) + 1)
+
+        return first if cost(first) <= cost(second) else second
+
+
+class PrefixAffinityStrategy(LoadBalancingStrategy):
+    """
+    Consistent hashing on the request prompt prefix, so requests sharing a
+    system prompt or conversation history land on the instance that already
+    holds the prefix in its KV cache.
+
+    Uses consistent hashing with bounded loads: an instance is skipped in
+    favor of the next node on the ring once its in-flight requests exceed
+    `load_factor` times the average.
+    """
+
+    uses_affinity_key = True
+
+    def __init__(
+        self,
+        in_flight: InFlightRequests,
+        virtual_nodes: int = 100,
+        load_factor: float = 1.25,
+    ):
+        self._in_flight = in_flight
+        self._virtual_nodes = virtual_nodes
+        self._load_factor = load_factor
+        self._fallback = LeastOutstandingRequestsStrategy(in_flight)
+        # model_id -> (instance ids, sorted ring of (hash, instance id))
+        self._rings: Dict[int, Tuple[Tuple[int, ...], List[Tuple[int, int]]]] = {}
+
+    async def select_instance(
+        self, instances: List[ModelInstance], affinity_key: Optional[str] = None
+    ) -> ModelInstance:
+        if len(instances) == 0:
+            raise Exception("No instances available")
+        if affinity_key is None or len(instances) == 1:
+            return await self._fallback.select_instance(instances)
+
+        instances_by_id = {instance.id: instance for instance in instances}
+        ring = self._get_ring(instances[0].model_id, instances_by_id)
+
+        total_in_flight = sum(self._in_flight.get(id) for id in instances_by_id)
+        capacity = math.ceil(
+            self._load_factor * (total_in_flight + 1) / len(instances_by_id)
+        )
+
+        start = bisect.bisect(ring, (_hash(affinity_key),))
+        visited = set()
+        for i in range(len(ring)):
+            _, instance_id = ring[(start + i) % len(ring)]
+            if instance_id in visited:
+                continue
+            visited.add(instance_id)
+            if self._in_flight.get(instance_id) < capacity:
+                return instances_by_id[instance_id]
+            if len(visited) == len(instances_by_id):
+                break
+
+        return await self._fallback.select_instance(instances)
+
+    def _get_ring(
+        self, model_id: int, instances_by_id: Dict[int, ModelInstance]
+    ) -> List[Tuple[int, int]]:
+        instance_ids = tuple(sorted(instances_by_id))
+        cached = self._rings.get(model_id)
+        if cached is not None and cached[0] == instance_ids:
+            return cached[1]
+
+        logger.debug(f"Building hash ring for model {model_id}")
+        ring = sorted(
+            (_hash(f"{instance_id}-{i}"), instance_id)
+            for instance_id in instance_ids
+            for i in range(self._virtual_nodes)
+        )
+        self._rings[model_id] = (instance_ids, ring)
+        return ring
+
+
+def _hash(value: str) -> int:
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def prefix_affinity_key(body: Optional[dict], max_chars: int) -> Optional[str]:
+    """
+    Build a normalized prompt prefix from a chat or completion request body.
+
+    For chat requests this is the system prompt plus the first `max_chars`
+    characters of the first non-system message, which stays the same across
+    turns of a conversation. For completions it is the head of the prompt.
+    """
+    if not isinstance(body, dict):
+        return None
+
+    messages = body.get("messages")
+    if isinstance(messages, list):
+        system_parts = []
+        first_message = ""
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            role = message.get("role")
+            if role in ("system", "developer"):
+                system_parts.append(_content_text(message.get("content")))
+                continue
+            first_message = _content_text(message.get("content"))[:max_chars]
+            break
+        key = "\n".join(system_parts) + "\n" + first_message
+        return key if key.strip() else None
+
+    prompt = body.get("prompt")
+    if isinstance(prompt, list) and prompt and isinstance(prompt[0], str):
+        prompt = prompt[0]
+    if isinstance(prompt, str) and prompt:
+        return prompt[:max_chars]
+
+    return None
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content.strip()
+    if isinstance(content, list):
+        return " ".join(
+            part.get("text", "").strip()
+            for part in content
+            if isinstance(part, dict) and part.get("type") == "text"
+        )
+    return ""
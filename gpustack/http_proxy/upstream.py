@@ -0,0 +1,17 @@
+import aiohttp
+
+# Set by the worker proxy on errors it returns because the inference server
+# could not be reached, so the server proxy knows the request can be replayed
+# on another instance.
+UPSTREAM_UNREACHABLE_HEADER = "X-GPUStack-Upstream-Unreachable"
+
+
+def is_upstream_unreachable(resp: aiohttp.ClientResponse) -> bool:
+    return resp.headers.get(UPSTREAM_UNREACHABLE_HEADER) == "true"
+
+
+class UpstreamUnreachableError(Exception):
+    """The worker proxy could not reach the inference server."""
+
+    def __init__(self, content: bytes):
+        super().__init__(content.decode("utf-8", "replace"))
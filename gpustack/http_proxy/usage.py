@@ -0,0 +1,70 @@
+import json
+import re
+from typing import Optional, Union
+
+# The opening of a `"usage": {...}` member. Quotes inside JSON strings are
+# escaped, so this never matches string contents.
+USAGE_KEY_PATTERN = re.compile(rb'"usage"\s*:\s*\{')
+# Usage objects are small, do not decode more than this per candidate.
+MAX_USAGE_SIZE = 4096
+
+_decoder = json.JSONDecoder()
+
+
+class JSONUsageScanner:
+    """
+    Finds the usage object of a JSON response body while it is streamed.
+
+    Only bounded windows at the head and the tail of the body are kept. The
+    usage object is the last member of most OpenAI-compatible responses, and
+    the first members of the rest, so it is found in one of them without
+    buffering or parsing the whole body.
+    """
+
+    def __init__(self, window_size: int = 64 * 1024):
+        self._window_size = window_size
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._truncated = False
+
+    def feed(self, chunk: Union[bytes, bytearray, memoryview]):
+        if len(self._head) < self._window_size:
+            take = self._window_size - len(self._head)
+            self._head += chunk[:take]
+            chunk = chunk[take:]
+        if not chunk:
+            return
+
+        self._tail += chunk
+        if len(self._tail) > 2 * self._window_size:
+            # Trim lazily to keep the amortized cost per byte constant.
+            del self._tail[: len(self._tail) - self._window_size]
+            self._truncated = True
+
+    def usage(self) -> Optional[dict]:
+        if not self._truncated:
+            return _find_usage(self._head + self._tail, reverse=True)
+        usage = _find_usage(self._tail, reverse=True)
+        if usage is None:
+            usage = _find_usage(self._head, reverse=False)
+        return usage
+
+
+def _find_usage(data: bytearray, reverse: bool) -> Optional[dict]:
+    matches = list(USAGE_KEY_PATTERN.finditer(data))
+    if reverse:
+        matches.reverse()
+
+    for match in matches:
+        start = match.end() - 1
+        text = data[start : start + MAX_USAGE_SIZE].decode("utf-8", "replace")
+        try:
+            usage, _ = _decoder.raw_decode(text)
+        except ValueError:
+            # Truncated by the window or not a usage object.
+            continue
+        if isinstance(usage, dict) and (
+            "total_tokens" in usage or "prompt_tokens" in usage
+        ):
+            return usage
+    return None
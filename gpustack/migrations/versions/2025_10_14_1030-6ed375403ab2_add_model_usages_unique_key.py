@@ -0,0 +1,69 @@
+"""add unique key to model_usages
+
+Revision ID: 6ed375403ab2
+Revises: nrxtab43e8j8
+Create Date: 2025-10-14 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6ed375403ab2'
+down_revision: Union[str, None] = 'nrxtab43e8j8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # Merge duplicated usage rows created by concurrent requests into the
+    # one with the lowest id before adding the unique key.
+    duplicates = conn.execute(
+        sa.text("""
+            SELECT user_id, model_id, date, operation, MIN(id),
+                SUM(prompt_token_count), SUM(completion_token_count), SUM(request_count)
+            FROM model_usages
+            GROUP BY user_id, model_id, date, operation
+            HAVING COUNT(*) > 1
+        """)
+    ).fetchall()
+    for user_id, model_id, date, operation, keep_id, prompt, completion, requests in duplicates:
+        conn.execute(
+            sa.text("""
+                UPDATE model_usages
+                SET prompt_token_count = :prompt,
+                    completion_token_count = :completion,
+                    request_count = :requests
+                WHERE id = :keep_id
+            """),
+            dict(prompt=prompt, completion=completion, requests=requests, keep_id=keep_id),
+        )
+        conn.execute(
+            sa.text("""
+                DELETE FROM model_usages
+                WHERE user_id = :user_id AND model_id = :model_id
+                AND date = :date AND operation = :operation AND id != :keep_id
+            """),
+            dict(
+                user_id=user_id,
+                model_id=model_id,
+                date=date,
+                operation=operation,
+                keep_id=keep_id,
+            ),
+        )
+
+    with op.batch_alter_table('model_usages', schema=None) as batch_op:
+        batch_op.create_unique_constraint(
+            'uix_model_usages_key', ['user_id', 'model_id', 'date', 'operation']
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('model_usages', schema=None) as batch_op:
+        batch_op.drop_constraint('uix_model_usages_key', type_='unique')
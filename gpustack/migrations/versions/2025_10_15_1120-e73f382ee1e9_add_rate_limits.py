@@ -0,0 +1,38 @@
+"""add rate_limit to api_keys, users and models
+
+Revision ID: e73f382ee1e9
+Revises: 6ed375403ab2
+Create Date: 2025-10-15 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from gpustack.schemas.stmt import (
+    model_user_after_create_view_stmt,
+    model_user_after_drop_view_stmt,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e73f382ee1e9'
+down_revision: Union[str, None] = '6ed375403ab2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('api_keys', 'users', 'models'):
+        op.add_column(table, sa.Column('rate_limit', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    # SQLite recreates the models table to drop the column, which fails while
+    # the view selecting from it exists.
+    op.execute(model_user_after_drop_view_stmt)
+    for table in ('models', 'users', 'api_keys'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('rate_limit')
+    op.execute(model_user_after_create_view_stmt(op.get_bind().dialect.name))
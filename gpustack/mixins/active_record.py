@@ -4,7 +4,17 @@ import importlib
 import json
 import logging
 import math
-from typing import Any, AsyncGenerator, Callable, List, Optional, Union, Tuple
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Union,
+    Tuple,
+)
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import func, event as sa_event, inspect
@@ -15,11 +25,24 @@ from sqlalchemy.orm import Session
 from sqlalchemy.orm.exc import FlushError
 from sqlalchemy.ext.asyncio import AsyncEngine
 from gpustack.schemas.common import PaginatedList, Pagination
-from gpustack.server.bus import Event, EventType, event_bus
+from gpustack.server.bus import (
+    WATCH_OVERFLOW_POLICY,
+    Event,
+    EventsDropped,
+    EventType,
+    OverflowPolicy,
+    Subscriber,
+    event_bus,
+)
+from gpustack.utils.merge_patch import contains_null, create_merge_patch
 
 
 logger = logging.getLogger(__name__)
 
+# Updates of an object sent as merge patches by a delta watch stream before
+# the object is sent in full again.
+DELTA_SNAPSHOT_INTERVAL = 20
+
 
 class CommitEvent:
     name: str
@@ -94,6 +117,89 @@ def send_post_commit_events(session: AsyncSession):
             logger.error(f"Failed to publish events: {e}")
 
 
+class _DeltaTracker:
+    """
+    Tracks the objects sent by a delta watch stream, to tell which updates
+    can be sent as merge patches of the version sent before.
+    """
+
+    def __init__(self):
+        # Object ID -> (revision sent, updates sent as patches since)
+        self._sent: Dict[Hashable, Tuple[int, int]] = {}
+
+    def can_patch(self, event: Event) -> bool:
+        """Whether the event can be sent as a patch of the version sent before."""
+        object_id = getattr(event.data, "id", None)
+        if object_id is None or event.revision == 0:
+            return False
+
+        revision, patches = self._sent.get(object_id, (0, 0))
+        return (
+            event.type == EventType.UPDATED
+            and bool(event.changed_fields)
+            and revision != 0
+            and revision == event.previous_revision
+            and patches < DELTA_SNAPSHOT_INTERVAL
+        )
+
+    def sent(self, event: Event, patched: bool):
+        """Record the event as sent, as a patch or in full."""
+        object_id = getattr(event.data, "id", None)
+        # Relisted objects are sent in full without revisions.
+        if object_id is None or event.revision == 0:
+            return
+        if event.type == EventType.DELETED:
+            self._sent.pop(object_id, None)
+            return
+
+        _, patches = self._sent.get(object_id, (0, 0))
+        self._sent[object_id] = (event.revision, patches + 1 if patched else 0)
+
+
+def _matching_history(
+    subscriber: Subscriber, topic: str, since: int
+) -> Optional[List[Event]]:
+    history = event_bus.history(topic, since)
+    if history is None:
+        return None
+    return [e for e in history if subscriber.matches(e.data)]
+
+
+async def _receive(
+    subscriber: Subscriber, topic: str, revision: int
+) -> AsyncGenerator[Event, None]:
+    """
+    Receive the events after the revision, with heartbeats when idle.
+    """
+    heartbeat_interval = timedelta(seconds=15)
+    last_event_time = datetime.now(timezone.utc)
+
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                subscriber.receive(), timeout=heartbeat_interval.total_seconds()
+            )
+            # Skip events already in the history or the relist.
+            if event.revision <= revision:
+                continue
+            revision = event.revision
+            yield event
+        except EventsDropped:
+            history = None
+            if not subscriber.closed:
+                history = _matching_history(subscriber, topic, revision)
+            if history is None:
+                logger.warning(f"Closing {topic} subscription falling behind events")
+                return
+            for event in history:
+                revision = event.revision
+                yield event
+        except asyncio.TimeoutError:
+            if datetime.now(timezone.utc) - last_event_time >= heartbeat_interval:
+                yield Event(type=EventType.HEARTBEAT, data=None, revision=revision)
+                last_event_time = datetime.now(timezone.utc)
+
+
 class ActiveRecordMixin:
     """ActiveRecordMixin provides a set of methods to interact with the database."""
 
@@ -455,32 +561,70 @@ class ActiveRecordMixin:
         )
 
     @classmethod
-    async def subscribe(cls, engine: AsyncEngine) -> AsyncGenerator[Event, None]:
-        subscriber = event_bus.subscribe(cls.__name__.lower())
-        async with AsyncSession(engine) as session:
-            items = await cls.all(session)
-            for item in items:
-                yield Event(type=EventType.CREATED, data=item)
-
-        heartbeat_interval = timedelta(seconds=15)
-        last_event_time = datetime.now(timezone.utc)
+    async def subscribe(
+        cls,
+        engine: AsyncEngine,
+        resource_version: Optional[int] = None,
+        fields: Optional[dict] = None,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Subscribe to the events of the class, resuming after the resource
+        version if given. Without it, or when the events after it are no longer
+        kept, all objects are relisted as created events first. A relist for a
+        resource version ends with a heartbeat carrying the revision to resume
+        from. Heartbeats carry the revision of the latest event received.
+
+        With fields, only events of objects with the field values are received,
+        filtered by the event bus. When events are dropped by the overflow
+        policy, they are replayed from the history, and the subscription ends
+        if they are no longer kept or the policy is to disconnect.
+        """
+        topic = cls.__name__.lower()
+        subscriber = event_bus.subscribe(topic, fields, overflow)
+        revision = event_bus.revision
+        history = None
+        if resource_version is not None:
+            history = _matching_history(subscriber, topic, resource_version)
 
         try:
-            while True:
-                try:
-                    event = await asyncio.wait_for(
-                        subscriber.receive(), timeout=heartbeat_interval.total_seconds()
-                    )
-                    yield event
-                except asyncio.TimeoutError:
-                    if (
-                        datetime.now(timezone.utc) - last_event_time
-                        >= heartbeat_interval
-                    ):
-                        yield Event(type=EventType.HEARTBEAT, data=None)
-                        last_event_time = datetime.now(timezone.utc)
+            async for event in cls._replay(
+                engine, history, revision, resource_version is not None, fields
+            ):
+                yield event
+
+            async for event in _receive(subscriber, topic, revision):
+                yield event
         finally:
-            event_bus.unsubscribe(cls.__name__.lower(), subscriber)
+            event_bus.unsubscribe(topic, subscriber)
+
+    @classmethod
+    async def _replay(
+        cls,
+        engine: AsyncEngine,
+        history: Optional[List[Event]],
+        revision: int,
+        resumable: bool,
+        fields: Optional[dict] = None,
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Replay the events before a subscription at the revision, a relist of
+        the objects with the field values if there is no history.
+        """
+        if history is not None:
+            for event in history:
+                yield event
+            return
+
+        async with AsyncSession(engine) as session:
+            if fields:
+                items = await cls.all_by_fields(session, fields)
+            else:
+                items = await cls.all(session)
+            for item in items:
+                yield Event(type=EventType.CREATED, data=item)
+        if resumable:
+            yield Event(type=EventType.HEARTBEAT, data=None, revision=revision)
 
     @classmethod
     async def streaming(
@@ -489,15 +633,33 @@ class ActiveRecordMixin:
         fields: Optional[dict] = None,
         fuzzy_fields: Optional[dict] = None,
         filter_func: Optional[Callable[[Any], bool]] = None,
-    ) -> AsyncGenerator[str, None]:
-        """Stream events matching the given criteria as JSON strings."""
+        resource_version: Optional[int] = None,
+        delta: bool = False,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Stream events matching the given criteria as JSON. Events are filtered
+        by the fields on the event bus, and the encoding of an event is shared
+        by all streams of the class.
+
+        With a resource version, the stream resumes after it and events carry
+        their revision, with heartbeats sent as events too. Otherwise events
+        are sent without revisions and heartbeats as blank lines.
+
+        With delta, updates of an object already sent are sent as JSON merge
+        patches of its public data instead, with a full snapshot every
+        DELTA_SNAPSHOT_INTERVAL updates.
+        """
+        resumable = resource_version is not None
+        delta_tracker = _DeltaTracker() if delta else None
         try:
-            async for event in cls.subscribe(engine):
+            async for event in cls.subscribe(
+                engine, resource_version, fields, OverflowPolicy(WATCH_OVERFLOW_POLICY)
+            ):
                 if event.type == EventType.HEARTBEAT:
-                    yield "\n\n"
-                    continue
-
-                if not cls._match_fields(event, fields):
+                    if resumable:
+                        yield cls._encode_event(event, resumable)
+                    else:
+                        yield b"\n\n"
                     continue
 
                 if not cls._match_fuzzy_fields(event, fuzzy_fields):
@@ -506,20 +668,35 @@ class ActiveRecordMixin:
                 if filter_func and not filter_func(event.data):
                     continue
 
-                event.data = cls._convert_to_public_class(event.data)
-                yield cls._format_event(event)
+                yield cls._encode_stream_event(event, resumable, delta_tracker)
         except asyncio.CancelledError:
             pass
         except Exception as e:
             logger.error(f"Error in streaming {cls.__name__}: {e}")
 
     @classmethod
-    def _match_fields(cls, event: Any, fields: Optional[dict]) -> bool:
-        """Match fields using AND condition."""
-        for key, value in (fields or {}).items():
-            if getattr(event.data, key, None) != value:
-                return False
-        return True
+    def _encode_stream_event(
+        cls,
+        event: Event,
+        resumable: bool,
+        delta_tracker: Optional[_DeltaTracker],
+    ) -> bytes:
+        """
+        Encode the event for a stream, as a merge patch if the delta stream
+        can send it as one.
+        """
+        encoded = None
+        if delta_tracker and delta_tracker.can_patch(event):
+            encoded = event.encoded(
+                (cls, resumable, "patch"),
+                lambda e: cls._encode_patch(e, resumable),
+            )
+        if delta_tracker:
+            delta_tracker.sent(event, patched=encoded is not None)
+
+        return encoded or event.encoded(
+            (cls, resumable), lambda e: cls._encode_event(e, resumable)
+        )
 
     @classmethod
     def _match_fuzzy_fields(cls, event: Any, fuzzy_fields: Optional[dict]) -> bool:
@@ -537,7 +714,47 @@ class ActiveRecordMixin:
         public_class = getattr(class_module, f"{cls.__name__}Public", None)
         return public_class.model_validate(data) if public_class else data
 
-    @staticmethod
-    def _format_event(event: Any) -> str:
-        """Format the event as a JSON string."""
-        return json.dumps(jsonable_encoder(event), separators=(",", ":")) + "\n\n"
+    @classmethod
+    def _encode_event(cls, event: Event, with_revision: bool = False) -> bytes:
+        """Encode the event with its public data as JSON."""
+        encoded = {
+            "type": event.type,
+            "data": (
+                None if event.data is None else cls._convert_to_public_class(event.data)
+            ),
+            "changed_fields": event.changed_fields,
+        }
+        if with_revision:
+            encoded["revision"] = event.revision
+        encoded = jsonable_encoder(encoded)
+        return (json.dumps(encoded, separators=(",", ":")) + "\n\n").encode()
+
+    @classmethod
+    def _encode_patch(
+        cls, event: Event, with_revision: bool = False
+    ) -> Optional[bytes]:
+        """
+        Encode the update event as a JSON merge patch of the previous version
+        of the public data, computed from the changed fields. Returns None if
+        the patch would carry a null: applying it removes the key, and the
+        default the model fills in may differ from the null.
+        """
+        data = jsonable_encoder(cls._convert_to_public_class(event.data))
+        patch = {"id": data.get("id")}
+        for key, (old, _) in event.changed_fields.items():
+            if key not in data:
+                continue
+            if isinstance(old, (list, tuple)) and len(old) == 1:
+                patch[key] = create_merge_patch(jsonable_encoder(old[0]), data[key])
+            else:
+                # The previous value is not known.
+                patch[key] = data[key]
+
+        if contains_null(patch):
+            return None
+
+        encoded = {"type": event.type, "patch": patch}
+        if with_revision:
+            encoded["revision"] = event.revision
+        encoded = jsonable_encoder(encoded)
+        return (json.dumps(encoded, separators=(",", ":")) + "\n\n").encode()
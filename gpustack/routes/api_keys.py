@@ -1,10 +1,12 @@
 from datetime import datetime, timedelta, timezone
 import secrets
+from typing import Optional
 from fastapi import APIRouter
 from fastapi.responses import StreamingResponse
 
 from gpustack.api.exceptions import (
     AlreadyExistsException,
+    ForbiddenException,
     InternalServerErrorException,
     NotFoundException,
 )
@@ -17,6 +19,7 @@ from gpustack.schemas.api_keys import (
     ApiKeysPublic,
     ApiKeyUpdate,
 )
+from gpustack.schemas.common import RateLimit
 from gpustack.schemas.users import User
 from gpustack.server.services import APIKeyService
 
@@ -39,7 +42,13 @@ async def get_api_keys(
 
     if params.watch:
         return StreamingResponse(
-            ApiKey.streaming(engine, fields=fields, fuzzy_fields=fuzzy_fields),
+            ApiKey.streaming(
+                engine,
+                fields=fields,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
@@ -56,6 +65,7 @@ async def get_api_keys(
 async def create_api_key(
     session: SessionDep, user: CurrentUserDep, key_in: ApiKeyCreate
 ):
+    check_rate_limit_change(user, None, key_in.rate_limit)
     fields = {"user_id": user.id, "name": key_in.name}
     existing = await ApiKey.one_by_fields(session, fields)
     if existing:
@@ -81,6 +91,7 @@ async def create_api_key(
             hashed_secret_key=get_secret_hash(secret_key),
             expires_at=expires_at,
             allowed_model_names=key_in.allowed_model_names,
+            rate_limit=key_in.rate_limit,
         )
         api_key = await ApiKey.create(session, api_key)
     except Exception as e:
@@ -95,6 +106,7 @@ async def create_api_key(
         updated_at=api_key.updated_at,
         expires_at=api_key.expires_at,
         allowed_model_names=api_key.allowed_model_names,
+        rate_limit=api_key.rate_limit,
     )
 
 
@@ -117,6 +129,8 @@ async def update_api_key(
     api_key = await ApiKey.one_by_id(session, id)
     if not api_key or api_key.user_id != user.id:
         raise NotFoundException(message="Api key not found")
+    if "rate_limit" in key_in.model_fields_set:
+        check_rate_limit_change(user, api_key.rate_limit, key_in.rate_limit)
     try:
         await api_key.update(
             session=session, source=key_in.model_dump(exclude_unset=True)
@@ -124,3 +138,16 @@ async def update_api_key(
     except Exception as e:
         raise InternalServerErrorException(message=f"Failed to update api key: {e}")
     return api_key
+
+
+def check_rate_limit_change(
+    user: User, current: Optional[RateLimit], rate_limit: Optional[RateLimit]
+):
+    """
+    Rate limits are set by admins, users can't change the limits of their
+    own API keys.
+    """
+    if rate_limit != current and not user.is_admin:
+        raise ForbiddenException(
+            message="Only admins can set the rate limit of an API key"
+        )
@@ -41,7 +41,13 @@ async def list(
 
     if params.watch:
         return StreamingResponse(
-            CloudCredential.streaming(engine, fields=fields, fuzzy_fields=fuzzy_fields),
+            CloudCredential.streaming(
+                engine,
+                fields=fields,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
@@ -62,7 +62,13 @@ async def get_clusters(
 
     if params.watch:
         return StreamingResponse(
-            Cluster.streaming(engine, fields=fields, fuzzy_fields=fuzzy_fields),
+            Cluster.streaming(
+                engine,
+                fields=fields,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
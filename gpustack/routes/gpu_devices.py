@@ -30,7 +30,13 @@ async def get_gpus(
         fields["cluster_id"] = cluster_id
     if params.watch:
         return StreamingResponse(
-            GPUDevice.streaming(engine, fuzzy_fields=fuzzy_fields, fields=fields),
+            GPUDevice.streaming(
+                engine,
+                fuzzy_fields=fuzzy_fields,
+                fields=fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
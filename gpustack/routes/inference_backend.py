@@ -294,6 +294,8 @@ async def get_inference_backends(
             InferenceBackend.streaming(
                 engine,
                 fields=fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
             ),
             media_type="text/event-stream",
         )
@@ -46,6 +46,8 @@ async def get_model_files(
                 engine,
                 fields=fields,
                 filter_func=get_filter_func(search),
+                resource_version=params.resourceVersion,
+                delta=params.delta,
             ),
             media_type="text/event-stream",
         )
@@ -34,6 +34,7 @@ async def get_model_instances(
     id: Optional[int] = None,
     model_id: Optional[int] = None,
     worker_id: Optional[int] = None,
+    cluster_id: Optional[int] = None,
     state: Optional[str] = None,
 ):
     fields = {}
@@ -46,12 +47,20 @@ async def get_model_instances(
     if worker_id:
         fields["worker_id"] = worker_id
 
+    if cluster_id:
+        fields["cluster_id"] = cluster_id
+
     if state:
         fields["state"] = state
 
     if params.watch:
         return StreamingResponse(
-            ModelInstance.streaming(engine, fields=fields),
+            ModelInstance.streaming(
+                engine,
+                fields=fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
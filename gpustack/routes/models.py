@@ -68,6 +68,8 @@ async def get_models(
                 engine,
                 fuzzy_fields=fuzzy_fields,
                 filter_func=lambda data: categories_filter(data, categories),
+                resource_version=params.resourceVersion,
+                delta=params.delta,
             ),
             media_type="text/event-stream",
         )
@@ -154,7 +156,12 @@ async def get_model_instances(
     if params.watch:
         fields = {"model_id": id}
         return StreamingResponse(
-            ModelInstance.streaming(engine, fields=fields),
+            ModelInstance.streaming(
+                engine,
+                fields=fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
@@ -51,6 +51,8 @@ async def get_models(
                 fields=fields,
                 fuzzy_fields=fuzzy_fields,
                 filter_func=lambda data: categories_filter(data, categories),
+                resource_version=params.resourceVersion,
+                delta=params.delta,
             ),
             media_type="text/event-stream",
         )
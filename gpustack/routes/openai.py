@@ -1,5 +1,7 @@
 import asyncio
-from typing import AsyncGenerator, List, Optional, Tuple
+from dataclasses import dataclass
+import time
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Set, Tuple, Union
 import aiohttp
 import logging
 
@@ -8,7 +10,7 @@ from openai.types import Model as OAIModel
 from openai.pagination import SyncPage
 from sqlmodel import or_, select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from starlette.datastructures import UploadFile
+from starlette.background import BackgroundTask
 
 from gpustack.api.exceptions import (
     BadRequestException,
@@ -21,15 +23,41 @@ from gpustack.api.exceptions import (
     ForbiddenException,
 )
 from gpustack.api.responses import StreamingResponseWithStatusCode
-from gpustack.config.envs import PROXY_TIMEOUT
-from gpustack.http_proxy.load_balancer import LoadBalancer
+from gpustack.config.envs import (
+    PREFIX_AFFINITY_MAX_CHARS,
+    PROXY_RETRY_BUDGET_SECONDS,
+    PROXY_RETRY_MAX_ATTEMPTS,
+    PROXY_SSE_PASSTHROUGH,
+    PROXY_TIMEOUT,
+)
+from gpustack.http_proxy.admission import admission_controller
+from gpustack.http_proxy.coalescer import embeddings_coalescer
+from gpustack.http_proxy.direct_routing import RoutingModeEnum, direct_routing
+from gpustack.http_proxy.json_body import JSONBody
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.http_proxy.model_list_cache import model_list_cache
+from gpustack.http_proxy.multipart_body import MultipartBody
+from gpustack.http_proxy.rate_limit import rate_limiter, request_rate_limits
+from gpustack.http_proxy.response_cache import (
+    CachedRequest,
+    lookup_cached_request,
+    response_cache,
+)
+from gpustack.http_proxy.routing_table import routing_table
+from gpustack.http_proxy.strategies import prefix_affinity_key
+from gpustack.http_proxy.upstream import (
+    UpstreamUnreachableError,
+    is_upstream_unreachable,
+)
 from gpustack.routes.models import build_category_conditions
 from gpustack.schemas.models import (
-    BackendEnum,
     CategoryEnum,
     Model,
+    ModelInstance,
     MyModel,
 )
+from gpustack.schemas.users import User
+from gpustack.schemas.workers import Worker
 from gpustack.server.db import get_engine
 from gpustack.server.deps import SessionDep, CurrentUserDep
 from gpustack.server.services import ModelInstanceService, ModelService, WorkerService
@@ -37,8 +65,6 @@ from gpustack.server.services import ModelInstanceService, ModelService, WorkerS
 
 logger = logging.getLogger(__name__)
 
-load_balancer = LoadBalancer()
-
 
 aliasable_router = APIRouter()
 
@@ -132,14 +158,30 @@ async def list_models(
     if text_to_speech:
         all_categories.add(CategoryEnum.TEXT_TO_SPEECH.value)
     all_categories = list(all_categories)
+    cache_key = model_list_cache.key(user, all_categories, with_meta)
+    content = model_list_cache.get(cache_key)
+    if content is None:
+        generation = model_list_cache.generation
+        result = await query_models(session, user, all_categories, with_meta)
+        content = result.model_dump_json().encode("utf-8")
+        model_list_cache.put(cache_key, content, generation)
+    return Response(content=content, media_type="application/json")
+
+
+async def query_models(
+    session: AsyncSession,
+    user: User,
+    categories: List[str],
+    with_meta: Optional[bool],
+) -> SyncPage[OAIModel]:
     target_class = Model if user.is_admin else MyModel
     statement = select(target_class).where(target_class.ready_replicas > 0)
     if target_class == MyModel:
         # Non-admin users should only see their own private models when filtering by categories.
         statement = statement.where(target_class.user_id == user.id)
 
-    if all_categories:
-        conditions = build_category_conditions(session, all_categories)
+    if categories:
+        conditions = build_category_conditions(session, categories)
         statement = statement.where(or_(*conditions))
 
     models = (await session.exec(statement)).all()
@@ -162,61 +204,133 @@ async def proxy_request_by_model(request: Request, endpoint: str):
     Proxy the request to the model instance that is running the model specified in the
     request body.
     """
+    model_name, stream, json_body, form_data = await parse_request_body(request)
+    try:
+        return await proxy_parsed_request(
+            request, endpoint, model_name, stream, json_body, form_data
+        )
+    except BaseException:
+        if form_data is not None:
+            # Rejected before the spooled form could be forwarded.
+            form_data.close()
+        raise
+
+
+async def proxy_parsed_request(
+    request: Request,
+    endpoint: str,
+    model_name: str,
+    stream: bool,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+):
     allowed_model_names = getattr(request.state, "user_allow_model_names", set())
-    model_name, stream, body_json, form_data = await parse_request_body(request)
     if model_name not in allowed_model_names:
         raise ForbiddenException(
             message="Model not found",
             is_openai_exception=True,
         )
-    async with AsyncSession(get_engine()) as session:
-        model = await ModelService(session).get_by_name(model_name)
+    model = await get_model_by_name(model_name)
+    if not model:
+        raise NotFoundException(
+            message="Model not found",
+            is_openai_exception=True,
+        )
 
-        if not model:
-            raise NotFoundException(
-                message="Model not found",
-                is_openai_exception=True,
-            )
+    request.state.model = model
+    request.state.stream = stream
+    rate_limiter.admit(request_rate_limits(request))
+
+    mutate_request(request, json_body, form_data)
+
+    cached = None
+    if json_body is not None and not stream:
+        cached = await lookup_cached_request(response_cache, model, endpoint, json_body)
+    if cached is None:
+        return await forward_request(
+            request, model, endpoint, stream, json_body, form_data
+        )
+    return await handle_cached_request(request, model, endpoint, cached)
 
-        request.state.model = model
-        request.state.stream = stream
 
-        mutate_request(request, body_json, form_data)
+async def handle_cached_request(
+    request: Request, model: Model, endpoint: str, cached: CachedRequest
+):
+    """
+    Forward only the items of the request missing from the response cache,
+    and merge the results with the cached ones.
+    """
+    if cached.complete:
+        return Response(content=await cached.merge(None), media_type="application/json")
+
+    response = await forward_request(
+        request, model, endpoint, False, cached.forwarded_body(), None
+    )
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    try:
+        content = await cached.merge(response.body)
+    except (ValueError, KeyError, TypeError) as e:
+        raise ServiceUnavailableException(
+            message=f"Unexpected response from the model: {e}",
+            is_openai_exception=True,
+        )
+    return Response(content=content, media_type="application/json")
 
-        instance = await get_running_instance(session, model.id)
-        worker = await WorkerService(session).get_by_id(instance.worker_id)
-        if not worker:
-            raise InternalServerErrorException(
-                message=f"Worker with ID {instance.worker_id} not found",
-                is_openai_exception=True,
+
+async def forward_request(
+    request: Request,
+    model: Model,
+    endpoint: str,
+    stream: bool,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+):
+    if (
+        endpoint == "embeddings"
+        and json_body is not None
+        and not stream
+        and embeddings_coalescer.enabled_for(model)
+    ):
+
+        async def send_batch(batch_body: JSONBody):
+            response = await proxy_upstream(
+                request, model, endpoint, False, batch_body, None
             )
+            return response, getattr(request.state, "instance", None)
 
-    url = f"http://{instance.worker_ip}:{worker.port}/proxy/v1/{endpoint}"
-    token = worker.token
-    extra_headers = {
-        "X-Target-Port": str(instance.port),
-        "Authorization": f"Bearer {token}",
-    }
+        result = await embeddings_coalescer.submit(
+            model, request_tenant(request), json_body, send_batch
+        )
+        if result is not None:
+            response, instance = result
+            # The batch may have been sent by another request of the tenant.
+            request.state.instance = instance
+            return response
 
-    if model.backend == BackendEnum.ASCEND_MINDIE:
-        # Connectivity to the loopback address via worker proxy does not work for Ascend MindIE.
-        # Bypassing the worker proxy and directly connecting to the instance as a workaround.
-        url = f"http://{instance.worker_ip}:{instance.port}/v1/{endpoint}"
-        extra_headers = {}
+    return await proxy_upstream(request, model, endpoint, stream, json_body, form_data)
 
-    logger.debug(f"proxying to {url}, instance port: {instance.port}")
 
+async def proxy_upstream(
+    request: Request,
+    model: Model,
+    endpoint: str,
+    stream: bool,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+):
+    upstream = await select_upstream(request, model, endpoint, json_body, form_data)
     try:
         if stream:
             return await handle_streaming_request(
-                request, url, body_json, form_data, extra_headers
+                request, upstream, json_body, form_data
             )
         else:
             return await handle_standard_request(
-                request, url, body_json, form_data, extra_headers
+                request, upstream, json_body, form_data
             )
     except asyncio.TimeoutError as e:
-        error_message = f"Request to {url} timed out"
+        error_message = f"Request to {upstream.current.url} timed out"
         if str(e):
             error_message += f": {e}"
         raise GatewayTimeoutException(
@@ -231,12 +345,144 @@ async def proxy_request_by_model(request: Request, endpoint: str):
             message=error_message,
             is_openai_exception=True,
         )
+    finally:
+        if not stream:
+            upstream.release()
+
+
+@dataclass
+class UpstreamTarget:
+    instance: ModelInstance
+    url: str
+    headers: Dict[str, str]
+    release: Callable[[], None]
+    # Whether the instance is reached without the worker proxy.
+    direct: bool = False
+
+
+class UpstreamSelector:
+    """
+    Selects the model instance a request is proxied to.
+
+    When a request fails with a connection error before any response is sent
+    to the client, the instance is marked suspect in the load balancer and
+    the request is replayed on another running instance, within a bounded
+    number of attempts and a latency budget.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        model: Model,
+        endpoint: str,
+        json_body: Optional[JSONBody],
+        form_data: Optional[MultipartBody],
+        on_release: Optional[Callable[[], None]] = None,
+    ):
+        self._request = request
+        self._model = model
+        self._endpoint = endpoint
+        self._json_body = json_body
+        self._form_data = form_data
+        self._tried: Set[int] = set()
+        self._deadline = time.monotonic() + PROXY_RETRY_BUDGET_SECONDS
+        self._on_release = on_release
+        self.current: Optional[UpstreamTarget] = None
+
+    async def select(self) -> UpstreamTarget:
+        instance = await get_running_instance(
+            self._model, self._json_body, exclude=self._tried
+        )
+        return await self._target(
+            instance, direct_routing.use_direct(self._model, instance)
+        )
+
+    async def _target(self, instance: ModelInstance, direct: bool) -> UpstreamTarget:
+        if direct:
+            url = f"http://{instance.worker_ip}:{instance.port}/v1/{self._endpoint}"
+            extra_headers = {}
+        else:
+            worker = await get_worker_by_id(instance.worker_id)
+            if not worker:
+                raise InternalServerErrorException(
+                    message=f"Worker with ID {instance.worker_id} not found",
+                    is_openai_exception=True,
+                )
+            url = f"http://{instance.worker_ip}:{worker.port}/proxy/v1/{self._endpoint}"
+            extra_headers = {
+                "X-Target-Port": str(instance.port),
+                "Authorization": f"Bearer {worker.token}",
+            }
+
+        logger.debug(f"proxying to {url}, instance port: {instance.port}")
+
+        headers = filter_headers(self._request.headers)
+        headers.update(extra_headers)
+        set_content_type(headers, self._json_body, self._form_data)
+
+        self._tried.add(instance.id)
+        self._request.state.instance = instance
+        self.current = UpstreamTarget(
+            instance=instance,
+            url=url,
+            headers=headers,
+            release=load_balancer.track_request(instance),
+            direct=direct,
+        )
+        return self.current
+
+    async def failover(self, error: Exception) -> bool:
+        """
+        Handle a failed attempt on the current instance. Returns whether the
+        request can be retried on the newly selected current instance.
+        """
+        failed = self.current
+        failed.release()
+        if failed.direct and direct_routing.mode(self._model) == RoutingModeEnum.AUTO:
+            # Retry the same instance through the worker proxy.
+            direct_routing.mark_unreachable(failed.instance)
+        else:
+            load_balancer.mark_suspect(failed.instance.id)
+
+        if (
+            len(self._tried) >= PROXY_RETRY_MAX_ATTEMPTS
+            or time.monotonic() > self._deadline
+            or (self._form_data is not None and self._form_data.consumed)
+        ):
+            return False
+
+        try:
+            if failed.direct and not direct_routing.use_direct(
+                self._model, failed.instance
+            ):
+                await self._target(failed.instance, direct=False)
+            else:
+                await self.select()
+        except Exception as e:
+            logger.debug(f"No instance to retry the request on: {e}")
+            self.current = failed
+            return False
+
+        logger.warning(
+            f"Request to instance {failed.instance.name} failed: {error}, "
+            f"retrying on instance {self.current.instance.name}"
+        )
+        return True
+
+    def release(self):
+        if self.current is not None:
+            self.current.release()
+        if self._form_data is not None:
+            # In case the form was never forwarded.
+            self._form_data.close()
+        if self._on_release is not None:
+            self._on_release()
 
 
 async def parse_request_body(request: Request):
     model_name = None
     stream = False
-    body_json = None
+    json_body = None
     form_data = None
     content_type = request.headers.get("content-type", "application/json").lower()
 
@@ -245,7 +491,7 @@ async def parse_request_body(request: Request):
     elif content_type.startswith("multipart/form-data"):
         form_data, model_name, stream = await parse_form_data(request)
     else:
-        body_json, model_name, stream = await parse_json_body(request)
+        json_body, model_name, stream = await parse_json_body(request)
 
     if not model_name:
         raise BadRequestException(
@@ -253,29 +499,21 @@ async def parse_request_body(request: Request):
             is_openai_exception=True,
         )
 
-    return model_name, stream, body_json, form_data
+    return model_name, stream, json_body, form_data
 
 
-async def parse_form_data(request: Request) -> Tuple[aiohttp.FormData, str, bool]:
+async def parse_form_data(request: Request) -> Tuple[MultipartBody, str, bool]:
+    form_data = None
     try:
-        form = await request.form()
-        model_name = form.get("model")
-        stream = form.get("stream", False)
-
-        form_data = aiohttp.FormData()
-        for key, value in form.items():
-            if isinstance(value, UploadFile):
-                form_data.add_field(
-                    key,
-                    await value.read(),
-                    filename=value.filename,
-                    content_type=value.content_type,
-                )
-            else:
-                form_data.add_field(key, value)
-
+        # Stream the form to the upstream, only the routing fields are read ahead.
+        form_data = MultipartBody(request.stream(), request.headers["content-type"])
+        await form_data.read_fields()
+        model_name = form_data.get("model")
+        stream = form_data.get("stream", "false").lower() == "true"
         return form_data, model_name, stream
     except Exception as e:
+        if form_data is not None:
+            form_data.close()
         raise BadRequestException(
             message=f"We could not parse the form body of your request: {e}",
             is_openai_exception=True,
@@ -284,10 +522,11 @@ async def parse_form_data(request: Request) -> Tuple[aiohttp.FormData, str, bool
 
 async def parse_json_body(request: Request):
     try:
-        body_json = await request.json()
-        model_name = body_json.get("model")
-        stream = body_json.get("stream", False)
-        return body_json, model_name, stream
+        # Forward the original bytes, only the routing keys are extracted.
+        json_body = JSONBody(await request.body())
+        model_name = json_body.get("model")
+        stream = json_body.get("stream", False)
+        return json_body, model_name, stream
     except Exception as e:
         raise BadRequestException(
             message=f"We could not parse the JSON body of your request: {e}",
@@ -297,6 +536,20 @@ async def parse_json_body(request: Request):
 
 async def _stream_response_chunks(
     resp: aiohttp.ClientResponse,
+) -> AsyncGenerator[Union[bytes, str], None]:
+    """Stream the response content, forwarding upstream bytes unchanged."""
+
+    if not PROXY_SSE_PASSTHROUGH:
+        async for line in _stream_response_lines(resp):
+            yield line
+        return
+
+    async for data in resp.content.iter_any():
+        yield data
+
+
+async def _stream_response_lines(
+    resp: aiohttp.ClientResponse,
 ) -> AsyncGenerator[str, None]:
     """Stream the response content in chunks, processing each line."""
 
@@ -323,38 +576,23 @@ def _process_line(line_bytes: bytes) -> str:
 
 async def handle_streaming_request(
     request: Request,
-    url: str,
-    body_json: Optional[dict],
-    form_data: Optional[aiohttp.FormData],
-    extra_headers: Optional[dict] = None,
+    upstream: UpstreamSelector,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
 ):
     timeout = aiohttp.ClientTimeout(total=PROXY_TIMEOUT)
-    headers = filter_headers(request.headers)
-    if extra_headers:
-        headers.update(extra_headers)
 
-    if body_json and "stream_options" not in body_json:
+    if json_body is not None:
         # Defaults to include usage.
         # TODO Record usage without client awareness.
-        body_json["stream_options"] = {"include_usage": True}
+        json_body.setdefault("stream_options", {"include_usage": True})
 
     async def stream_generator():
         try:
-            http_client: aiohttp.ClientSession = request.app.state.http_client
-            async with http_client.request(
-                method=request.method,
-                url=url,
-                headers=headers,
-                json=body_json if body_json else None,
-                data=form_data,
-                timeout=timeout,
-            ) as resp:
-                if resp.status >= 400:
-                    yield await resp.read(), resp.headers, resp.status
-                    return
-
-                async for chunk in _stream_response_chunks(resp):
-                    yield chunk, resp.headers, resp.status
+            async for item in _stream_upstream(
+                request, upstream, json_body, form_data, timeout
+            ):
+                yield item
         except aiohttp.ClientError as e:
             error_response = OpenAIAPIErrorResponse(
                 error=OpenAIAPIError(
@@ -373,39 +611,108 @@ async def handle_streaming_request(
                 ),
             )
             yield error_response.model_dump_json(), {}, status.HTTP_500_INTERNAL_SERVER_ERROR
+        finally:
+            # Runs on completion, upstream errors and client disconnects.
+            upstream.release()
 
     return StreamingResponseWithStatusCode(
-        stream_generator(), media_type="text/event-stream"
+        stream_generator(),
+        media_type="text/event-stream",
+        # In case the generator is never started.
+        background=BackgroundTask(upstream.release),
     )
 
 
-async def handle_standard_request(
+async def _stream_upstream(
     request: Request,
-    url: str,
-    body_json: Optional[dict],
-    form_data: Optional[aiohttp.FormData],
-    extra_headers: Optional[dict] = None,
+    upstream: UpstreamSelector,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+    timeout: aiohttp.ClientTimeout,
 ):
-    headers = filter_headers(request.headers)
-    if extra_headers:
-        headers.update(extra_headers)
+    """
+    Yield (chunk, headers, status) of the upstream response, failing over to
+    another instance while nothing has been sent to the client.
+    """
+    http_client: aiohttp.ClientSession = request.app.state.http_client
+    while True:
+        target = upstream.current
+        started = False
+        try:
+            async with http_client.request(
+                method=request.method,
+                url=target.url,
+                headers=target.headers,
+                data=request_data(json_body, form_data),
+                timeout=timeout,
+            ) as resp:
+                if resp.status >= 400:
+                    content = await resp.read()
+                    if is_upstream_unreachable(resp) and await upstream.failover(
+                        UpstreamUnreachableError(content)
+                    ):
+                        continue
+                    yield content, resp.headers, resp.status
+                    return
+
+                async for chunk in _stream_response_chunks(resp):
+                    started = True
+                    yield chunk, resp.headers, resp.status
+                return
+        except aiohttp.ClientError as e:
+            if started or not await upstream.failover(e):
+                raise
 
+
+async def handle_standard_request(
+    request: Request,
+    upstream: UpstreamSelector,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+):
     http_client: aiohttp.ClientSession = request.app.state.http_client
     timeout = aiohttp.ClientTimeout(total=PROXY_TIMEOUT)
-    async with http_client.request(
-        method=request.method,
-        url=url,
-        headers=headers,
-        json=body_json if body_json else None,
-        data=form_data,
-        timeout=timeout,
-    ) as response:
-        content = await response.read()
-        return Response(
-            status_code=response.status,
-            headers=dict(response.headers),
-            content=content,
-        )
+    while True:
+        target = upstream.current
+        try:
+            async with http_client.request(
+                method=request.method,
+                url=target.url,
+                headers=target.headers,
+                data=request_data(json_body, form_data),
+                timeout=timeout,
+            ) as response:
+                content = await response.read()
+                if is_upstream_unreachable(response) and await upstream.failover(
+                    UpstreamUnreachableError(content)
+                ):
+                    continue
+                return Response(
+                    status_code=response.status,
+                    headers=dict(response.headers),
+                    content=content,
+                )
+        except aiohttp.ClientError as e:
+            if not await upstream.failover(e):
+                raise
+
+
+def request_data(json_body: Optional[JSONBody], form_data: Optional[MultipartBody]):
+    if json_body is not None:
+        return json_body.to_bytes()
+    if form_data is not None:
+        return form_data.iter_bytes()
+    return None
+
+
+def set_content_type(
+    headers: dict, json_body: Optional[JSONBody], form_data: Optional[MultipartBody]
+):
+    if json_body is not None:
+        headers["Content-Type"] = "application/json"
+    elif form_data is not None:
+        # Keep the original boundary, the body is forwarded as is.
+        headers["Content-Type"] = form_data.content_type
 
 
 def filter_headers(headers):
@@ -420,30 +727,117 @@ def filter_headers(headers):
     }
 
 
-async def get_running_instance(session: AsyncSession, model_id: int):
-    running_instances = await ModelInstanceService(session).get_running_instances(
-        model_id
+async def get_model_by_name(model_name: str) -> Optional[Model]:
+    if routing_table.ready:
+        return routing_table.get_model(model_name)
+
+    async with AsyncSession(get_engine()) as session:
+        return await ModelService(session).get_by_name(model_name)
+
+
+async def get_worker_by_id(worker_id: int) -> Optional[Worker]:
+    if routing_table.ready:
+        return routing_table.get_worker(worker_id)
+
+    async with AsyncSession(get_engine()) as session:
+        return await WorkerService(session).get_by_id(worker_id)
+
+
+async def select_upstream(
+    request: Request,
+    model: Model,
+    endpoint: str,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
+) -> UpstreamSelector:
+    """
+    Admit the request and select the instance to proxy it to. The admission
+    slot is freed along with the instance by `UpstreamSelector.release`.
+    """
+    release_admission = await admit_request(request, model)
+    upstream = UpstreamSelector(
+        request, model, endpoint, json_body, form_data, on_release=release_admission
     )
+    try:
+        await upstream.select()
+    except Exception:
+        upstream.release()
+        raise
+    return upstream
+
+
+async def admit_request(request: Request, model: Model) -> Callable[[], None]:
+    """
+    Wait for the admission of a request to the model. Returns the callback
+    that frees its slot once the request is done.
+    """
+    tenant = request_tenant(request)
+    if routing_table.ready:
+        running_instances = len(routing_table.get_running_instances(model.id))
+    else:
+        running_instances = model.ready_replicas or 0
+    return await admission_controller.admit(model, tenant, running_instances)
+
+
+def request_tenant(request: Request) -> str:
+    """
+    The principal a request is admitted for, its API key or else its user.
+    """
+    api_key = getattr(request.state, "api_key", None)
+    if api_key is not None:
+        return f"api_key:{api_key.id}"
+    user = getattr(request.state, "user", None)
+    return f"user:{user.id}" if user is not None else "anonymous"
+
+
+async def get_running_instance(
+    model: Model,
+    json_body: Optional[JSONBody] = None,
+    exclude: Optional[Set[int]] = None,
+) -> ModelInstance:
+    if routing_table.ready:
+        running_instances = routing_table.get_running_instances(model.id)
+    else:
+        async with AsyncSession(get_engine()) as session:
+            running_instances = await ModelInstanceService(
+                session
+            ).get_running_instances(model.id)
     if not running_instances:
         raise ServiceUnavailableException(
             message="No running instances available",
             is_openai_exception=True,
         )
-    return await load_balancer.get_instance(running_instances)
+    strategy = (model.env or {}).get("GPUSTACK_LOAD_BALANCING_STRATEGY")
+    affinity_key = None
+    if load_balancer.get_strategy(strategy).uses_affinity_key:
+        affinity_key = prefix_affinity_key(
+            json_body.json() if json_body else None, PREFIX_AFFINITY_MAX_CHARS
+        )
+    instance = await load_balancer.get_instance(
+        running_instances, strategy, affinity_key, exclude
+    )
+    if instance is None:
+        raise ServiceUnavailableException(
+            message="No running instances available",
+            is_openai_exception=True,
+        )
+    return instance
 
 
 def mutate_request(
-    request: Request, body_json: Optional[dict], form_data: Optional[aiohttp.FormData]
+    request: Request,
+    json_body: Optional[JSONBody],
+    form_data: Optional[MultipartBody],
 ):
     path = request.url.path
     model: Model = request.state.model
     if (
         path == "/v1/rerank"
-        and body_json
+        and json_body
         and model.env
         and model.env.get("GPUSTACK_APPLY_QWEN3_RERANKER_TEMPLATES", False)
     ):
-        apply_qwen3_reranker_templates(body_json)
+        apply_qwen3_reranker_templates(json_body.mutable_json())
 
 
 def apply_qwen3_reranker_templates(body_json: dict):
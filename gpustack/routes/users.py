@@ -31,7 +31,12 @@ async def get_users(
 
     if params.watch:
         return StreamingResponse(
-            User.streaming(engine, fuzzy_fields=fuzzy_fields),
+            User.streaming(
+                engine,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
@@ -66,6 +71,7 @@ async def create_user(session: SessionDep, user_in: UserCreate):
             username=user_in.username,
             full_name=user_in.full_name,
             is_admin=user_in.is_admin,
+            rate_limit=user_in.rate_limit,
         )
         if user_in.password:
             to_create.hashed_password = get_secret_hash(user_in.password)
@@ -145,6 +151,8 @@ async def update_user_me(
 ):
     try:
         update_data = user_in.model_dump()
+        # Rate limits are set by admins.
+        del update_data["rate_limit"]
         if "password" in update_data:
             hashed_password = get_secret_hash(update_data["password"])
             update_data["hashed_password"] = hashed_password
@@ -1,13 +1,14 @@
 import asyncio
 import logging
 import aiohttp
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.background import BackgroundTask
 
 from gpustack.api.auth import worker_auth
 from gpustack.api.exceptions import GatewayTimeoutException, ServiceUnavailableException
 from gpustack.config.envs import PROXY_TIMEOUT
+from gpustack.http_proxy.upstream import UPSTREAM_UNREACHABLE_HEADER
 
 router = APIRouter(dependencies=[Depends(worker_auth)])
 
@@ -25,13 +26,10 @@ async def proxy(path: str, request: Request):
 
     try:
         url = f"http://127.0.0.1:{target_service_port}/{path}"
-        content = await request.body()
         headers = dict(request.headers)
         headers.pop("host", None)
-
-        async def stream_response(resp):
-            async for chunk in resp.content.iter_chunked(1024):
-                yield chunk
+        # The body is re-framed by the client when no length is known.
+        headers.pop("transfer-encoding", None)
 
         http_client: aiohttp.ClientSession = request.app.state.http_client
         timeout = aiohttp.ClientTimeout(total=PROXY_TIMEOUT)
@@ -39,17 +37,30 @@ async def proxy(path: str, request: Request):
             method=request.method,
             url=url,
             headers=headers,
-            data=content,
+            data=request_body(request),
             timeout=timeout,
         )
 
         return StreamingResponse(
-            stream_response(resp),
+            resp.content.iter_any(),
             status_code=resp.status,
             headers=dict(resp.headers),
             background=BackgroundTask(resp.close),
         )
 
+    except aiohttp.ClientConnectionError as e:
+        # The inference server could not be reached, nothing was received.
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "error": {
+                    "message": f"Failed to connect to {url}: {e}",
+                    "code": status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "type": "ServiceUnavailable",
+                }
+            },
+            headers={UPSTREAM_UNREACHABLE_HEADER: "true"},
+        )
     except asyncio.TimeoutError as e:
         error_message = f"Request to {url} timed out"
         if str(e):
@@ -66,3 +77,18 @@ async def proxy(path: str, request: Request):
             message=error_message,
             is_openai_exception=True,
         )
+
+
+def request_body(request: Request):
+    """
+    Pipe the incoming body to the upstream as it arrives. Requests declaring
+    no body are forwarded without one.
+    """
+    if (
+        "content-length" not in request.headers
+        and "transfer-encoding" not in request.headers
+    ):
+        return None
+    if request.headers.get("content-length") == "0":
+        return b""
+    return request.stream()
@@ -40,7 +40,13 @@ async def list(
 
     if params.watch:
         return StreamingResponse(
-            WorkerPool.streaming(engine, fields=fields, fuzzy_fields=fuzzy_fields),
+            WorkerPool.streaming(
+                engine,
+                fields=fields,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
 
@@ -66,7 +66,13 @@ async def get_workers(
 
     if params.watch:
         return StreamingResponse(
-            Worker.streaming(engine, fields=fields, fuzzy_fields=fuzzy_fields),
+            Worker.streaming(
+                engine,
+                fields=fields,
+                fuzzy_fields=fuzzy_fields,
+                resource_version=params.resourceVersion,
+                delta=params.delta,
+            ),
             media_type="text/event-stream",
         )
     if me and user.worker is not None:
@@ -4,7 +4,12 @@ from sqlalchemy import Column, UniqueConstraint
 from sqlmodel import Field, SQLModel, Text, JSON, Relationship
 
 from gpustack.mixins import BaseModelMixin
-from gpustack.schemas.common import PaginatedList, UTCDateTime
+from gpustack.schemas.common import (
+    PaginatedList,
+    RateLimit,
+    UTCDateTime,
+    pydantic_column_type,
+)
 
 if TYPE_CHECKING:
     from gpustack.schemas.users import User
@@ -15,6 +20,9 @@ class ApiKeyUpdate(SQLModel):
         default=None,
         sa_column=Column(JSON, nullable=True),
     )
+    rate_limit: Optional[RateLimit] = Field(
+        sa_type=pydantic_column_type(RateLimit), default=None
+    )
 
 
 class ApiKeyBase(ApiKeyUpdate):
@@ -1,10 +1,10 @@
 from datetime import timezone
 import json
-from typing import Generic, Type, TypeVar
+from typing import Generic, Optional, Type, TypeVar
 
 from fastapi import Query
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel, TypeAdapter
+from pydantic import BaseModel, Field, TypeAdapter
 import sqlalchemy as sa
 from sqlalchemy import JSON as SQLAlchemyJSON, TypeDecorator
 
@@ -22,6 +22,12 @@ class ListParams(BaseModel):
     page: int = Query(default=1, ge=1)
     perPage: int = Query(default=100, ge=1, le=100)
     watch: bool = Query(default=False)
+    # The revision of the last watched event to resume after, 0 to list all
+    # objects first with events carrying revisions.
+    resourceVersion: Optional[int] = Query(default=None, ge=0)
+    # Send updates of objects as JSON merge patches of the previously sent
+    # version, with periodic full snapshots.
+    delta: bool = Query(default=False)
 
 
 class ItemList(BaseModel, Generic[T]):
@@ -36,6 +42,19 @@ class JSON(SQLAlchemyJSON):
     pass
 
 
+class RateLimit(BaseModel):
+    """
+    Token bucket limits. A limit is not enforced when its rate is not set,
+    the burst defaults to the rate.
+    """
+
+    requests_per_minute: Optional[int] = Field(default=None, gt=0)
+    request_burst: Optional[int] = Field(default=None, gt=0)
+    # Completion tokens.
+    tokens_per_minute: Optional[int] = Field(default=None, gt=0)
+    token_burst: Optional[int] = Field(default=None, gt=0)
+
+
 class UTCDateTime(sa.TypeDecorator):
     impl = sa.TIMESTAMP(timezone=False)
 
@@ -3,6 +3,7 @@ from enum import Enum
 from typing import Optional
 
 from pydantic import ConfigDict
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel
 from gpustack.mixins.active_record import ActiveRecordMixin
 
@@ -19,6 +20,11 @@ class OperationEnum(str, Enum):
 
 class ModelUsage(SQLModel, ActiveRecordMixin, table=True):
     __tablename__ = 'model_usages'
+    __table_args__ = (
+        UniqueConstraint(
+            'user_id', 'model_id', 'date', 'operation', name='uix_model_usages_key'
+        ),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(default=None, foreign_key="users.id")
     model_id: int = Field(default=None, foreign_key="models.id")
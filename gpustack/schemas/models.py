@@ -9,6 +9,7 @@ from sqlmodel import Field, Relationship, SQLModel, Text
 
 from gpustack.schemas.common import (
     PaginatedList,
+    RateLimit,
     UTCDateTime,
     pydantic_column_type,
     ItemList,
@@ -193,6 +194,9 @@ class ModelSpecBase(SQLModel, ModelSource):
     run_command: Optional[str] = None
 
     env: Optional[Dict[str, str]] = Field(sa_type=JSON, default=None)
+    rate_limit: Optional[RateLimit] = Field(
+        sa_type=pydantic_column_type(RateLimit), default=None
+    )
     restart_on_error: Optional[bool] = True
     distributable: Optional[bool] = False
 
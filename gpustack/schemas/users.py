@@ -13,7 +13,7 @@ from sqlmodel import (
     Integer,
     ForeignKey,
 )
-from .common import PaginatedList
+from .common import PaginatedList, RateLimit, pydantic_column_type
 from ..mixins import BaseModelMixin
 from .clusters import Cluster
 from .workers import Worker
@@ -47,6 +47,9 @@ class UserBase(SQLModel):
         default=AuthProviderEnum.Local, sa_type=SQLEnum(AuthProviderEnum)
     )
     require_password_change: bool = Field(default=False)
+    rate_limit: Optional[RateLimit] = Field(
+        sa_type=pydantic_column_type(RateLimit), default=None
+    )
 
     is_system: bool = False
     role: Optional[UserRole] = Field(
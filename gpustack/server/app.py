@@ -1,15 +1,14 @@
 from contextlib import asynccontextmanager
+import os
 from pathlib import Path
-import aiohttp
 from fastapi import FastAPI
 from fastapi_cdn_host import patch_docs
 
 from gpustack import __version__
 from gpustack.api import exceptions, middlewares
 from gpustack.config.config import Config
-from gpustack.config.envs import (
-    TCP_CONNECTOR_LIMIT,
-)
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
+from gpustack.http_proxy.response_cache import response_cache
 from gpustack.routes import ui
 from gpustack.routes.routes import api_router
 from gpustack.utils.forwarded import ForwardedHostPortMiddleware
@@ -18,13 +17,9 @@ from gpustack.utils.forwarded import ForwardedHostPortMiddleware
 def create_app(cfg: Config) -> FastAPI:
     @asynccontextmanager
     async def lifespan(app: FastAPI):
-        connector = aiohttp.TCPConnector(
-            limit=TCP_CONNECTOR_LIMIT,
-            force_close=True,
-        )
-        app.state.http_client = aiohttp.ClientSession(
-            connector=connector, trust_env=True
-        )
+        app.state.http_client = proxy_connection_pool.new_client_session()
+        if cfg:
+            response_cache.set_spill_dir(os.path.join(cfg.cache_dir, "response_cache"))
         yield
         await app.state.http_client.close()
 
@@ -1,8 +1,27 @@
 import asyncio
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Tuple
+import os
+import time
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
 from enum import Enum
-import copy
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from gpustack.utils.merge_patch import apply_merge_patch
+from gpustack.utils.name import metric_name
+
+# Events kept per topic for watches resuming from a resource version. Watches
+# resuming from an older version relist all objects instead. Defined here
+# since importing gpustack.config from the bus is circular.
+EVENT_HISTORY_SIZE = int(os.getenv("GPUSTACK_EVENT_HISTORY_SIZE", 1000))
+# What watch streams do when a watcher falls behind, see OverflowPolicy.
+# Options: coalesce, resync, disconnect, block
+WATCH_OVERFLOW_POLICY = os.getenv("GPUSTACK_WATCH_OVERFLOW_POLICY", "coalesce")
+
+# Events queued for a subscriber before its overflow policy applies.
+SUBSCRIBER_QUEUE_SIZE = 256
 
 
 class EventType(Enum):
@@ -15,13 +34,59 @@ class EventType(Enum):
 
 @dataclass
 class Event:
+    """
+    An event published on the bus. Published events are shared by all
+    subscribers of the topic and must not be mutated.
+
+    The revision is assigned on publishing and increases with every event of
+    the bus. It's 0 for events not published on the bus. The previous
+    revision is the one of the previous event of the same object, 0 if there
+    is none.
+    """
+
     type: EventType
     data: Any
     changed_fields: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+    revision: int = 0
+    previous_revision: int = 0
 
     def __post_init__(self):
         if isinstance(self.type, int):
             self.type = EventType(self.type)
+        # Not a dataclass field, so it's left out of the event encoding.
+        self._encoded: Dict[Hashable, Optional[bytes]] = {}
+
+    def encoded(
+        self, key: Hashable, encode: Callable[["Event"], Optional[bytes]]
+    ) -> Optional[bytes]:
+        """
+        The encoding of the event by the key, computed on first use and shared
+        by later callers.
+        """
+        if key not in self._encoded:
+            self._encoded[key] = encode(self)
+        return self._encoded[key]
+
+
+def coalesce_events(queued: Event, event: Event) -> Event:
+    """
+    Coalesce two events of an object into one with the latest state.
+    """
+    event_type = event.type
+    if queued.type == EventType.CREATED and event.type == EventType.UPDATED:
+        event_type = EventType.CREATED
+    changed_fields = dict(queued.changed_fields)
+    for key, (old, new) in event.changed_fields.items():
+        if key in changed_fields:
+            old = changed_fields[key][0]
+        changed_fields[key] = (old, new)
+    return Event(
+        type=event_type,
+        data=event.data,
+        changed_fields=changed_fields,
+        revision=event.revision,
+        previous_revision=queued.previous_revision,
+    )
 
 
 def event_decoder(obj):
@@ -30,38 +95,349 @@ def event_decoder(obj):
     return obj
 
 
+def decode_watch_event(obj: dict, objects: Optional[Dict[Any, dict]] = None) -> Event:
+    """
+    Decode an event of a watch stream. Objects sent by a delta stream are
+    tracked by ID in objects, to apply the merge patches of later updates to.
+    """
+    patch = obj.pop("patch", None)
+    if patch is not None:
+        obj["data"] = apply_merge_patch((objects or {}).get(patch.get("id")), patch)
+    event = Event(**obj)
+
+    object_id = event.data.get("id") if isinstance(event.data, dict) else None
+    if objects is None or object_id is None:
+        return event
+    if event.type == EventType.DELETED:
+        objects.pop(object_id, None)
+    else:
+        objects[object_id] = event.data
+    return event
+
+
+# Filter fields subscribers are preferably indexed by, the most selective
+# first.
+INDEXED_FIELDS = ("id", "worker_id", "model_id", "cluster_id", "user_id")
+
+
+class OverflowPolicy(str, Enum):
+    """
+    What happens to events for a subscriber whose queue is full.
+    """
+
+    # Wait until the subscriber receives, delaying the publisher.
+    BLOCK = "block"
+    # Replace the queued event of the same object with the latest state,
+    # moved to the end of the queue so events are received in revision
+    # order. Events of other objects are still queued, so the queue is
+    # bounded by the number of objects.
+    COALESCE = "coalesce"
+    # Drop the queued events, the subscriber has to resync.
+    RESYNC = "resync"
+    # Drop the queued events and close the subscriber.
+    DISCONNECT = "disconnect"
+
+
+class EventsDropped(Exception):
+    """
+    Raised on receiving after events of a resync or disconnect subscriber were
+    dropped.
+    """
+
+
+@dataclass
+class TopicStats:
+    dropped_events: int = 0
+    coalesced_events: int = 0
+
+
+@dataclass
+class _Slot:
+    # None marks dropped events.
+    event: Optional[Event]
+    # Whether the event was moved to a later slot by coalescing.
+    stale: bool = False
+
+
 class Subscriber:
-    def __init__(self):
-        self.queue = asyncio.Queue(maxsize=256)
+    """
+    A subscriber of a topic, receiving only the events whose data has the
+    filter values.
+    """
+
+    def __init__(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        stats: Optional[TopicStats] = None,
+    ):
+        self.filters = filters or {}
+        # The (field, value) the subscriber is indexed by, None if it receives
+        # all events of the topic to filter.
+        self.index_key: Optional[Tuple[str, Hashable]] = _index_key(self.filters)
+        self.overflow = overflow
+        self.maxsize = maxsize
+        self.stats = stats or TopicStats()
+        self.closed = False
+        # Only the queue of a blocking subscriber is bounded, the others
+        # apply their policy when it's full.
+        self.queue: asyncio.Queue[_Slot] = asyncio.Queue(
+            maxsize=maxsize if overflow == OverflowPolicy.BLOCK else 0
+        )
+        # Queued slots by object ID to coalesce with.
+        self._slots: Dict[Hashable, _Slot] = {}
+        self._stale = 0
+
+    @property
+    def depth(self) -> int:
+        """The number of queued events."""
+        return self.queue.qsize() - self._stale
+
+    def matches(self, data: Any) -> bool:
+        for key, value in self.filters.items():
+            if getattr(data, key, None) != value:
+                return False
+        return True
 
     async def enqueue(self, event: Event):
-        await self.queue.put(event)
+        if self.closed:
+            return
+        if self.overflow == OverflowPolicy.BLOCK:
+            await self.queue.put(_Slot(event))
+        elif self.depth < self.maxsize:
+            self._put(event)
+        elif self.overflow == OverflowPolicy.COALESCE:
+            self._coalesce(event)
+        else:
+            self._drop()
 
     async def receive(self) -> Any:
-        return await self.queue.get()
+        slot = await self.queue.get()
+        while slot.stale:
+            self._stale -= 1
+            slot = await self.queue.get()
+        if slot.event is None:
+            raise EventsDropped()
+        object_id = _object_id(slot.event)
+        if self._slots.get(object_id) is slot:
+            del self._slots[object_id]
+        return slot.event
+
+    def _put(self, event: Event):
+        slot = _Slot(event)
+        object_id = _object_id(event)
+        if self.overflow == OverflowPolicy.COALESCE and object_id is not None:
+            self._slots[object_id] = slot
+        self.queue.put_nowait(slot)
+
+    def _coalesce(self, event: Event):
+        slot = self._slots.get(_object_id(event))
+        if slot is None:
+            self._put(event)
+            return
+        slot.stale = True
+        self._stale += 1
+        self._put(coalesce_events(slot.event, event))
+        self.stats.coalesced_events += 1
+        if self._stale > self.maxsize:
+            self._compact()
+
+    def _compact(self):
+        """Remove the stale slots from the queue."""
+        slots = [self.queue.get_nowait() for _ in range(self.queue.qsize())]
+        for slot in slots:
+            if not slot.stale:
+                self.queue.put_nowait(slot)
+        self._stale = 0
+
+    def _drop(self):
+        dropped = 1
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            dropped += 1
+        self.stats.dropped_events += dropped
+        self.closed = self.overflow == OverflowPolicy.DISCONNECT
+        self.queue.put_nowait(_Slot(None))
+
+
+def _object_id(event: Event) -> Optional[Hashable]:
+    return getattr(event.data, "id", None)
+
+
+def _index_key(filters: Dict[str, Any]) -> Optional[Tuple[str, Hashable]]:
+    fields = [f for f in INDEXED_FIELDS if f in filters]
+    fields += [f for f in filters if f not in INDEXED_FIELDS]
+    for field_name in fields:
+        value = filters[field_name]
+        if isinstance(value, Hashable):
+            return field_name, value
+    return None
+
 
+class EventBus(Collector):
+    """
+    Publishes events to the subscribers of their topic. Queue depth, dropped
+    and coalesced events of each topic are exported as Prometheus metrics.
+    """
 
-class EventBus:
-    def __init__(self):
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
         self.subscribers: Dict[str, List[Subscriber]] = {}
+        self.stats: Dict[str, TopicStats] = {}
+        # Subscribers not indexed by a filter value.
+        self._unindexed: Dict[str, List[Subscriber]] = {}
+        # topic -> field -> value -> subscribers with the filter value.
+        self._indexes: Dict[str, Dict[str, Dict[Hashable, List[Subscriber]]]] = {}
+        self.history_size = history_size
+        # Revisions continue from the start time, so the revisions of a
+        # previous server process are older than the history.
+        self._start_revision = time.time_ns() // 1000
+        self._revision = self._start_revision
+        self._history: Dict[str, Deque[Event]] = {}
+        # The latest revision of each topic no longer in the history.
+        self._horizons: Dict[str, int] = {}
+        # The revision of the latest event of each object by topic.
+        self._object_revisions: Dict[str, Dict[Hashable, int]] = {}
 
-    def subscribe(self, topic: str) -> Subscriber:
-        subscriber = Subscriber()
+    @property
+    def revision(self) -> int:
+        """The revision of the latest published event."""
+        return self._revision
+
+    def subscribe(
+        self,
+        topic: str,
+        filters: Optional[Dict[str, Any]] = None,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+    ) -> Subscriber:
+        """
+        Subscribe to the events of the topic, only those whose data equals the
+        filters if given. Filtered subscribers are indexed by a filter value,
+        so events are matched only against the subscribers they may concern.
+        """
+        stats = self.stats.setdefault(topic, TopicStats())
+        subscriber = Subscriber(filters, overflow, stats=stats)
         if topic not in self.subscribers:
             self.subscribers[topic] = []
         self.subscribers[topic].append(subscriber)
+        if subscriber.index_key is None:
+            self._unindexed.setdefault(topic, []).append(subscriber)
+        else:
+            field_name, value = subscriber.index_key
+            index = self._indexes.setdefault(topic, {}).setdefault(field_name, {})
+            index.setdefault(value, []).append(subscriber)
         return subscriber
 
     def unsubscribe(self, topic: str, subscriber: Subscriber):
-        if topic in self.subscribers:
-            self.subscribers[topic].remove(subscriber)
-            if not self.subscribers[topic]:
-                del self.subscribers[topic]
+        _remove(self.subscribers, topic, subscriber)
+
+        if subscriber.index_key is None:
+            _remove(self._unindexed, topic, subscriber)
+            return
+        field_name, value = subscriber.index_key
+        indexes = self._indexes.get(topic, {})
+        if field_name in indexes:
+            _remove(indexes[field_name], value, subscriber)
+            if not indexes[field_name]:
+                del indexes[field_name]
+        if not indexes:
+            self._indexes.pop(topic, None)
+
+    def history(self, topic: str, since: int) -> Optional[List[Event]]:
+        """
+        The events of the topic published after the revision. None if some of
+        them are no longer kept, or the revision is not of this bus.
+        """
+        horizon = self._horizons.get(topic, self._start_revision)
+        if since < horizon or since > self._revision:
+            return None
+        return [e for e in self._history.get(topic, ()) if e.revision > since]
 
     async def publish(self, topic: str, event: Event):
-        if topic in self.subscribers:
-            for subscriber in self.subscribers[topic]:
-                await subscriber.enqueue(copy.deepcopy(event))
+        self._record(topic, event)
+        for subscriber in self._receivers(topic, event):
+            await subscriber.enqueue(event)
+
+    def _receivers(self, topic: str, event: Event) -> List[Subscriber]:
+        receivers = [
+            subscriber
+            for subscriber in self._unindexed.get(topic, ())
+            if subscriber.matches(event.data)
+        ]
+        for field_name, index in self._indexes.get(topic, {}).items():
+            value = getattr(event.data, field_name, None)
+            if not isinstance(value, Hashable):
+                continue
+            for subscriber in index.get(value, ()):
+                if subscriber.matches(event.data):
+                    receivers.append(subscriber)
+        return receivers
+
+    def collect(self):
+        labels = ["topic"]
+        subscribers = GaugeMetricFamily(
+            metric_name("event_bus_subscribers"),
+            "Subscribers of the event bus topic",
+            labels=labels,
+        )
+        queue_depth = GaugeMetricFamily(
+            metric_name("event_bus_queue_depth"),
+            "Events queued for the subscribers of the topic",
+            labels=labels,
+        )
+        dropped = CounterMetricFamily(
+            metric_name("event_bus_dropped_events"),
+            "Events dropped for subscribers of the topic falling behind",
+            labels=labels,
+        )
+        coalesced = CounterMetricFamily(
+            metric_name("event_bus_coalesced_events"),
+            "Events coalesced for subscribers of the topic falling behind",
+            labels=labels,
+        )
+
+        # Snapshot, the exporter runs in another thread.
+        topic_subscribers = {
+            topic: list(items) for topic, items in list(self.subscribers.items())
+        }
+        for topic, stats in list(self.stats.items()):
+            items = topic_subscribers.get(topic, [])
+            subscribers.add_metric([topic], len(items))
+            queue_depth.add_metric([topic], sum(s.depth for s in items))
+            dropped.add_metric([topic], stats.dropped_events)
+            coalesced.add_metric([topic], stats.coalesced_events)
+
+        yield subscribers
+        yield queue_depth
+        yield dropped
+        yield coalesced
+
+    def _record(self, topic: str, event: Event):
+        self._revision += 1
+        event.revision = self._revision
+
+        object_id = _object_id(event)
+        if object_id is not None:
+            revisions = self._object_revisions.setdefault(topic, {})
+            event.previous_revision = revisions.get(object_id, 0)
+            if event.type == EventType.DELETED:
+                revisions.pop(object_id, None)
+            else:
+                revisions[object_id] = event.revision
+
+        history = self._history.get(topic)
+        if history is None:
+            history = self._history[topic] = deque(maxlen=self.history_size)
+        if len(history) == history.maxlen:
+            self._horizons[topic] = history[0].revision if history else event.revision
+        history.append(event)
+
+
+def _remove(subscribers: Dict[Any, List[Subscriber]], key: Any, subscriber: Subscriber):
+    if subscriber in subscribers.get(key, ()):
+        subscribers[key].remove(subscriber)
+        if not subscribers[key]:
+            del subscribers[key]
 
 
 event_bus = EventBus()
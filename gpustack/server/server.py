@@ -20,6 +20,9 @@ from gpustack.security import (
 from gpustack.server.app import create_app
 from gpustack.config import Config
 from gpustack.server.catalog import init_model_catalog
+from gpustack.api.principal_cache import principal_cache
+from gpustack.http_proxy.model_list_cache import model_list_cache
+from gpustack.http_proxy.routing_table import routing_table
 from gpustack.server.controllers import (
     ModelController,
     ModelFileController,
@@ -76,6 +79,8 @@ class Server:
         self._start_sub_processes()
         self._start_scheduler()
         self._start_controllers()
+        self._start_routing_table()
+        self._start_request_caches()
         self._start_system_load_collector()
         self._start_worker_syncer()
         self._start_update_checker()
@@ -193,6 +198,17 @@ class Server:
 
         logger.debug("Controllers started.")
 
+    def _start_routing_table(self):
+        self._create_async_task(routing_table.start(get_engine()))
+
+        logger.debug("Routing table started.")
+
+    def _start_request_caches(self):
+        self._create_async_task(principal_cache.start())
+        self._create_async_task(model_list_cache.start())
+
+        logger.debug("Request caches started.")
+
     def _start_system_load_collector(self):
         collector = SystemLoadCollector()
         self._create_async_task(collector.start())
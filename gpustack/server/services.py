@@ -11,11 +11,9 @@ from sqlalchemy.dialects.postgresql import JSONB
 
 from gpustack.schemas.api_keys import ApiKey
 from gpustack.schemas.model_files import ModelFile
-from gpustack.schemas.model_usage import ModelUsage
 from gpustack.schemas.models import Model, ModelInstance, ModelInstanceStateEnum
 from gpustack.schemas.users import User
 from gpustack.schemas.workers import Worker
-from gpustack.server.usage_buffer import usage_flush_buffer
 
 logger = logging.getLogger(__name__)
 cache = Cache(Cache.MEMORY)
@@ -92,6 +90,14 @@ class UserService:
     async def get_by_id(
         self, user_id: int, worker_uuid: Optional[str] = None
     ) -> Optional[User]:
+        return await self.load_by_id(user_id, worker_uuid)
+
+    async def load_by_id(
+        self, user_id: int, worker_uuid: Optional[str] = None
+    ) -> Optional[User]:
+        """
+        Get the user from the database, bypassing the cache.
+        """
         result = await self.session.exec(
             select(User).options(selectinload(User.worker)).where(User.id == user_id)
         )
@@ -148,16 +154,24 @@ class UserService:
         user: User = await self.get_by_id(user_id)
         if user is None:
             return []
+        api_key = None
+        if access_key is not None:
+            api_key = await APIKeyService(self.session).get_by_access_key(access_key)
+        return await self.load_accessible_model_names(user, api_key)
+
+    async def load_accessible_model_names(
+        self, user: User, api_key: Optional[ApiKey]
+    ) -> Set[str]:
+        """
+        Get the names of models the user can access with the API key, bypassing
+        the cache.
+        """
         model_names = {model.name for model in user.models}
         if user.is_admin:
             all_models = await Model.all_by_field(self.session, "deleted_at", None)
             model_names = {model.name for model in all_models}
-        if access_key is not None:
-            api_key: ApiKey = await APIKeyService(self.session).get_by_access_key(
-                access_key
-            )
-            if api_key.allowed_model_names is not None:
-                model_names = model_names.intersection(set(api_key.allowed_model_names))
+        if api_key is not None and api_key.allowed_model_names is not None:
+            model_names = model_names.intersection(set(api_key.allowed_model_names))
         return model_names
 
 
@@ -292,46 +306,6 @@ class ModelInstanceService:
         return result
 
 
-class ModelUsageService:
-    def __init__(self, session: AsyncSession):
-        self.session = session
-
-    @locked_cached(ttl=60)
-    async def get_by_fields(self, fields: dict) -> ModelUsage:
-        result = await ModelUsage.one_by_fields(
-            self.session,
-            fields=fields,
-        )
-        if result is None:
-            return None
-        self.session.expunge(result)
-        return result
-
-    async def create(self, model_usage: ModelUsage):
-        return await ModelUsage.create(self.session, model_usage)
-
-    async def update(
-        self,
-        model_usage: ModelUsage,
-        completion_token_count: int,
-        prompt_token_count: int,
-    ):
-        model_usage.completion_token_count += completion_token_count
-        model_usage.prompt_token_count += prompt_token_count
-        model_usage.request_count += 1
-
-        key = build_cache_key(
-            self.get_by_fields,
-            model_usage.user_id,
-            model_usage.model_id,
-            model_usage.operation,
-            model_usage.date,
-        )
-        await set_cache_by_key(key, model_usage)
-        usage_flush_buffer[key] = model_usage
-        return model_usage
-
-
 class ModelFileService:
     def __init__(self, session: AsyncSession):
         self.session = session
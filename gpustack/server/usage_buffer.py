@@ -1,39 +1,161 @@
 import asyncio
 import logging
-from typing import Dict
-from sqlmodel.ext.asyncio.session import AsyncSession
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
 
-from gpustack.schemas.model_usage import ModelUsage
+from sqlalchemy import Insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from gpustack.schemas.model_usage import ModelUsage, OperationEnum
 from gpustack.server.db import get_engine
 
 logger = logging.getLogger(__name__)
 
-usage_flush_buffer: Dict[str, ModelUsage] = {}
+FLUSH_INTERVAL_SECONDS = 5
+# Rows per upsert statement, keeps the bound parameters within the SQLite limit.
+FLUSH_BATCH_SIZE = 100
 
+# (user_id, model_id, date, operation)
+UsageKey = Tuple[int, int, date, OperationEnum]
 
-async def flush_usage_to_db():
+_COUNTERS = ("prompt_token_count", "completion_token_count", "request_count")
+
+
+@dataclass
+class UsageCounters:
+    prompt_token_count: int = 0
+    completion_token_count: int = 0
+    request_count: int = 0
+
+
+class UsageAggregator:
     """
-    Flush model usage records to the database periodically.
+    Accumulates model usage in memory, to be flushed to the database in
+    batches. Recording usage never touches the database.
     """
-    while True:
-        await asyncio.sleep(5)
 
-        if not usage_flush_buffer:
-            continue
+    def __init__(self):
+        self._pending: Dict[UsageKey, UsageCounters] = {}
 
-        local_buffer = dict(usage_flush_buffer)
-        usage_flush_buffer.clear()
+    def __len__(self) -> int:
+        return len(self._pending)
 
+    def add(
+        self,
+        user_id: int,
+        model_id: int,
+        operation: OperationEnum,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        requests: int = 1,
+        day: Optional[date] = None,
+    ):
+        key = (user_id, model_id, day or date.today(), operation)
+        counters = self._pending.get(key)
+        if counters is None:
+            counters = self._pending[key] = UsageCounters()
+        counters.prompt_token_count += prompt_tokens
+        counters.completion_token_count += completion_tokens
+        counters.request_count += requests
+
+    def drain(self) -> Dict[UsageKey, UsageCounters]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: Dict[UsageKey, UsageCounters]):
+        """
+        Add back usage that failed to flush.
+        """
+        for (user_id, model_id, day, operation), counters in pending.items():
+            self.add(
+                user_id,
+                model_id,
+                operation,
+                prompt_tokens=counters.prompt_token_count,
+                completion_tokens=counters.completion_token_count,
+                requests=counters.request_count,
+                day=day,
+            )
+
+    async def flush(self, engine: AsyncEngine) -> int:
+        """
+        Write the pending usage to the database, incrementing existing rows.
+        Returns the number of rows written.
+        """
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        rows = [
+            {
+                "user_id": user_id,
+                "model_id": model_id,
+                "date": day,
+                "operation": operation,
+                "prompt_token_count": counters.prompt_token_count,
+                "completion_token_count": counters.completion_token_count,
+                "request_count": counters.request_count,
+            }
+            for (user_id, model_id, day, operation), counters in pending.items()
+        ]
         try:
-            async with AsyncSession(get_engine()) as session:
-                for key, usage in local_buffer.items():
-                    to_update = await ModelUsage.one_by_id(session, usage.id)
-                    to_update.prompt_token_count = usage.prompt_token_count
-                    to_update.completion_token_count = usage.completion_token_count
-                    to_update.request_count = usage.request_count
-                    session.add(to_update)
-
-                await session.commit()
-                logger.debug(f"Flushed {len(local_buffer)} usage records to DB")
-        except Exception as e:
-            logger.error(f"Error flushing usage to DB: {e}")
+            async with engine.begin() as conn:
+                for i in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    batch = rows[i : i + FLUSH_BATCH_SIZE]
+                    await conn.execute(upsert_statement(engine.dialect.name, batch))
+        except BaseException:
+            self.restore(pending)
+            raise
+        return len(rows)
+
+
+def upsert_statement(dialect: str, rows: List[dict]) -> Insert:
+    """
+    Build a multi-row insert of usage rows that adds the counters to the
+    existing row of the same user, model, date and operation.
+    """
+    table = ModelUsage.__table__
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(
+            {name: table.c[name] + stmt.inserted[name] for name in _COUNTERS}
+        )
+
+    if dialect == "postgresql":
+        stmt = postgresql.insert(table).values(rows)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table).values(rows)
+    else:
+        raise NotImplementedError(f'Unsupported database {dialect}')
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "model_id", "date", "operation"],
+        set_={name: table.c[name] + stmt.excluded[name] for name in _COUNTERS},
+    )
+
+
+usage_aggregator = UsageAggregator()
+
+
+async def flush_usage_to_db():
+    """
+    Flush model usage records to the database periodically.
+    """
+    try:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            await _flush()
+    except asyncio.CancelledError:
+        # Write what's left on shutdown.
+        await _flush()
+        raise
+
+
+async def _flush():
+    try:
+        count = await usage_aggregator.flush(get_engine())
+        if count:
+            logger.debug(f"Flushed {count} usage records to DB")
+    except Exception as e:
+        logger.error(f"Error flushing usage to DB: {e}")
@@ -0,0 +1,64 @@
+from typing import Any
+
+
+def create_merge_patch(old: Any, new: Any) -> Any:
+    """
+    Create a JSON merge patch (RFC 7396) turning the old JSON value into the
+    new one. Keys with a null value in the new value are removed by the
+    patch, merge patches can't set nulls.
+
+    :param old: The old JSON value.
+    :param new: The new JSON value.
+    :return: The patch, an empty dict if the values are equal objects.
+    """
+
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+
+    patch = {}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        elif old[key] != value:
+            patch[key] = create_merge_patch(old[key], value)
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+def contains_null(patch: Any) -> bool:
+    """
+    Check whether the JSON merge patch carries a null at any level, a key the
+    patch removes.
+
+    :param patch: The merge patch.
+    :return: True if an object in the patch has a null value.
+    """
+
+    if not isinstance(patch, dict):
+        return False
+
+    return any(value is None or contains_null(value) for value in patch.values())
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """
+    Apply a JSON merge patch (RFC 7396) to the JSON value without modifying
+    it.
+
+    :param target: The JSON value to patch.
+    :param patch: The merge patch.
+    :return: The patched value.
+    """
+
+    if not isinstance(patch, dict):
+        return patch
+
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -11,6 +11,7 @@ from prometheus_client.core import (
     InfoMetricFamily,
 )
 from gpustack.config.config import Config
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
 from gpustack.logging import setup_logging
 from gpustack.utils.name import metric_name
 from gpustack.worker.collector import WorkerStatusCollector
@@ -299,6 +300,7 @@ class MetricExporter(Collector):
             )
             raw_registry.register(raw_collector)
             unified_registry.register(self)
+            unified_registry.register(proxy_connection_pool)
 
             # Start FastAPI server
             app = FastAPI(
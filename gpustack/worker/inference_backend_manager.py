@@ -79,11 +79,13 @@ class InferenceBackendManager:
 
     async def _watch_changes(self) -> None:
         """Watch for InferenceBackend changes and update the cache."""
+        # Kept across reconnects to resume after the last event.
+        params = {}
         while self._running:
             try:
                 logger.info("Starting to watch InferenceBackend changes")
                 await self._clientset.inference_backends.awatch(
-                    callback=self._handle_event
+                    callback=self._handle_event, params=params
                 )
 
             except asyncio.CancelledError:
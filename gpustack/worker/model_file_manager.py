@@ -67,11 +67,16 @@ class ModelFileManager:
 
     async def watch_model_files(self):
         self._prerun()
+        # Kept across reconnects to resume after the last event. Only the files
+        # of this worker are sent by the server.
+        params = {"worker_id": self._worker_id}
         while True:
             try:
                 logger.debug("Started watching model files.")
                 await self._clientset.model_files.awatch(
-                    callback=self._handle_model_file_event
+                    callback=self._handle_model_file_event,
+                    params=params,
+                    delta=True,
                 )
             except asyncio.CancelledError:
                 break
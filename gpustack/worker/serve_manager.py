@@ -70,11 +70,15 @@ class ServeManager:
         os.makedirs(self._serve_log_dir, exist_ok=True)
 
     async def watch_model_instances(self):
+        # Kept across reconnects to resume after the last event.
+        params = {}
         while True:
             try:
                 logger.info("Started watching model instances.")
                 await self._clientset.model_instances.awatch(
-                    callback=self._handle_model_instance_event
+                    callback=self._handle_model_instance_event,
+                    params=params,
+                    delta=True,
                 )
             except asyncio.CancelledError:
                 break
@@ -6,7 +6,6 @@ import logging
 import socket
 from typing import Optional
 
-import aiohttp
 from fastapi import FastAPI
 import setproctitle
 import tenacity
@@ -14,7 +13,7 @@ import uvicorn
 
 from gpustack.api import exceptions
 from gpustack.config import Config
-from gpustack.config.envs import TCP_CONNECTOR_LIMIT
+from gpustack.http_proxy.connection_pool import proxy_connection_pool
 from gpustack.routes import debug, probes
 from gpustack.routes.worker import logs, proxy
 from gpustack.server import catalog
@@ -237,13 +236,7 @@ class Worker:
 
         @asynccontextmanager
         async def lifespan(app: FastAPI):
-            connector = aiohttp.TCPConnector(
-                limit=TCP_CONNECTOR_LIMIT,
-                force_close=True,
-            )
-            app.state.http_client = aiohttp.ClientSession(
-                connector=connector, trust_env=True
-            )
+            app.state.http_client = proxy_connection_pool.new_client_session()
             yield
             await app.state.http_client.close()
 
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from gpustack.api.principal_cache import Principal, PrincipalCache
+from gpustack.server.bus import Event, EventType, event_bus
+
+
+def new_principal(user_id: int, api_key_id: int, expires_at=None) -> Principal:
+    return Principal(
+        user=SimpleNamespace(id=user_id),
+        api_key=SimpleNamespace(id=api_key_id, expires_at=expires_at),
+        allowed_model_names={"test"},
+    )
+
+
+async def wait_for_events():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_principals_are_reloaded_after_events():
+    principals = {
+        "alice-token": new_principal(1, 10),
+        "bob-token": new_principal(2, 20),
+        "expired-token": new_principal(
+            3, 30, datetime.now(timezone.utc) - timedelta(seconds=1)
+        ),
+    }
+    loads = []
+
+    async def load_principal(token, verified_hash=None):
+        loads.append((token, verified_hash))
+        await asyncio.sleep(0)
+        principal = principals.get(token)
+        return principal, None if principal is None else f"hash-{token}"
+
+    cache = PrincipalCache()
+    task = asyncio.create_task(cache.start())
+    await wait_for_events()
+    try:
+        with patch("gpustack.api.principal_cache.load_principal", load_principal):
+            results = await asyncio.gather(
+                *[cache.authenticate("alice-token") for _ in range(3)]
+            )
+            assert results == [principals["alice-token"]] * 3
+            assert await cache.authenticate("bob-token") is principals["bob-token"]
+            assert await cache.authenticate("alice-token") is principals["alice-token"]
+            assert await cache.authenticate("expired-token") is None
+            assert await cache.authenticate("invalid-token") is None
+            assert loads == [
+                ("alice-token", None),
+                ("bob-token", None),
+                ("expired-token", None),
+                ("invalid-token", None),
+            ]
+
+            loads.clear()
+            # Only the principal of the user is reloaded, without verifying
+            # the secret again.
+            await event_bus.publish(
+                "user", Event(type=EventType.UPDATED, data=SimpleNamespace(id=1))
+            )
+            await wait_for_events()
+            await cache.authenticate("alice-token")
+            await cache.authenticate("bob-token")
+            assert loads == [("alice-token", "hash-alice-token")]
+
+            loads.clear()
+            await event_bus.publish(
+                "model",
+                Event(
+                    type=EventType.UPDATED,
+                    data=SimpleNamespace(id=5),
+                    changed_fields={"ready_replicas": (0, 1)},
+                ),
+            )
+            await wait_for_events()
+            await cache.authenticate("bob-token")
+            assert loads == []
+
+            await event_bus.publish(
+                "model", Event(type=EventType.CREATED, data=SimpleNamespace(id=6))
+            )
+            await wait_for_events()
+            await cache.authenticate("alice-token")
+            await cache.authenticate("bob-token")
+            assert [token for token, _ in loads] == ["alice-token", "bob-token"]
+
+            loads.clear()
+            del principals["bob-token"]
+            await event_bus.publish(
+                "apikey", Event(type=EventType.DELETED, data=SimpleNamespace(id=20))
+            )
+            await wait_for_events()
+            assert await cache.authenticate("bob-token") is None
+            assert await cache.authenticate("bob-token") is None
+            assert loads == [("bob-token", "hash-bob-token"), ("bob-token", None)]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
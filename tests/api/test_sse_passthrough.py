@@ -0,0 +1,213 @@
+import json
+import random
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from openai.types.chat import ChatCompletionChunk
+
+from gpustack.api.middlewares import ModelUsageMiddleware, process_chunk
+from gpustack.http_proxy.sse import SSEUsageScanner
+from gpustack.routes.openai import _stream_response_chunks, _stream_response_lines
+from gpustack.schemas.model_usage import OperationEnum
+
+
+def chat_chunk(index: int, content: str, usage=None, finish_reason=None) -> dict:
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 1700000000,
+        "model": "test",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": content},
+                "finish_reason": finish_reason,
+            }
+        ],
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+        chunk["choices"] = []
+    return chunk
+
+
+def upstream_stream(tokens: int) -> bytes:
+    frames = [chat_chunk(i, f"token-{i} ") for i in range(tokens)]
+    frames.append(chat_chunk(tokens, "", finish_reason="stop"))
+    frames.append(
+        chat_chunk(
+            tokens,
+            "",
+            usage={
+                "prompt_tokens": 12,
+                "completion_tokens": tokens,
+                "total_tokens": 12 + tokens,
+            },
+        )
+    )
+    body = b"".join(
+        b"data: " + json.dumps(f, separators=(",", ":")).encode() + b"\n\n"
+        for f in frames
+    )
+    return body + b"data: [DONE]\n\n"
+
+
+def split_randomly(data: bytes, seed: int):
+    rng = random.Random(seed)
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = start + rng.randint(1, 300)
+        chunks.append(data[start:end])
+        start = end
+    return chunks
+
+
+class FakeContent:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def iter_any(self):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def iter_chunked(self, size):
+        data = b"".join(self._chunks)
+        for i in range(0, len(data), size):
+            yield data[i : i + size]
+
+
+def new_request():
+    return SimpleNamespace(state=SimpleNamespace(start_time=None))
+
+
+async def legacy_output(chunks) -> bytes:
+    """The line re-framing path that was used before passthrough."""
+    request = new_request()
+    resp = SimpleNamespace(content=FakeContent(chunks))
+    output = b""
+    async for line in _stream_response_lines(resp):
+        async for processed in process_chunk(
+            line.encode(), request, ChatCompletionChunk, OperationEnum.CHAT_COMPLETION
+        ):
+            output += processed
+    return output
+
+
+async def call_middleware(path: str, response_app, stream: bool) -> bytes:
+    async def app(scope, receive, send):
+        Request(scope).state.stream = stream
+        await response_app(scope, receive, send)
+
+    scope = {
+        "type": "http",
+        "asgi": {"spec_version": "2.4"},
+        "method": "POST",
+        "path": path,
+        "headers": [],
+        "state": {"start_time": None},
+    }
+    output = b""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal output
+        if message["type"] == "http.response.body":
+            output += bytes(message.get("body", b""))
+
+    await ModelUsageMiddleware(app)(scope, receive, send)
+    return output
+
+
+async def passthrough_output(chunks) -> bytes:
+    resp = SimpleNamespace(content=FakeContent(chunks))
+    upstream = StreamingResponse(_stream_response_chunks(resp))
+    return await call_middleware("/v1/chat/completions", upstream, stream=True)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+async def test_sse_passthrough_matches_legacy_output(seed):
+    data = upstream_stream(50)
+    chunks = split_randomly(data, seed)
+
+    with (
+        patch(
+            "gpustack.api.middlewares.record_model_usage", new_callable=AsyncMock
+        ) as record_model_usage,
+        patch(
+            "gpustack.api.middlewares.compute_latency_metrics",
+            return_value=(10.0, 2.0),
+        ),
+    ):
+        expected = await legacy_output(chunks)
+        actual = await passthrough_output(chunks)
+
+    assert actual == expected
+    # Usage is recorded once per path.
+    assert record_model_usage.await_count == 2
+    assert b'"tokens_per_second":500.0' in actual
+
+
+@pytest.mark.asyncio
+async def test_sse_passthrough_forwards_crlf_frames_immediately():
+    data = upstream_stream(3).replace(b"\n\n", b"\r\n\r\n")
+    frames = [frame + b"\r\n\r\n" for frame in data.split(b"\r\n\r\n")[:-1]]
+
+    with patch(
+        "gpustack.api.middlewares.record_model_usage", new_callable=AsyncMock
+    ) as record_model_usage:
+        scanner = SSEUsageScanner()
+        for frame in frames:
+            # Each frame is complete, nothing is held back for the next one.
+            assert b"".join(bytes(s) for s, _ in scanner.feed(frame)) == frame
+        output = await passthrough_output(frames)
+
+    usage = record_model_usage.await_args.args[1]
+    assert usage.completion_tokens == 3
+    assert output.startswith(frames[0])
+    assert output.endswith(b"\n\ndata: [DONE]\r\n\r\n")
+
+
+def test_sse_usage_scanner_only_flags_usage_frames():
+    data = upstream_stream(3)
+    scanner = SSEUsageScanner()
+    segments = []
+    for chunk in split_randomly(data, 42):
+        segments.extend(scanner.feed(chunk))
+    segments.extend(scanner.flush())
+
+    assert b"".join(bytes(s) for s, _ in segments) == data
+    usage_frames = [bytes(s) for s, is_usage in segments if is_usage]
+    assert len(usage_frames) == 1
+    assert usage_frames[0].startswith(b"data: ")
+    assert usage_frames[0].endswith(b"\n\n")
+    assert b'"completion_tokens":3' in usage_frames[0]
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_usage_is_recorded_from_body_window():
+    body = {
+        "object": "list",
+        "data": [
+            {"object": "embedding", "index": i, "embedding": [0.1] * 1024}
+            for i in range(32)
+        ],
+        "model": "test",
+        "usage": {"prompt_tokens": 7, "total_tokens": 7},
+    }
+    response = JSONResponse(body)
+    with patch(
+        "gpustack.api.middlewares.record_model_usage", new_callable=AsyncMock
+    ) as record_model_usage:
+        output = await call_middleware("/v1/embeddings", response, stream=False)
+
+    assert output == response.body
+    usage = record_model_usage.await_args.args[1]
+    assert (usage.prompt_tokens, usage.total_tokens) == (7, 7)
+    assert record_model_usage.await_args.args[2] == OperationEnum.EMBEDDING
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from gpustack.api.exceptions import TooManyRequestsException
+from gpustack.http_proxy.admission import (
+    AdmissionController,
+    AdmissionLimits,
+    AdmissionQueue,
+    parse_tenant_weights,
+)
+from tests.utils.model import new_model
+
+
+async def enqueue(queue: AdmissionQueue, tenant: str, limits, admitted: list):
+    release = await queue.acquire(tenant, 1.0, limits)
+    admitted.append(tenant)
+    return release
+
+
+@pytest.mark.asyncio
+async def test_waiting_tenants_are_served_fairly():
+    queue = AdmissionQueue()
+    limits = AdmissionLimits(max_concurrency=1, max_queue_size=10, max_wait_seconds=5)
+    release = await queue.acquire("user:0", 1.0, limits)
+
+    admitted = []
+    # A heavy tenant queues three requests before a light tenant's single one.
+    tasks = [
+        asyncio.create_task(enqueue(queue, tenant, limits, admitted))
+        for tenant in ("user:1", "user:1", "user:1", "user:2")
+    ]
+    await asyncio.sleep(0)
+    assert queue.waiting == 4
+
+    for _ in range(len(tasks)):
+        release()
+        (task,), _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        tasks.remove(task)
+        release = task.result()
+    release()
+
+    assert admitted == ["user:1", "user:2", "user:1", "user:1"]
+    assert queue.in_flight == 0 and queue.waiting == 0
+    assert queue.wait_count == 4
+
+
+@pytest.mark.asyncio
+async def test_rejects_with_retry_after():
+    queue = AdmissionQueue()
+    limits = AdmissionLimits(max_concurrency=1, max_queue_size=1, max_wait_seconds=0.05)
+    release = await queue.acquire("user:1", 1.0, limits)
+
+    with pytest.raises(TooManyRequestsException) as e:
+        await queue.acquire("user:2", 1.0, limits)
+    assert e.value.status_code == 429
+    assert e.value.headers["Retry-After"] == "1"
+    assert queue.waiting == 0
+
+    # Once the hold time is known, a request expected to wait longer than the
+    # max wait is rejected without queueing.
+    release()
+    queue._hold_time = 3
+    release = await queue.acquire("user:1", 1.0, limits)
+    with pytest.raises(TooManyRequestsException) as e:
+        await queue.acquire("user:2", 1.0, limits)
+    assert e.value.headers["Retry-After"] == "3"
+    assert queue.rejected == 2
+
+    release()
+    release()
+    assert queue.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_controller_limits_per_instance():
+    controller = AdmissionController(tenant_weights={})
+    model = new_model(1, "test")
+    model.env = {"GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE": "2"}
+
+    releases = [await controller.admit(model, "user:1", 2) for _ in range(4)]
+    waiter = asyncio.create_task(controller.admit(model, "user:1", 2))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    releases[0]()
+    releases.append(await waiter)
+    for release in releases:
+        release()
+
+    metrics = {m.name: m for m in controller.collect()}
+    assert metrics["gpustack:admission_in_flight_requests"].samples[0].value == 0
+    assert metrics["gpustack:admission_queue_depth"].samples[0].value == 0
+
+
+@pytest.mark.asyncio
+async def test_requests_never_admitted_cost_no_virtual_time():
+    queue = AdmissionQueue()
+    limits = AdmissionLimits(max_concurrency=1, max_queue_size=10, max_wait_seconds=5)
+    release = await queue.acquire("user:0", 1.0, limits)
+
+    # A timed out and a cancelled request of the first tenant.
+    short_wait = AdmissionLimits(
+        max_concurrency=1, max_queue_size=10, max_wait_seconds=0.01
+    )
+    with pytest.raises(TooManyRequestsException):
+        await queue.acquire("user:1", 1.0, short_wait)
+    cancelled = asyncio.create_task(queue.acquire("user:1", 1.0, limits))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert "user:1" not in queue._last_finish
+
+    admitted = []
+    tasks = [
+        asyncio.create_task(enqueue(queue, tenant, limits, admitted))
+        for tenant in ("user:2", "user:2", "user:1")
+    ]
+    await asyncio.sleep(0)
+    for _ in range(len(tasks)):
+        release()
+        (task,), _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        tasks.remove(task)
+        release = task.result()
+    release()
+
+    assert admitted == ["user:2", "user:1", "user:2"]
+    # The tags are dropped once the model is idle.
+    assert not queue._last_finish
+
+
+def test_invalid_model_limits_fall_back_to_defaults():
+    model = new_model(1, "test")
+    model.env = {
+        "GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS": "ten",
+        "GPUSTACK_ADMISSION_MAX_CONCURRENT_REQUESTS_PER_INSTANCE": "2",
+        "GPUSTACK_ADMISSION_MAX_WAIT_SECONDS": "",
+    }
+    limits = AdmissionLimits.for_model(model, 3)
+    assert limits == AdmissionLimits(max_concurrency=6)
+
+
+def test_parse_tenant_weights():
+    assert parse_tenant_weights("user:1=2, api_key:5=0.5,bad,user:2=0") == {
+        "user:1": 2.0,
+        "api_key:5": 0.5,
+    }
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import pytest
+from starlette.responses import Response
+
+from gpustack.http_proxy.coalescer import EmbeddingsCoalescer
+from gpustack.http_proxy.json_body import JSONBody
+from tests.utils.model import new_model
+
+
+def body(data: dict) -> JSONBody:
+    return JSONBody(json.dumps(data).encode())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_sent_as_one_batch():
+    sent = []
+
+    async def send(batch_body: JSONBody):
+        inputs = batch_body.json()["input"]
+        sent.append(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(len(text))]}
+            for i, text in reversed(list(enumerate(inputs)))
+        ]
+        usage = {"prompt_tokens": 10, "total_tokens": 10}
+        return Response(json.dumps({"data": data, "usage": usage})), len(sent)
+
+    coalescer = EmbeddingsCoalescer(window_ms=5, max_batch_size=8)
+    model = new_model(1, "test")
+    results = await asyncio.gather(
+        coalescer.submit(model, "user:1", body({"model": "test", "input": "a"}), send),
+        coalescer.submit(
+            model, "user:1", body({"model": "test", "input": ["bbbb", "cc"]}), send
+        ),
+        coalescer.submit(
+            model,
+            "user:1",
+            body({"model": "test", "input": "d", "dimensions": 4}),
+            send,
+        ),
+        # Requests of other principals are never merged.
+        coalescer.submit(model, "user:2", body({"model": "test", "input": "e"}), send),
+    )
+
+    assert sorted(sent) == [["a", "bbbb", "cc"], ["d"], ["e"]]
+    # Every caller knows which batch, here standing for the instance, served it.
+    assert results[0][1] == results[1][1]
+    assert len({served_by for _, served_by in results}) == 3
+    assert not coalescer._sending
+    first, second, _, _ = [json.loads(r.body) for r, _ in results]
+    assert first["data"] == [{"object": "embedding", "index": 0, "embedding": [1.0]}]
+    assert [d["embedding"] for d in second["data"]] == [[4.0], [2.0]]
+    assert [d["index"] for d in second["data"]] == [0, 1]
+    assert first["usage"]["prompt_tokens"] + second["usage"]["prompt_tokens"] == 10
+    assert second["usage"]["prompt_tokens"] > first["usage"]["prompt_tokens"]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    batches = []
+
+    async def send(batch_body: JSONBody):
+        batches.append(batch_body.json()["input"])
+        if len(batches) == 2:
+            return Response("overloaded", status_code=503), None
+        data = [{"index": 0, "embedding": [0.0]}, {"index": 1, "embedding": [1.0]}]
+        usage = {"total_tokens": 3}
+        return Response(json.dumps({"data": data, "usage": usage})), None
+
+    coalescer = EmbeddingsCoalescer(window_ms=60_000, max_batch_size=2)
+    model = new_model(1, "test")
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            *[
+                coalescer.submit(
+                    model, "user:1", body({"model": "test", "input": str(i)}), send
+                )
+                for i in range(4)
+            ]
+        ),
+        timeout=1,
+    )
+    responses = [response for response, _ in results]
+
+    assert batches == [["0", "1"], ["2", "3"]]
+    assert [json.loads(r.body)["usage"]["total_tokens"] for r in responses[:2]] == [
+        2,
+        1,
+    ]
+    assert [r.status_code for r in responses[2:]] == [503, 503]
+    assert (
+        await coalescer.submit(model, "user:1", body({"input": ["x", "y"]}), send)
+        is None
+    )
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from gpustack.http_proxy.connection_pool import ConnectionPool
+
+
+@pytest.mark.asyncio
+async def test_connection_pool_stats_and_eviction():
+    release = asyncio.Event()
+
+    async def ping(request: web.Request):
+        return web.json_response({"ok": True})
+
+    async def slow(request: web.Request):
+        resp = web.StreamResponse()
+        await resp.prepare(request)
+        await release.wait()
+        await resp.write(b"done")
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/ping", ping)
+    app.router.add_get("/slow", slow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+
+    pool = ConnectionPool()
+    session = pool.new_client_session()
+    host = f"127.0.0.1:{port}"
+    try:
+        async with session.get(f"http://{host}/slow") as resp:
+            assert pool.stats()[host].acquired == 1
+            release.set()
+            assert await resp.read() == b"done"
+
+        for _ in range(3):
+            async with session.get(f"http://{host}/ping") as resp:
+                await resp.read()
+
+        # Connections are kept alive and reused.
+        stats = pool.stats()[host]
+        assert (stats.idle, stats.acquired, stats.open) == (1, 0, 1)
+
+        metrics = {metric.name: metric for metric in pool.collect()}
+        assert metrics["gpustack:proxy_connections_idle"].samples[0].value == 1
+
+        pool.evict("127.0.0.1")
+        assert pool.stats()[host].open == 0
+    finally:
+        await session.close()
+        await runner.cleanup()
@@ -0,0 +1,104 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from gpustack.http_proxy.direct_routing import (
+    DirectRouting,
+    RoutingModeEnum,
+    parse_cluster_modes,
+)
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.routes.openai import UpstreamSelector
+from gpustack.schemas.models import BackendEnum, ModelInstanceStateEnum
+from tests.utils.model import new_model, new_model_instance
+
+
+def running_instance(id: int, port: int):
+    instance = new_model_instance(
+        id, f"test-{id}", 1, 1, ModelInstanceStateEnum.RUNNING
+    )
+    instance.worker_ip = "127.0.0.1"
+    instance.port = port
+    return instance
+
+
+def test_routing_mode_resolution():
+    routing = DirectRouting(default_mode="worker_proxy", cluster_modes={2: "auto"})
+    model = new_model(1, "test")
+    assert routing.mode(model) == RoutingModeEnum.WORKER_PROXY
+
+    model.cluster_id = 2
+    assert routing.mode(model) == RoutingModeEnum.AUTO
+
+    model.env = {"GPUSTACK_PROXY_ROUTING_MODE": "direct"}
+    assert routing.mode(model) == RoutingModeEnum.DIRECT
+
+    model.env = {}
+    model.backend = BackendEnum.ASCEND_MINDIE
+    assert routing.mode(model) == RoutingModeEnum.DIRECT
+
+    assert parse_cluster_modes("1=direct, x=auto,") == {1: "direct"}
+
+
+@pytest.mark.asyncio
+async def test_auto_mode_goes_direct_once_probed():
+    server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+    open_port = server.sockets[0].getsockname()[1]
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        closed_port = s.getsockname()[1]
+
+    routing = DirectRouting(default_mode="auto", cluster_modes={})
+    model = new_model(1, "test")
+    reachable = running_instance(1, open_port)
+    unreachable = running_instance(2, closed_port)
+    try:
+        # The first requests go through the worker proxy while probing.
+        assert not routing.use_direct(model, reachable)
+        assert not routing.use_direct(model, unreachable)
+        await asyncio.gather(*routing._probing.values())
+
+        assert routing.use_direct(model, reachable)
+        assert not routing.use_direct(model, unreachable)
+
+        routing.mark_unreachable(reachable)
+        assert not routing.use_direct(model, reachable)
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_failed_direct_request_retries_through_worker_proxy():
+    instance = running_instance(1, 9999)
+    routing = DirectRouting(default_mode="auto", cluster_modes={})
+    routing._probes[("127.0.0.1", 9999)] = (True, float("inf"))
+
+    async def get_running_instance(model, json_body=None, exclude=None):
+        return instance
+
+    async def get_worker_by_id(worker_id):
+        return SimpleNamespace(port=10150, token="token")
+
+    request = SimpleNamespace(headers={}, state=SimpleNamespace())
+    with (
+        patch("gpustack.routes.openai.direct_routing", routing),
+        patch("gpustack.routes.openai.get_running_instance", get_running_instance),
+        patch("gpustack.routes.openai.get_worker_by_id", get_worker_by_id),
+    ):
+        upstream = UpstreamSelector(
+            request, new_model(1, "test"), "embeddings", None, None
+        )
+        target = await upstream.select()
+        assert target.direct
+        assert target.url == "http://127.0.0.1:9999/v1/embeddings"
+
+        assert await upstream.failover(ConnectionError("refused"))
+        assert not upstream.current.direct
+        assert upstream.current.instance is instance
+        assert upstream.current.url == "http://127.0.0.1:10150/proxy/v1/embeddings"
+        assert not load_balancer.is_suspect(instance.id)
+        upstream.release()
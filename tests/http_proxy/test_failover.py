@@ -0,0 +1,99 @@
+import socket
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from gpustack.http_proxy.json_body import JSONBody
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.http_proxy.upstream import UPSTREAM_UNREACHABLE_HEADER
+from gpustack.routes.openai import UpstreamSelector, handle_standard_request
+from gpustack.schemas.models import ModelInstanceStateEnum
+from tests.utils.model import new_model, new_model_instance
+
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_worker(handler) -> web.AppRunner:
+    app = web.Application()
+    app.router.add_post("/proxy/v1/embeddings", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+async def unreachable(request: web.Request):
+    return web.json_response(
+        {"error": {"message": "connection refused"}},
+        status=503,
+        headers={UPSTREAM_UNREACHABLE_HEADER: "true"},
+    )
+
+
+async def ok(request: web.Request):
+    body = await request.json()
+    return web.json_response({"model": body["model"], "instance": "healthy"})
+
+
+@pytest.mark.asyncio
+async def test_standard_request_fails_over_before_responding():
+    unreachable_worker = await start_worker(unreachable)
+    healthy_worker = await start_worker(ok)
+    ports = {
+        1: closed_port(),
+        2: unreachable_worker.addresses[0][1],
+        3: healthy_worker.addresses[0][1],
+    }
+    instances = []
+    for i in (1, 2, 3):
+        instance = new_model_instance(
+            i, f"test-{i}", 1, i, ModelInstanceStateEnum.RUNNING
+        )
+        instance.worker_ip = "127.0.0.1"
+        instance.port = 8000 + i
+        instances.append(instance)
+
+    async def get_running_instance(model, json_body=None, exclude=None):
+        # Deterministic order: the dead instances are tried first.
+        return next(i for i in instances if i.id not in exclude)
+
+    async def get_worker_by_id(worker_id):
+        return SimpleNamespace(port=ports[worker_id], token="token")
+
+    session = aiohttp.ClientSession()
+    request = SimpleNamespace(
+        method="POST",
+        headers={},
+        state=SimpleNamespace(),
+        app=SimpleNamespace(state=SimpleNamespace(http_client=session)),
+    )
+    json_body = JSONBody(b'{"model": "test", "input": "hi"}')
+    try:
+        with (
+            patch("gpustack.routes.openai.get_running_instance", get_running_instance),
+            patch("gpustack.routes.openai.get_worker_by_id", get_worker_by_id),
+        ):
+            upstream = UpstreamSelector(
+                request, new_model(1, "test"), "embeddings", json_body, None
+            )
+            await upstream.select()
+            response = await handle_standard_request(request, upstream, json_body, None)
+            upstream.release()
+    finally:
+        await session.close()
+        await unreachable_worker.cleanup()
+        await healthy_worker.cleanup()
+
+    assert response.status_code == 200
+    assert b'"instance": "healthy"' in response.body
+    assert request.state.instance.id == 3
+    assert load_balancer.is_suspect(1) and load_balancer.is_suspect(2)
+    assert not load_balancer.is_suspect(3)
+    assert all(load_balancer.in_flight.get(i) == 0 for i in (1, 2, 3))
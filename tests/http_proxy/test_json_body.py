@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from gpustack.http_proxy.json_body import JSONBody, sniff_json_fields
+from gpustack.routes.openai import apply_qwen3_reranker_templates
+
+KEYS = ("model", "stream", "stream_options")
+
+
+@pytest.mark.parametrize(
+    "name, body",
+    [
+        ("empty object", {}),
+        ("model only", {"model": "llama"}),
+        (
+            "model after long messages",
+            {
+                "messages": [
+                    {"role": "system", "content": "You are {helpful}, [really]."},
+                    {"role": "user", "content": 'say "model": "other", ok? \\'},
+                ],
+                "model": "llama",
+                "stream": True,
+            },
+        ),
+        (
+            "nested keys are ignored",
+            {
+                "metadata": {"model": "nested", "stream": False},
+                "stream_options": {"include_usage": False},
+                "model": "llama",
+            },
+        ),
+        (
+            "escaped key",
+            {"mo\"del": "x", "model": "llama", "stream": False},
+        ),
+        ("unicode", {"messages": [{"content": "中文 ✓"}], "model": "模型"}),
+    ],
+)
+def test_sniff_json_fields(name, body):
+    raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    expected = {key: body[key] for key in KEYS if key in body}
+
+    assert sniff_json_fields(raw, KEYS) == expected, name
+
+    pretty = json.dumps(body, indent=2).encode("utf-8")
+    assert sniff_json_fields(pretty, KEYS) == expected, name
+
+
+def test_sniff_json_fields_budget_and_errors():
+    raw = json.dumps({"input": list(range(1000)), "model": "m"}).encode()
+    assert sniff_json_fields(raw, KEYS, budget=10) == {"model": "m"}
+
+    many_strings = json.dumps({"input": ["a"] * 1000, "model": "m"}).encode()
+    assert sniff_json_fields(many_strings, KEYS, budget=10) is None
+
+    # Nested brackets count against the budget too.
+    many_arrays = json.dumps({"input": [[1, 2]] * 1000, "model": "m"}).encode()
+    assert sniff_json_fields(many_arrays, KEYS, budget=100) is None
+    batches = json.dumps({"input": [list(range(500))] * 4, "model": "m"}).encode()
+    assert sniff_json_fields(batches, KEYS, budget=20) == {"model": "m"}
+
+    with pytest.raises(ValueError):
+        sniff_json_fields(b"[1, 2]", KEYS)
+    with pytest.raises(ValueError):
+        sniff_json_fields(b'{"model": "m', KEYS)
+
+
+def test_json_body_forwards_raw_bytes():
+    raw = b'{"messages": [{"role": "user", "content": "hi"}], "model": "m"}'
+    body = JSONBody(raw)
+
+    assert body.get("model") == "m"
+    assert body.get("stream", False) is False
+    assert "stream_options" not in body
+    assert body.to_bytes() is raw
+
+
+def test_json_body_injects_stream_options_without_parsing():
+    raw = b'{"model": "m", "stream": true}'
+    body = JSONBody(raw)
+    body.setdefault("stream_options", {"include_usage": True})
+
+    assert body._parsed is None
+    assert json.loads(body.to_bytes()) == {
+        "model": "m",
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+
+    empty = JSONBody(b"{ }")
+    empty.setdefault("stream_options", {"include_usage": True})
+    assert json.loads(empty.to_bytes()) == {"stream_options": {"include_usage": True}}
+
+    # Existing options are kept untouched.
+    raw = b'{"model": "m", "stream_options": {"include_usage": false}}'
+    body = JSONBody(raw)
+    body.setdefault("stream_options", {"include_usage": True})
+    assert body.to_bytes() is raw
+
+
+def test_json_body_mutation_reserializes():
+    body = JSONBody(b'{"model": "m", "query": "q", "documents": ["d"]}')
+    apply_qwen3_reranker_templates(body.mutable_json())
+
+    forwarded = json.loads(body.to_bytes())
+    assert forwarded["model"] == "m"
+    assert "<Query>: q" in forwarded["query"]
+    assert forwarded["documents"][0].startswith("<Document>: d")
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from gpustack.http_proxy.model_list_cache import ModelListCache
+from gpustack.server.bus import Event, EventType, event_bus
+
+
+async def wait_for_events():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_entries_are_invalidated_by_bus_events():
+    cache = ModelListCache()
+    admin = SimpleNamespace(id=1, is_admin=True)
+    alice = SimpleNamespace(id=2, is_admin=False)
+    bob = SimpleNamespace(id=3, is_admin=False)
+    admin_key = cache.key(admin, ["llm"], None)
+    alice_key = cache.key(alice, [], True)
+    bob_key = cache.key(bob, [], True)
+
+    # Nothing is cached until the bus is watched.
+    cache.put(admin_key, b"admin", cache.generation)
+    assert cache.get(admin_key) is None
+
+    task = asyncio.create_task(cache.start())
+    await wait_for_events()
+    try:
+        for key, content in [(admin_key, b"admin"), (alice_key, b"a"), (bob_key, b"b")]:
+            cache.put(key, content, cache.generation)
+        assert (
+            cache.get(cache.key(SimpleNamespace(id=9, is_admin=True), ["llm"], True))
+            is None
+        )
+        assert (
+            cache.get(cache.key(SimpleNamespace(id=9, is_admin=True), ["llm"], False))
+            == b"admin"
+        )
+
+        await event_bus.publish(
+            "mymodel", Event(type=EventType.UPDATED, data=SimpleNamespace(user_id=2))
+        )
+        await wait_for_events()
+        assert cache.get(alice_key) is None
+        assert cache.get(bob_key) == b"b"
+        assert cache.get(admin_key) == b"admin"
+
+        # A response built from a query that raced with an event is not kept.
+        generation = cache.generation
+        await event_bus.publish("model", Event(type=EventType.DELETED, data=None))
+        await wait_for_events()
+        cache.put(alice_key, b"stale", generation)
+        assert cache.get(alice_key) is None
+        assert cache.get(bob_key) is None
+        assert cache.get(admin_key) is None
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    assert not event_bus.subscribers.get("mymodel")
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ModelListCache(max_entries=2)
+    cache._watching = True
+    keys = [(i, (), False) for i in range(3)]
+    cache.put(keys[0], b"0", cache.generation)
+    cache.put(keys[1], b"1", cache.generation)
+    cache.get(keys[0])
+    cache.put(keys[2], b"2", cache.generation)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == b"0"
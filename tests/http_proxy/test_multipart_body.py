@@ -0,0 +1,121 @@
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from gpustack.api.exceptions import ForbiddenException
+from gpustack.http_proxy.multipart_body import MultipartBody
+from gpustack.routes.openai import proxy_request_by_model
+
+BOUNDARY = "----gpustack-test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def text_part(name: str, value: str) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+        f"{value}\r\n"
+    ).encode()
+
+
+def file_part(name: str, filename: str, content: bytes) -> bytes:
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            "Content-Type: audio/wav\r\n\r\n"
+        ).encode()
+        + content
+        + b"\r\n"
+    )
+
+
+def closing() -> bytes:
+    return f"--{BOUNDARY}--\r\n".encode()
+
+
+class ChunkStream:
+    def __init__(self, data: bytes, chunk_size: int):
+        self.chunks = [
+            data[i : i + chunk_size] for i in range(0, len(data), chunk_size)
+        ]
+        self.read = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+async def forwarded(body: MultipartBody) -> bytes:
+    return b"".join([chunk async for chunk in body.iter_bytes()])
+
+
+@pytest.mark.asyncio
+async def test_fields_before_file_stop_reading_early():
+    audio = os.urandom(512 * 1024)
+    data = (
+        text_part("model", "whisper")
+        + text_part("stream", "true")
+        + file_part("file", "a.wav", audio)
+        + closing()
+    )
+    stream = ChunkStream(data, 1024)
+    body = MultipartBody(stream.__aiter__(), CONTENT_TYPE)
+
+    assert await body.read_fields() == {"model": "whisper", "stream": "true"}
+    assert stream.read == 1
+    assert await forwarded(body) == data
+
+
+@pytest.mark.asyncio
+async def test_model_after_file_is_spooled():
+    audio = os.urandom(2 * 1024 * 1024)
+    data = (
+        file_part("file", "a.wav", audio)
+        + text_part("language", "en")
+        + text_part("model", "whisper")
+        + closing()
+    )
+    body = MultipartBody(ChunkStream(data, 7000).__aiter__(), CONTENT_TYPE)
+
+    assert await body.read_fields() == {"model": "whisper"}
+    assert body.get("stream") is None
+    assert await forwarded(body) == data
+
+
+@pytest.mark.asyncio
+async def test_invalid_multipart_body():
+    with pytest.raises(ValueError):
+        MultipartBody(ChunkStream(b"", 1).__aiter__(), "multipart/form-data")
+
+    data = text_part("model", "x" * 10000) + closing()
+    body = MultipartBody(ChunkStream(data, 1024).__aiter__(), CONTENT_TYPE)
+    with pytest.raises(ValueError):
+        await body.read_fields()
+
+
+@pytest.mark.asyncio
+async def test_rejected_request_closes_spool():
+    data = file_part("file", "a.wav", os.urandom(4096)) + text_part("model", "m")
+    stream = ChunkStream(data + closing(), 1024)
+    request = SimpleNamespace(
+        method="POST",
+        headers={"content-type": CONTENT_TYPE},
+        stream=stream.__aiter__,
+        state=SimpleNamespace(user_allow_model_names=set()),
+    )
+    bodies = []
+
+    def multipart_body(*args):
+        bodies.append(MultipartBody(*args))
+        return bodies[-1]
+
+    with patch("gpustack.routes.openai.MultipartBody", multipart_body):
+        with pytest.raises(ForbiddenException):
+            await proxy_request_by_model(request, "audio/transcriptions")
+
+    assert bodies[0].get("model") == "m"
+    assert bodies[0]._spool.closed
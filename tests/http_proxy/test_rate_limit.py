@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from gpustack.api.exceptions import TooManyRequestsException
+from gpustack.http_proxy.rate_limit import RateLimiter, request_rate_limits
+from gpustack.schemas.common import RateLimit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = Clock()
+    with patch("gpustack.http_proxy.rate_limit.time.monotonic", clock):
+        yield clock
+
+
+def test_requests_are_limited_per_scope(clock):
+    limiter = RateLimiter()
+    key_limits = [(("api_key", 1), RateLimit(requests_per_minute=60, request_burst=2))]
+    other_key_limits = [(("api_key", 2), RateLimit(requests_per_minute=60))]
+
+    limiter.admit(key_limits)
+    limiter.admit(key_limits)
+    with pytest.raises(TooManyRequestsException) as e:
+        limiter.admit(key_limits)
+    assert e.value.status_code == 429
+    assert e.value.headers == {"Retry-After": "1"}
+    limiter.admit(other_key_limits)
+
+    clock.now += 1
+    limiter.admit(key_limits)
+    with pytest.raises(TooManyRequestsException):
+        limiter.admit(key_limits)
+
+
+def test_rejected_requests_take_from_no_bucket(clock):
+    limiter = RateLimiter()
+    user_limit = (("user", 1), RateLimit(requests_per_minute=60, request_burst=5))
+    model_limit = (("model", 1), RateLimit(requests_per_minute=60, request_burst=1))
+
+    limiter.admit([user_limit, model_limit])
+    for _ in range(3):
+        with pytest.raises(TooManyRequestsException):
+            limiter.admit([user_limit, model_limit])
+    for _ in range(4):
+        limiter.admit([user_limit])
+    with pytest.raises(TooManyRequestsException):
+        limiter.admit([user_limit])
+
+
+def test_completion_tokens_are_debited_after_requests(clock):
+    limiter = RateLimiter()
+    limits = [(("user", 1), RateLimit(tokens_per_minute=600))]
+
+    limiter.admit(limits)
+    limiter.debit_tokens(limits, 900)
+    with pytest.raises(TooManyRequestsException) as e:
+        limiter.admit(limits)
+    # 301 tokens to refill at 10 per second.
+    assert e.value.headers == {"Retry-After": "31"}
+
+    clock.now += 31
+    limiter.admit(limits)
+
+
+def test_request_rate_limits():
+    limit = RateLimit(requests_per_minute=10)
+    request = SimpleNamespace(
+        state=SimpleNamespace(
+            api_key=None,
+            user=SimpleNamespace(id=2, rate_limit={"requests_per_minute": 5}),
+            model=SimpleNamespace(id=3, rate_limit=limit),
+        )
+    )
+    assert request_rate_limits(request) == [
+        (("user", 2), RateLimit(requests_per_minute=5)),
+        (("model", 3), limit),
+    ]
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from gpustack.http_proxy.json_body import JSONBody
+from gpustack.http_proxy.response_cache import (
+    ENTRY_OVERHEAD,
+    ResponseCache,
+    lookup_cached_request,
+)
+from tests.utils.model import new_model
+
+
+def cached_model(enabled: bool = True):
+    model = new_model(1, "test")
+    model.env = {"GPUSTACK_RESPONSE_CACHE": str(enabled).lower()}
+    return model
+
+
+def body(data: dict) -> JSONBody:
+    return JSONBody(json.dumps(data).encode())
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_by_size_and_spills_to_disk(tmp_path):
+    entry_size = len("k0") + 10 + ENTRY_OVERHEAD
+    cache = ResponseCache(max_size=2 * entry_size, disk_max_size=10)
+    cache.set_spill_dir(str(tmp_path))
+
+    for i in range(3):
+        await cache.put(f"k{i}", b"x" * 10)
+    assert cache.size == 2 * entry_size
+    assert cache.disk_size == 10
+
+    # Promoting the spilled entry spills the least recently used one, which
+    # is then dropped from the disk when the next entry is spilled.
+    assert await cache.get("k0") == b"x" * 10
+    await cache.put("k3", b"x" * 10)
+    assert await cache.get("k1") is None
+    assert await cache.get("k2") == b"x" * 10
+    assert cache.disk_size == 10
+
+
+@pytest.mark.asyncio
+async def test_embeddings_forward_misses_and_merge_in_order():
+    cache = ResponseCache(max_size=1024 * 1024)
+    model = cached_model()
+    request = {"model": "test", "input": ["a", "b"], "encoding_format": "float"}
+
+    cached = await lookup_cached_request(cache, model, "embeddings", body(request))
+    assert not cached.complete
+    response = {
+        "object": "list",
+        "model": "test",
+        "data": [
+            {"object": "embedding", "index": 1, "embedding": [2.0]},
+            {"object": "embedding", "index": 0, "embedding": [1.0]},
+        ],
+        "usage": {"prompt_tokens": 2, "total_tokens": 2},
+    }
+    await cached.merge(json.dumps(response).encode())
+
+    request["input"] = ["b", "c", "a"]
+    cached = await lookup_cached_request(cache, model, "embeddings", body(request))
+    assert cached.forwarded_body().json()["input"] == ["c"]
+    response["data"] = [{"object": "embedding", "index": 0, "embedding": [3.0]}]
+    response["usage"] = {"prompt_tokens": 1, "total_tokens": 1}
+    merged = json.loads(await cached.merge(json.dumps(response).encode()))
+
+    assert [d["embedding"] for d in merged["data"]] == [[2.0], [3.0], [1.0]]
+    assert [d["index"] for d in merged["data"]] == [0, 1, 2]
+    assert merged["usage"]["prompt_tokens"] == 1
+
+    # Other parameters and disabled models don't share results.
+    request["dimensions"] = 8
+    cached = await lookup_cached_request(cache, model, "embeddings", body(request))
+    assert cached.forwarded_body().json()["input"] == ["b", "c", "a"]
+    disabled = cached_model(enabled=False)
+    assert (
+        await lookup_cached_request(cache, disabled, "embeddings", body(request))
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_rerank_ranks_cached_and_computed_documents():
+    cache = ResponseCache(max_size=1024 * 1024)
+    model = cached_model()
+    request = {"model": "test", "query": "q", "documents": ["a"]}
+
+    cached = await lookup_cached_request(cache, model, "rerank", body(request))
+    await cached.merge(
+        json.dumps({"results": [{"index": 0, "relevance_score": 0.1}]}).encode()
+    )
+
+    request.update(documents=["b", "a"], top_n=1)
+    cached = await lookup_cached_request(cache, model, "rerank", body(request))
+    forwarded = cached.forwarded_body().json()
+    assert forwarded["documents"] == ["b"] and "top_n" not in forwarded
+    merged = json.loads(
+        await cached.merge(
+            json.dumps({"results": [{"index": 0, "relevance_score": 0.9}]}).encode()
+        )
+    )
+    assert merged["results"] == [
+        {"index": 0, "relevance_score": 0.9, "document": {"text": "b"}}
+    ]
+
+    cached = await lookup_cached_request(cache, model, "rerank", body(request))
+    assert cached.complete
+    merged = json.loads(await cached.merge(None))
+    assert merged["results"][0]["index"] == 0
+    assert merged["usage"]["total_tokens"] == 0
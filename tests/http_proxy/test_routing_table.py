@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+
+from gpustack.http_proxy.load_balancer import load_balancer
+from gpustack.http_proxy.routing_table import RoutingTable
+from gpustack.schemas.models import ModelInstanceStateEnum
+from gpustack.server.bus import Event, EventType
+from tests.utils.model import new_model, new_model_instance
+
+
+def test_routing_table_tracks_running_instances():
+    table = RoutingTable()
+    model = new_model(1, "llama")
+    table._apply_model(Event(type=EventType.CREATED, data=model))
+
+    running = new_model_instance(1, "llama-1", 1, 1, ModelInstanceStateEnum.RUNNING)
+    starting = new_model_instance(2, "llama-2", 1, 2, ModelInstanceStateEnum.STARTING)
+    table._apply_model_instance(Event(type=EventType.CREATED, data=running))
+    table._apply_model_instance(Event(type=EventType.CREATED, data=starting))
+
+    assert table.get_model("llama").id == 1
+    assert [i.id for i in table.get_running_instances(1)] == [1]
+
+    starting.state = ModelInstanceStateEnum.RUNNING
+    table._apply_model_instance(Event(type=EventType.UPDATED, data=starting))
+    assert [i.id for i in table.get_running_instances(1)] == [1, 2]
+
+    running.state = ModelInstanceStateEnum.ERROR
+    table._apply_model_instance(Event(type=EventType.UPDATED, data=running))
+    assert [i.id for i in table.get_running_instances(1)] == [2]
+
+    table._apply_model_instance(Event(type=EventType.DELETED, data=starting))
+    assert table.get_running_instances(1) == []
+
+
+def test_routing_table_model_rename_and_delete():
+    table = RoutingTable()
+    model = new_model(1, "llama")
+    table._apply_model(Event(type=EventType.CREATED, data=model))
+
+    renamed = new_model(1, "llama-renamed")
+    table._apply_model(Event(type=EventType.UPDATED, data=renamed))
+    assert table.get_model("llama") is None
+    assert table.get_model("llama-renamed").id == 1
+
+    table._apply_model(Event(type=EventType.DELETED, data=renamed))
+    assert table.get_model("llama-renamed") is None
+
+
+def test_routing_table_skips_stale_events():
+    table = RoutingTable()
+    now = datetime.now(timezone.utc)
+
+    fresh = new_model_instance(1, "llama-1", 1, 1, ModelInstanceStateEnum.RUNNING)
+    fresh.updated_at = now
+    table._apply_model_instance(Event(type=EventType.CREATED, data=fresh))
+
+    stale = new_model_instance(1, "llama-1", 1, 1, ModelInstanceStateEnum.STARTING)
+    stale.updated_at = now - timedelta(seconds=5)
+    table._apply_model_instance(Event(type=EventType.UPDATED, data=stale))
+
+    assert [i.id for i in table.get_running_instances(1)] == [1]
+
+
+def test_routing_table_forgets_latency_of_removed_instances():
+    table = RoutingTable()
+    table._apply_model(Event(type=EventType.CREATED, data=new_model(1, "llama")))
+    instances = [
+        new_model_instance(i, f"llama-{i}", 1, i, ModelInstanceStateEnum.RUNNING)
+        for i in (1, 2, 3)
+    ]
+    for instance in instances:
+        table._apply_model_instance(Event(type=EventType.CREATED, data=instance))
+        load_balancer.latency.observe(instance.id, time_to_first_token_ms=100)
+
+    table._apply_model_instance(Event(type=EventType.DELETED, data=instances[0]))
+    instances[1].state = ModelInstanceStateEnum.SCHEDULED
+    table._apply_model_instance(Event(type=EventType.UPDATED, data=instances[1]))
+    assert load_balancer.latency.expected_latency_ms(1) is None
+    assert load_balancer.latency.expected_latency_ms(2) is None
+    assert load_balancer.latency.expected_latency_ms(3) == 100
+
+    table._apply_model(Event(type=EventType.DELETED, data=new_model(1, "llama")))
+    assert load_balancer.latency.expected_latency_ms(3) is None
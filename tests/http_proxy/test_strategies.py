@@ -0,0 +1,195 @@
+import pytest
+
+from gpustack.http_proxy.load_balancer import LoadBalancer
+from gpustack.http_proxy.strategies import (
+    InFlightRequests,
+    LatencyTracker,
+    LeastOutstandingRequestsStrategy,
+    PowerOfTwoChoicesStrategy,
+    PrefixAffinityStrategy,
+    RoundRobinStrategy,
+    prefix_affinity_key,
+)
+from gpustack.schemas.models import ModelInstanceStateEnum
+from tests.utils.model import new_model_instance
+
+
+def running_instances(count: int, model_id: int = 1):
+    return [
+        new_model_instance(i, f"test-{i}", model_id, i, ModelInstanceStateEnum.RUNNING)
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_round_robin_does_not_reset_on_equal_lists():
+    strategy = RoundRobinStrategy()
+
+    selected = []
+    for _ in range(4):
+        # A fresh list of fresh objects each call, like the routing table returns.
+        instance = await strategy.select_instance(running_instances(2))
+        selected.append(instance.id)
+
+    assert selected == [1, 2, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_least_outstanding_requests_prefers_idle_instances():
+    in_flight = InFlightRequests()
+    strategy = LeastOutstandingRequestsStrategy(in_flight)
+    instances = running_instances(3)
+
+    release_1 = in_flight.acquire(1)
+    in_flight.acquire(1)
+    in_flight.acquire(2)
+
+    assert (await strategy.select_instance(instances)).id == 3
+
+    in_flight.acquire(3)
+    in_flight.acquire(3)
+    assert (await strategy.select_instance(instances)).id == 2
+
+    release_1()
+    release_1()  # idempotent
+    assert in_flight.get(1) == 1
+
+
+@pytest.mark.asyncio
+async def test_least_outstanding_requests_spreads_ties():
+    strategy = LeastOutstandingRequestsStrategy(InFlightRequests())
+    instances = running_instances(3)
+
+    selected = {(await strategy.select_instance(instances)).id for _ in range(3)}
+
+    assert selected == {1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_load_balancer_tracks_requests_per_strategy_name():
+    load_balancer = LoadBalancer()
+    instances = running_instances(2)
+
+    first = await load_balancer.get_instance(instances, "least_outstanding_requests")
+    release = load_balancer.track_request(first)
+    second = await load_balancer.get_instance(instances, "least_outstanding_requests")
+    assert first.id != second.id
+
+    release()
+    assert load_balancer.in_flight.get(first.id) == 0
+
+    # Unknown names fall back to the default strategy.
+    assert await load_balancer.get_instance(instances, "unknown") in instances
+
+
+@pytest.mark.asyncio
+async def test_prefix_affinity_routes_same_prefix_to_same_instance():
+    strategy = PrefixAffinityStrategy(InFlightRequests())
+    instances = running_instances(4)
+
+    turn_1 = {
+        "messages": [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "Summarize this document."},
+        ]
+    }
+    turn_2 = {
+        "messages": turn_1["messages"]
+        + [
+            {"role": "assistant", "content": "Sure."},
+            {"role": "user", "content": "Now translate it."},
+        ]
+    }
+    key_1 = prefix_affinity_key(turn_1, 1024)
+    key_2 = prefix_affinity_key(turn_2, 1024)
+    assert key_1 == key_2
+
+    first = await strategy.select_instance(instances, key_1)
+    for _ in range(5):
+        assert (await strategy.select_instance(running_instances(4), key_2)).id == (
+            first.id
+        )
+
+
+@pytest.mark.asyncio
+async def test_prefix_affinity_overflows_when_saturated():
+    in_flight = InFlightRequests()
+    strategy = PrefixAffinityStrategy(in_flight, load_factor=1.0)
+    instances = running_instances(2)
+
+    preferred = await strategy.select_instance(instances, "shared prefix")
+    in_flight.acquire(preferred.id)
+    in_flight.acquire(preferred.id)
+
+    overflow = await strategy.select_instance(instances, "shared prefix")
+    assert overflow.id != preferred.id
+
+
+def test_prefix_affinity_key():
+    assert prefix_affinity_key(None, 10) is None
+    assert prefix_affinity_key({"input": "embed me"}, 10) is None
+    assert prefix_affinity_key({"prompt": "abcdefghijkl"}, 4) == "abcd"
+    assert prefix_affinity_key({"prompt": ["abcdef", "x"]}, 3) == "abc"
+    assert (
+        prefix_affinity_key(
+            {
+                "messages": [
+                    {"role": "system", "content": "sys"},
+                    {
+                        "role": "user",
+                        "content": [{"type": "text", "text": "hello world"}],
+                    },
+                ]
+            },
+            5,
+        )
+        == "sys\nhello"
+    )
+
+
+def test_latency_tracker_ewma():
+    tracker = LatencyTracker(alpha=0.5)
+    assert tracker.expected_latency_ms(1) is None
+
+    tracker.observe(1, time_to_first_token_ms=100, time_per_output_token_ms=10)
+    assert tracker.expected_latency_ms(1) == 110
+
+    tracker.observe(1, time_to_first_token_ms=300, time_per_output_token_ms=30)
+    assert tracker.expected_latency_ms(1) == 220
+
+
+@pytest.mark.asyncio
+async def test_power_of_two_choices_avoids_degraded_instance():
+    in_flight = InFlightRequests()
+    latency = LatencyTracker()
+    strategy = PowerOfTwoChoicesStrategy(in_flight, latency)
+    instances = running_instances(2)
+
+    latency.observe(1, time_to_first_token_ms=2000, time_per_output_token_ms=200)
+    latency.observe(2, time_to_first_token_ms=100, time_per_output_token_ms=10)
+
+    for _ in range(10):
+        assert (await strategy.select_instance(instances)).id == 2
+
+    # Enough load on the fast instance outweighs its lower latency.
+    for _ in range(30):
+        in_flight.acquire(2)
+    assert (await strategy.select_instance(instances)).id == 1
+
+
+@pytest.mark.asyncio
+async def test_load_balancer_skips_excluded_and_suspect_instances():
+    load_balancer = LoadBalancer()
+    instances = running_instances(3)
+
+    load_balancer.mark_suspect(1)
+    for _ in range(4):
+        instance = await load_balancer.get_instance(instances, exclude={2})
+        assert instance.id == 3
+
+    # Suspect instances are still used when nothing else is left.
+    assert (await load_balancer.get_instance(instances, exclude={2, 3})).id == 1
+    assert await load_balancer.get_instance(instances, exclude={1, 2, 3}) is None
+
+    load_balancer.mark_suspect(1, seconds=0)
+    assert not load_balancer.is_suspect(1)
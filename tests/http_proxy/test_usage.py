@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from gpustack.http_proxy.usage import JSONUsageScanner
+
+USAGE = {"prompt_tokens": 10, "total_tokens": 10}
+
+
+def scan(data: bytes, chunk_size: int, window_size: int):
+    scanner = JSONUsageScanner(window_size=window_size)
+    for i in range(0, len(data), chunk_size):
+        scanner.feed(data[i : i + chunk_size])
+    return scanner.usage()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 10000])
+@pytest.mark.parametrize(
+    "name, body",
+    [
+        (
+            "usage last",
+            {"data": [{"embedding": [0.5] * 2000}], "usage": USAGE},
+        ),
+        (
+            "usage first",
+            {"id": "1", "usage": USAGE, "results": [{"document": "x" * 20000}]},
+        ),
+        (
+            "usage key in contents",
+            {"results": [{"text": '"usage": {"total_tokens": 1}'}], "usage": USAGE},
+        ),
+    ],
+)
+def test_json_usage_scanner(name, body, chunk_size):
+    data = json.dumps(body, indent=1).encode()
+    assert scan(data, chunk_size, window_size=1024) == USAGE, name
+
+
+def test_json_usage_scanner_without_usage():
+    data = json.dumps({"data": [1] * 5000, "usage": None}).encode()
+    assert scan(data, 100, window_size=1024) is None
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from gpustack.api.exceptions import ForbiddenException
+from gpustack.routes.api_keys import create_api_key, update_api_key
+from gpustack.schemas.api_keys import ApiKey, ApiKeyCreate, ApiKeyUpdate
+from gpustack.schemas.common import RateLimit
+
+
+@pytest.mark.asyncio
+async def test_only_admins_change_api_key_rate_limits():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all, tables=[ApiKey.__table__])
+
+    limit = RateLimit(requests_per_minute=10)
+    now = datetime.now(timezone.utc)
+    user = SimpleNamespace(id=1, is_admin=False)
+    admin = SimpleNamespace(id=1, is_admin=True)
+    async with AsyncSession(engine) as session:
+        api_key = ApiKey(
+            id=1,
+            name="test",
+            access_key="access",
+            hashed_secret_key="hashed",
+            user_id=1,
+            rate_limit=limit,
+            created_at=now,
+            updated_at=now,
+        )
+        session.add(api_key)
+        await session.commit()
+
+    async def call(route, *args):
+        # A session per request, as in the API server.
+        async with AsyncSession(engine) as session:
+            return await route(session, *args)
+
+    with pytest.raises(ForbiddenException):
+        await call(create_api_key, user, ApiKeyCreate(name="other", rate_limit=limit))
+    for rate_limit in (None, RateLimit(requests_per_minute=100)):
+        with pytest.raises(ForbiddenException):
+            await call(update_api_key, user, 1, ApiKeyUpdate(rate_limit=rate_limit))
+
+    # Unchanged limits are accepted, e.g. when a client sends the full key.
+    with patch.object(ApiKey, "update", new_callable=AsyncMock) as update:
+        await call(
+            update_api_key,
+            user,
+            1,
+            ApiKeyUpdate(allowed_model_names=["m"], rate_limit=limit),
+        )
+        await call(update_api_key, admin, 1, ApiKeyUpdate(rate_limit=None))
+    sources = [c.kwargs["source"] for c in update.await_args_list]
+    assert sources == [
+        {
+            "allowed_model_names": ["m"],
+            "rate_limit": limit.model_dump(exclude_unset=True),
+        },
+        {"rate_limit": None},
+    ]
@@ -0,0 +1,387 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from gpustack.schemas.api_keys import ApiKey, ApiKeyPublic
+from gpustack.schemas.common import RateLimit
+from gpustack.server.bus import (
+    Event,
+    EventBus,
+    EventsDropped,
+    EventType,
+    OverflowPolicy,
+    decode_watch_event,
+    event_bus,
+)
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_published_event():
+    subscribers = [event_bus.subscribe("test") for _ in range(2)]
+    try:
+        event = Event(type=EventType.CREATED, data={"id": 1})
+        await event_bus.publish("test", event)
+        assert [await s.receive() for s in subscribers] == [event, event]
+        assert all(s.queue.empty() for s in subscribers)
+    finally:
+        for subscriber in subscribers:
+            event_bus.unsubscribe("test", subscriber)
+
+
+async def received(subscriber):
+    return [await subscriber.receive() for _ in range(subscriber.depth)]
+
+
+@pytest.mark.asyncio
+async def test_filtered_subscribers_receive_matching_events():
+    bus = EventBus()
+    all_events = bus.subscribe("instance")
+    worker_1 = bus.subscribe("instance", {"worker_id": 1})
+    worker_2 = bus.subscribe("instance", {"worker_id": 2, "state": "running"})
+    by_name = bus.subscribe("instance", {"name": "test"})
+    assert worker_1.index_key == ("worker_id", 1)
+    assert by_name.index_key == ("name", "test")
+
+    events = [
+        Event(type=EventType.UPDATED, data=SimpleNamespace(**data))
+        for data in [
+            {"worker_id": 1, "state": "running", "name": "test"},
+            {"worker_id": 2, "state": "starting", "name": "other"},
+            {"worker_id": 2, "state": "running", "name": "other"},
+        ]
+    ]
+    for event in events:
+        await bus.publish("instance", event)
+
+    assert await received(all_events) == events
+    assert await received(worker_1) == [events[0]]
+    assert await received(worker_2) == [events[2]]
+    assert await received(by_name) == [events[0]]
+
+    for subscriber in [all_events, worker_1, worker_2, by_name]:
+        bus.unsubscribe("instance", subscriber)
+    assert not bus.subscribers
+    assert not bus._unindexed
+    assert not bus._indexes
+
+
+def instance_event(id: int, type=EventType.UPDATED, **changed_fields) -> Event:
+    return Event(
+        type=type,
+        data=SimpleNamespace(id=id, state=f"state-{id}"),
+        changed_fields=changed_fields,
+    )
+
+
+@pytest.mark.asyncio
+async def test_overflowing_subscribers_coalesce_events():
+    bus = EventBus()
+    subscriber = bus.subscribe("instance", overflow=OverflowPolicy.COALESCE)
+    subscriber.maxsize = 2
+    events = [
+        instance_event(1, EventType.CREATED),
+        instance_event(2, state=("a", "b")),
+        instance_event(1, state=("a", "b")),
+        instance_event(2, state=("b", "c")),
+        instance_event(3, EventType.DELETED),
+    ]
+    for event in events:
+        await bus.publish("instance", event)
+
+    created, updated, deleted = await received(subscriber)
+    assert created.type == EventType.CREATED
+    assert created.data is events[2].data
+    assert created.changed_fields == {"state": ("a", "b")}
+    assert updated.data is events[3].data
+    assert updated.changed_fields == {"state": ("a", "c")}
+    assert updated.revision == events[3].revision
+    assert deleted is events[4]
+    assert bus.stats["instance"].coalesced_events == 2
+
+
+@pytest.mark.asyncio
+async def test_coalescing_keeps_the_queue_bounded():
+    bus = EventBus()
+    subscriber = bus.subscribe("instance", overflow=OverflowPolicy.COALESCE)
+    subscriber.maxsize = 2
+    for i in range(100):
+        await bus.publish("instance", instance_event(i % 3, state=(i, i + 1)))
+
+    # Stale slots of moved events are removed once there are too many.
+    assert subscriber.queue.qsize() <= 2 * subscriber.maxsize + 1
+    events = await received(subscriber)
+    assert [e.data.id for e in events] == [1, 2, 0]
+    assert [e.changed_fields["state"] for e in events] == [(1, 98), (2, 99), (0, 100)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overflow", [OverflowPolicy.RESYNC, OverflowPolicy.DISCONNECT])
+async def test_overflowing_subscribers_drop_events(overflow):
+    bus = EventBus()
+    subscriber = bus.subscribe("instance", overflow=overflow)
+    subscriber.maxsize = 2
+    for id in range(4):
+        await bus.publish("instance", instance_event(id))
+
+    assert bus.stats["instance"].dropped_events == 3
+    with pytest.raises(EventsDropped):
+        await subscriber.receive()
+    assert subscriber.closed == (overflow == OverflowPolicy.DISCONNECT)
+    # Events after the drop are only received when resyncing.
+    ids = [e.data.id for e in await received(subscriber)]
+    assert ids == ([3] if overflow == OverflowPolicy.RESYNC else [])
+
+    metrics = {m.name: m.samples[0].value for m in bus.collect()}
+    assert metrics == {
+        "gpustack:event_bus_subscribers": 1,
+        "gpustack:event_bus_queue_depth": 0,
+        "gpustack:event_bus_dropped_events": 3,
+        "gpustack:event_bus_coalesced_events": 0,
+    }
+
+
+async def create_engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all, tables=[ApiKey.__table__])
+    return engine
+
+
+def new_api_key(id: int) -> ApiKey:
+    now = datetime.now(timezone.utc)
+    return ApiKey(
+        id=id,
+        name=f"test-{id}",
+        access_key=f"access-{id}",
+        hashed_secret_key=f"hashed-{id}",
+        user_id=1,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+@pytest.mark.asyncio
+async def test_history_is_kept_per_topic():
+    bus = EventBus(history_size=2)
+    start = bus.revision
+    events = [Event(type=EventType.UPDATED, data={"id": i}) for i in range(3)]
+    for event in events:
+        await bus.publish("test", event)
+    other = Event(type=EventType.CREATED, data={"id": 1})
+    await bus.publish("other", other)
+
+    assert [e.revision for e in events] == [start + 1, start + 2, start + 3]
+    assert bus.revision == other.revision == start + 4
+    assert bus.history("test", start + 1) == events[1:]
+    assert bus.history("test", start + 3) == []
+    assert bus.history("other", start) == [other]
+    # The first event is no longer kept.
+    assert bus.history("test", start) is None
+    # Revisions from before the bus was created.
+    assert bus.history("other", start - 1) is None
+    assert bus.history("other", start + 5) is None
+
+
+@pytest.mark.asyncio
+async def test_streams_share_event_encoding():
+    engine = await create_engine()
+    streams = [ApiKey.streaming(engine) for _ in range(3)]
+    # The streams subscribe when they are first iterated.
+    reads = [asyncio.create_task(stream.__anext__()) for stream in streams]
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    api_key = new_api_key(1)
+    try:
+        with patch.object(
+            ApiKey,
+            "_convert_to_public_class",
+            wraps=ApiKey._convert_to_public_class,
+        ) as convert:
+            await event_bus.publish(
+                "apikey", Event(type=EventType.UPDATED, data=api_key)
+            )
+            chunks = await asyncio.gather(*reads)
+        assert convert.call_count == 1
+    finally:
+        for stream in streams:
+            await stream.aclose()
+
+    assert all(chunk is chunks[0] for chunk in chunks)
+    assert chunks[0].endswith(b"\n\n")
+    encoded = json.loads(chunks[0])
+    assert encoded["type"] == EventType.UPDATED.value
+    assert encoded["changed_fields"] == {}
+    assert encoded["data"]["name"] == "test-1"
+    assert "hashed_secret_key" not in encoded["data"]
+
+
+async def read_events(stream, count: int):
+    return [json.loads(await stream.__anext__()) for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_streams_resume_after_resource_version():
+    engine = await create_engine()
+
+    stream = ApiKey.streaming(engine, resource_version=0)
+    # A relist ends with a heartbeat carrying the revision to resume from.
+    [heartbeat] = await read_events(stream, 1)
+    assert heartbeat["type"] == EventType.HEARTBEAT.value
+    assert heartbeat["revision"] == event_bus.revision
+    await event_bus.publish(
+        "apikey", Event(type=EventType.CREATED, data=new_api_key(1))
+    )
+    [created] = await read_events(stream, 1)
+    assert created["revision"] == event_bus.revision
+    await stream.aclose()
+
+    await event_bus.publish(
+        "apikey", Event(type=EventType.UPDATED, data=new_api_key(1))
+    )
+    await event_bus.publish(
+        "apikey", Event(type=EventType.DELETED, data=new_api_key(1))
+    )
+    stream = ApiKey.streaming(engine, resource_version=created["revision"])
+    events = await read_events(stream, 2)
+    await stream.aclose()
+    assert [e["type"] for e in events] == [
+        EventType.UPDATED.value,
+        EventType.DELETED.value,
+    ]
+    assert events[1]["revision"] == event_bus.revision
+
+    # Unknown revisions fall back to a relist.
+    stream = ApiKey.streaming(engine, resource_version=1)
+    [heartbeat] = await read_events(stream, 1)
+    await stream.aclose()
+    assert heartbeat["type"] == EventType.HEARTBEAT.value
+
+    # Streams without a resource version keep events without revisions.
+    stream = ApiKey.streaming(engine)
+    read = asyncio.create_task(read_events(stream, 1))
+    await asyncio.sleep(0)
+    await event_bus.publish(
+        "apikey", Event(type=EventType.CREATED, data=new_api_key(2))
+    )
+    [created] = await read
+    await stream.aclose()
+    assert "revision" not in created
+
+
+@pytest.mark.asyncio
+async def test_resync_subscriptions_replay_dropped_events():
+    engine = await create_engine()
+    events = ApiKey.subscribe(engine, overflow=OverflowPolicy.RESYNC)
+    # Subscribes, then waits for the relist of the empty table.
+    read = asyncio.create_task(events.__anext__())
+    await asyncio.sleep(0)
+    subscriber = event_bus.subscribers["apikey"][-1]
+    subscriber.maxsize = 2
+
+    published = [Event(type=EventType.UPDATED, data=new_api_key(id)) for id in range(5)]
+    for event in published:
+        await event_bus.publish("apikey", event)
+
+    received = [await read] + [await events.__anext__() for _ in range(4)]
+    await events.aclose()
+    assert received == published
+
+
+@pytest.mark.asyncio
+async def test_coalesced_subscriptions_receive_events_in_revision_order():
+    engine = await create_engine()
+    events = ApiKey.subscribe(engine, overflow=OverflowPolicy.COALESCE)
+    read = asyncio.create_task(events.__anext__())
+    await asyncio.sleep(0)
+    subscriber = event_bus.subscribers["apikey"][-1]
+    subscriber.maxsize = 2
+
+    for id in (1, 2, 3, 1):
+        await event_bus.publish(
+            "apikey", Event(type=EventType.UPDATED, data=new_api_key(id))
+        )
+
+    async def read_all():
+        return [await read] + [await events.__anext__() for _ in range(2)]
+
+    # Events skipped as duplicates would never be received.
+    received = await asyncio.wait_for(read_all(), timeout=1)
+    await events.aclose()
+    # The coalesced event of the first key is moved behind the others.
+    assert [e.data.id for e in received] == [2, 3, 1]
+    assert [e.revision for e in received] == sorted(e.revision for e in received)
+    assert subscriber.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_delta_streams_send_updates_as_merge_patches():
+    engine = await create_engine()
+    stream = ApiKey.streaming(engine, resource_version=0, delta=True)
+    await stream.__anext__()
+    api_key = new_api_key(1)
+
+    def updated(**changes) -> Event:
+        nonlocal api_key
+        api_key = api_key.model_copy()
+        changed_fields = {}
+        for key, (old, new) in changes.items():
+            setattr(api_key, key, new)
+            changed_fields[key] = ([old], [new])
+        return Event(
+            type=EventType.UPDATED, data=api_key, changed_fields=changed_fields
+        )
+
+    limit = RateLimit(requests_per_minute=1, request_burst=2)
+    events = [
+        Event(type=EventType.CREATED, data=api_key),
+        updated(
+            rate_limit=(None, limit),
+            hashed_secret_key=("hashed-1", "rotated"),
+        ),
+        updated(
+            name=("test-1", "renamed"),
+            rate_limit=(limit, RateLimit(requests_per_minute=5, request_burst=2)),
+        ),
+        updated(description=(None, "test")),
+        updated(name=("renamed", "renamed-again")),
+        updated(description=("test", None)),
+        Event(type=EventType.DELETED, data=api_key),
+    ]
+    objects = {}
+    decoded = []
+    lines = []
+    with patch("gpustack.mixins.active_record.DELTA_SNAPSHOT_INTERVAL", 2):
+        for event in events:
+            await event_bus.publish("apikey", event)
+            line = await stream.__anext__()
+            lines.append(json.loads(line))
+            decoded.append(decode_watch_event(json.loads(line), objects))
+    await stream.aclose()
+
+    assert "data" in lines[0]
+    # The nulls of the unset rate limit fields can't be sent in a patch.
+    assert "data" in lines[1]
+    assert lines[2]["patch"] == {
+        "id": 1,
+        "name": "renamed",
+        "rate_limit": {"requests_per_minute": 5},
+    }
+    assert lines[3]["patch"] == {"id": 1, "description": "test"}
+    # A full snapshot after two patches.
+    assert "data" in lines[4]
+    # A field changed to null is sent in full.
+    assert "data" in lines[5]
+    assert lines[5]["data"]["description"] is None
+    for event, line in zip(events, decoded):
+        assert line.type == event.type
+        assert line.revision == event.revision
+        assert line.data == jsonable_encoder(ApiKeyPublic.model_validate(event.data))
+    assert objects == {}
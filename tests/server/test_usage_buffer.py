@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from gpustack.schemas.model_usage import ModelUsage, OperationEnum
+from gpustack.server.usage_buffer import UsageAggregator, upsert_statement
+
+
+@pytest.mark.asyncio
+async def test_flush_increments_existing_rows():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all, tables=[ModelUsage.__table__])
+
+    day = date(2025, 1, 1)
+    aggregator = UsageAggregator()
+    aggregator.add(1, 1, OperationEnum.CHAT_COMPLETION, 10, 5, day=day)
+    aggregator.add(1, 1, OperationEnum.CHAT_COMPLETION, 20, 7, day=day)
+    aggregator.add(2, 1, OperationEnum.EMBEDDING, 3, day=day)
+    assert len(aggregator) == 2
+    assert await aggregator.flush(engine) == 2
+    assert len(aggregator) == 0
+
+    aggregator.add(1, 1, OperationEnum.CHAT_COMPLETION, 1, 1, day=day)
+    assert await aggregator.flush(engine) == 1
+    assert await aggregator.flush(engine) == 0
+
+    async with AsyncSession(engine) as session:
+        usages = (await session.exec(select(ModelUsage))).all()
+    counts = {
+        (u.user_id, u.operation): (
+            u.prompt_token_count,
+            u.completion_token_count,
+            u.request_count,
+        )
+        for u in usages
+    }
+    assert counts == {
+        (1, OperationEnum.CHAT_COMPLETION): (31, 13, 3),
+        (2, OperationEnum.EMBEDDING): (3, 0, 1),
+    }
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_usage():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    aggregator = UsageAggregator()
+    aggregator.add(1, 1, OperationEnum.RERANK, 4, day=date(2025, 1, 1))
+
+    # The table does not exist.
+    with pytest.raises(Exception):
+        await aggregator.flush(engine)
+    assert len(aggregator) == 1
+    await engine.dispose()
+
+
+def test_upsert_statement_dialects():
+    rows = [
+        {
+            "user_id": 1,
+            "model_id": 1,
+            "date": date(2025, 1, 1),
+            "operation": OperationEnum.COMPLETION,
+            "prompt_token_count": 1,
+            "completion_token_count": 1,
+            "request_count": 1,
+        }
+    ]
+    sql = str(
+        upsert_statement("postgresql", rows).compile(dialect=postgresql.dialect())
+    )
+    assert "ON CONFLICT (user_id, model_id, date, operation) DO UPDATE" in sql
+    assert (
+        "request_count = (model_usages.request_count + excluded.request_count)" in sql
+    )
+
+    sql = str(upsert_statement("mysql", rows).compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE" in sql
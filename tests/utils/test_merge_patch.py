@@ -0,0 +1,68 @@
+import pytest
+
+from gpustack.utils.merge_patch import (
+    apply_merge_patch,
+    contains_null,
+    create_merge_patch,
+)
+
+
+@pytest.mark.parametrize(
+    "old, new, expected",
+    [
+        # Equal objects
+        (
+            {"a": 1, "b": {"c": [1, 2]}},
+            {"a": 1, "b": {"c": [1, 2]}},
+            {},
+        ),
+        # Nested changes, additions and removals
+        (
+            {"a": 1, "b": {"c": 1, "d": 2}, "e": "x"},
+            {"a": 1, "b": {"c": 3}, "f": {"g": 1}},
+            {"b": {"c": 3, "d": None}, "e": None, "f": {"g": 1}},
+        ),
+        # Lists are replaced
+        (
+            {"a": [{"b": 1}, {"b": 2}]},
+            {"a": [{"b": 1}, {"b": 3}]},
+            {"a": [{"b": 1}, {"b": 3}]},
+        ),
+        # Values changing type
+        (
+            {"a": {"b": 1}, "c": 1},
+            {"a": 2, "c": {"d": 1}},
+            {"a": 2, "c": {"d": 1}},
+        ),
+        # Non-object values
+        (
+            [1],
+            {"a": 1},
+            {"a": 1},
+        ),
+    ],
+)
+def test_create_merge_patch(old, new, expected):
+    patch = create_merge_patch(old, new)
+    assert patch == expected
+    assert apply_merge_patch(old, patch) == new
+
+
+def test_apply_merge_patch_does_not_modify_target():
+    target = {"a": {"b": 1}}
+    assert apply_merge_patch(target, {"a": {"b": None, "c": 2}}) == {"a": {"c": 2}}
+    assert target == {"a": {"b": 1}}
+
+
+@pytest.mark.parametrize(
+    "patch, expected",
+    [
+        ({"a": 1, "b": {"c": [None]}}, False),
+        ({"a": None}, True),
+        ({"a": {"b": {"c": None}}}, True),
+        ([None], False),
+        (None, False),
+    ],
+)
+def test_contains_null(patch, expected):
+    assert contains_null(patch) == expected